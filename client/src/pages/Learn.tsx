@@ -5,6 +5,12 @@ import { useAuth } from '../context/AuthContext';
 import ReactMarkdown from 'react-markdown'
 import { PdfUploadModal } from '../components/elements/PdfUploadModal';
 
+// Signed-in users are rate-limited per account rather than per IP
+const authHeaders = (): Record<string, string> => {
+  const token = localStorage.getItem('token');
+  return token ? { 'Authorization': `Bearer ${token}` } : {};
+};
+
 // Define interfaces
 interface YoutubeData {
   yturl: string;
@@ -60,7 +66,8 @@ export const Learn = () => {
     try {
       const response = await axios.post(`${BACKEND_URL}transcribe`,youtubeData,{
         headers:{
-          'Content-Type':'application/json'
+          'Content-Type':'application/json',
+          ...authHeaders()
         }
       })
       setDisplayMessage(response.data.message)
@@ -169,7 +176,8 @@ export const Learn = () => {
       
       const response = await axios.post(`${BACKEND_URL}process-pdf`, formData, {
         headers: {
-          'Content-Type': 'multipart/form-data'
+          'Content-Type': 'multipart/form-data',
+          ...authHeaders()
         }
       });
       
@@ -217,7 +225,8 @@ export const Learn = () => {
       try {
         const response = await axios.post(`${BACKEND_URL}transcribe`, youtubeData, {
           headers: {
-            'Content-Type': 'application/json'
+            'Content-Type': 'application/json',
+            ...authHeaders()
           }
         });
         setDisplayMessage(response.data.message);
@@ -0,0 +1,98 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from metrics import profiling
+
+load_dotenv()
+
+# Threads for blocking calls awaited from the loop (YouTube fetches, PDF extraction, sync Mongo)
+AIO_BLOCKING_WORKERS = int(os.getenv("AIO_BLOCKING_WORKERS", "32"))
+
+# One loop per process, started on first use so pre-forking servers don't inherit a dead loop thread.
+# Under an ASGI server the server's own loop is adopted instead (see asgi.py).
+_state = {"pid": None, "loop": None, "thread": None, "executor": None, "adopted": False}
+_lock = threading.Lock()
+
+
+def get_loop():
+    pid = os.getpid()
+    if _state["pid"] != pid:
+        with _lock:
+            if _state["pid"] != pid:
+                loop = asyncio.new_event_loop()
+                loop.set_task_factory(profiling.task_factory)
+                executor = ThreadPoolExecutor(max_workers=AIO_BLOCKING_WORKERS, thread_name_prefix="aio-blocking")
+                loop.set_default_executor(executor)
+                thread = threading.Thread(target=loop.run_forever, name="aio-loop", daemon=True)
+                thread.start()
+                _state.update(pid=pid, loop=loop, thread=thread, executor=executor, adopted=False)
+    return _state["loop"]
+
+
+def adopt(loop=None):
+    """
+    Makes the running loop (an ASGI server's) the process loop, so async views, singleflight and
+    the Gemini client share it with the threads that call run(). Call from the loop's thread.
+    """
+    loop = loop or asyncio.get_running_loop()
+    with _lock:
+        if _state["pid"] == os.getpid() and not _state["adopted"]:
+            # Something used the private loop before the server started; retire it
+            _state["loop"].call_soon_threadsafe(_state["loop"].stop)
+            _state["executor"].shutdown(wait=False)
+        loop.set_task_factory(profiling.task_factory)
+        executor = ThreadPoolExecutor(max_workers=AIO_BLOCKING_WORKERS, thread_name_prefix="aio-blocking")
+        loop.set_default_executor(executor)
+        _state.update(pid=os.getpid(), loop=loop, thread=threading.current_thread(), executor=executor, adopted=True)
+    return loop
+
+
+def submit(coro):
+    """
+    Schedules the coroutine on the process loop and returns a concurrent.futures.Future
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro, timeout=None):
+    """
+    Runs the coroutine on the process loop and blocks the calling thread for its result.
+    Must not be called from the loop itself.
+    """
+    if threading.current_thread() is _state["thread"]:
+        coro.close()
+        raise RuntimeError("event_loop.run() called from the event loop; await the coroutine instead")
+    return submit(coro).result(timeout)
+
+
+async def to_thread(fn, *args, **kwargs):
+    """
+    Awaits a blocking call on the AIO_BLOCKING_WORKERS pool, in the caller's contextvars context
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(context.run, _attributed, fn, *args, **kwargs))
+
+
+def _attributed(fn, *args, **kwargs):
+    with profiling.on_thread():
+        return fn(*args, **kwargs)
+
+
+def shutdown():
+    with _lock:
+        loop = _state["loop"]
+        if loop is None or _state["pid"] != os.getpid():
+            return
+        # An adopted loop belongs to the server, which stops it
+        if not _state["adopted"]:
+            loop.call_soon_threadsafe(loop.stop)
+            _state["thread"].join(timeout=5)
+        _state["executor"].shutdown(wait=False)
+        _state.update(pid=None, loop=None, thread=None, executor=None, adopted=False)
@@ -0,0 +1,176 @@
+import asyncio
+import copy
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+from aio import event_loop
+
+load_dotenv()
+
+# Coalesce across worker processes through a lease document, not just within one process
+SINGLEFLIGHT_MONGO = os.getenv("SINGLEFLIGHT_MONGO", "false").lower() in ("1", "true", "yes")
+# A lease outliving this (its worker died) is taken over by the next caller
+SINGLEFLIGHT_LEASE_SECONDS = int(os.getenv("SINGLEFLIGHT_LEASE_SECONDS", "300"))
+SINGLEFLIGHT_POLL_SECONDS = float(os.getenv("SINGLEFLIGHT_POLL_SECONDS", "0.5"))
+# Finished results stay on the lease document briefly for callers that were still polling
+SINGLEFLIGHT_RESULT_SECONDS = int(os.getenv("SINGLEFLIGHT_RESULT_SECONDS", "30"))
+
+RUNNING = "running"
+DONE = "done"
+
+
+def content_key(kind, *parts):
+    """
+    Key for a computation over the given str/bytes inputs, e.g. content_key("pdf", file_bytes)
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        # Length-prefixed so ("ab", "c") and ("a", "bc") differ
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return f"{kind}:{digest.hexdigest()}"
+
+
+class SingleFlight:
+    """
+    Runs one computation per key at a time: concurrent callers with the same key await
+    the in-flight one and all get its result (or its exception).
+    Must be used from the process event loop. With a lease collection attached, callers in
+    other worker processes wait for the lease owner's result instead of computing it again.
+    """
+
+    def __init__(self):
+        self.collection = None
+        self._inflight = {}  # key -> asyncio.Task
+        self._counters = {"leaders": 0, "followers": 0, "remote_followers": 0, "lease_takeovers": 0}
+
+    def attach_collection(self, collection):
+        """
+        Lease collection on the sync driver; its calls run on the blocking pool
+        """
+        self.collection = collection
+
+    async def do(self, key, compute):
+        """
+        Returns await compute() for the first caller of a key, and the same result for
+        callers that arrive while it is running. Results must be JSON-like: with the lease
+        collection they travel through Mongo, so tuples come back as lists.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self._counters["leaders"] += 1
+            task = asyncio.ensure_future(self._lead(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self._counters["followers"] += 1
+        # Shielded so one caller giving up doesn't cancel the work the others are waiting for
+        result = await asyncio.shield(task)
+        # Every caller gets its own copy; controllers add fields to the body before returning it
+        return copy.deepcopy(result)
+
+    def stats(self):
+        stats = dict(self._counters)
+        stats["in_flight"] = len(self._inflight)
+        stats["cross_process"] = self.collection is not None
+        return stats
+
+    async def _lead(self, key, compute):
+        if self.collection is None:
+            return await compute()
+
+        collection = self.collection
+        try:
+            owner = await self._acquire(collection, key)
+            while owner is None:
+                self._counters["remote_followers"] += 1
+                doc = await self._wait(collection, key)
+                if doc is not None:
+                    return doc["result"]
+                # The owner failed or its lease ran out: try to take over
+                owner = await self._acquire(collection, key)
+        except Exception as e:
+            print(f"Error coordinating {key} through Mongo, computing locally: {e}")
+            return await compute()
+
+        try:
+            result = await compute()
+        except BaseException:
+            await self._release(collection, key, owner)
+            raise
+        await self._publish(collection, key, owner, result)
+        return result
+
+    async def _acquire(self, collection, key):
+        now = datetime.utcnow()
+        owner = uuid.uuid4().hex
+        lease = {"owner": owner, "status": RUNNING, "expires_at": now + timedelta(seconds=SINGLEFLIGHT_LEASE_SECONDS)}
+        try:
+            await event_loop.to_thread(collection.insert_one, {"_id": key, **lease})
+            return owner
+        except DuplicateKeyError:
+            pass
+        # An expired lease (dead owner, or an old result the TTL monitor hasn't removed yet)
+        taken = await event_loop.to_thread(
+            collection.find_one_and_update,
+            {"_id": key, "expires_at": {"$lt": now}},
+            {"$set": lease, "$unset": {"result": ""}}
+        )
+        if taken is not None:
+            self._counters["lease_takeovers"] += 1
+            return owner
+        return None
+
+    async def _wait(self, collection, key):
+        """
+        Polls until the owner publishes; None when the lease is gone or expired
+        """
+        while True:
+            doc = await event_loop.to_thread(collection.find_one, {"_id": key})
+            if doc is None or doc["expires_at"] < datetime.utcnow():
+                return None
+            if doc["status"] == DONE:
+                return doc
+            await asyncio.sleep(SINGLEFLIGHT_POLL_SECONDS)
+
+    async def _publish(self, collection, key, owner, result):
+        now = datetime.utcnow()
+        try:
+            await event_loop.to_thread(
+                collection.update_one,
+                {"_id": key, "owner": owner},
+                {"$set": {
+                    "status": DONE,
+                    "result": result,
+                    "expires_at": now + timedelta(seconds=SINGLEFLIGHT_RESULT_SECONDS)
+                }}
+            )
+        except Exception as e:
+            print(f"Error publishing {key} result: {e}")
+            await self._release(collection, key, owner)
+
+    async def _release(self, collection, key, owner):
+        try:
+            await event_loop.to_thread(collection.delete_one, {"_id": key, "owner": owner})
+        except Exception as e:
+            print(f"Error releasing {key} lease: {e}")
+
+
+single_flight = SingleFlight()
+
+
+def setup(collection):
+    """
+    Attaches the Mongo lease collection when SINGLEFLIGHT_MONGO is enabled
+    """
+    if SINGLEFLIGHT_MONGO:
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        single_flight.attach_collection(collection)
+    return single_flight
@@ -1,16 +1,88 @@
-from flask import jsonify
+import math
+import os
 
-from controllers import main_controllers, auth_controllers, transcription_controller, notes_controllers, pdf_controller, questions_controller, tests_controller
-from decorators import token_decorator
+from flask import jsonify, request
+
+from controllers import main_controllers, auth_controllers, transcription_controller, notes_controllers, pdf_controller, questions_controller, tests_controller, jobs_controller
+from decorators import token_decorator, rate_limit_decorator
 from config import app_setup
+from genai import cache as llm_cache
+from genai import genai
+from genai import resilience
+from config import mongo_pool
+from youtube import transcript_store
+from jobs import job_queue as jobs
+from auth import tokens
+from auth import rate_limit
+from auth import passwords
+from pdf_handling import extract
+from pdf_handling import pdf_store
+from pdf_handling import uploads
+from aio import event_loop
+from aio import singleflight
+from metrics import metrics
+from metrics import profiling
 
 app = app_setup.flask_setup()
-mongo_credentials = app_setup.mongodb_setup()
+# Per-route latency, status and size histograms for /metrics
+metrics.instrument(app)
+# Opt-in request profiles (X-Profile header or PROFILE_SAMPLE_RATE) written to PROFILE_DIR
+profiling.instrument(app)
+# Connects on first use in each process, so pre-forking servers don't share a MongoClient
+mongo_credentials = app_setup.LazyMongo()
+
+# Background pipelines for submit-and-poll mode (?async=true)
+job_queue = jobs.JobQueue()
+job_queue.register('transcribe', transcription_controller.transcribe)
+job_queue.register('process_pdf', pdf_controller.summarize_pdf_upload)
+
+@app_setup.on_process_start
+def start_process(mongo):
+    llm_cache.setup(mongo['llm_cache_collection'])
+    transcript_store.setup(mongo['transcripts_collection'])
+    job_queue.start(jobs.make_store(mongo['jobs_collection']))
+    singleflight.setup(mongo['inflight_collection'])
+    rate_limit.setup(mongo['rate_limits_collection'])
+    pdf_store.setup(mongo['pdf_cache_collection'])
+    uploads.setup(mongo['database'])
+
+@app.before_request
+def ensure_process_started():
+    # Readiness and metrics have to answer while Mongo is down
+    if request.endpoint in ('ready', 'prometheus_metrics'):
+        return None
+    try:
+        app_setup.get_mongo()
+    except app_setup.MongoUnavailable as e:
+        return jsonify({'error': 'Service unavailable', 'message': str(e)}), 503, {
+            'Retry-After': str(math.ceil(app_setup.MONGO_SETUP_RETRY_SECONDS))
+        }
+
+# Under the uvicorn worker both the ASGI lifespan and gunicorn's worker_exit ask for a shutdown
+_stopped = {"pid": None}
+
+def shutdown():
+    """
+    Graceful stop: drains in-flight jobs and worker pools, then closes the Mongo client
+    """
+    if _stopped["pid"] == os.getpid():
+        return
+    _stopped["pid"] = os.getpid()
+    still_running = job_queue.drain()
+    if still_running:
+        print(f"Stopping with {still_running} job(s) still running, they will be resumed by another worker")
+    extract.shutdown()
+    app_setup.close_mongo()
+    event_loop.shutdown()
 
 # JWT Token verification decorator
 def token_required(f):
     return token_decorator.token_required(app=app,f=f)
 
+# Per-user (or per-IP) token bucket and concurrency cap for the generation endpoints
+def rate_limited(f):
+    return rate_limit_decorator.rate_limited(app=app,f=f)
+
 @app.route("/")
 def home():
     return main_controllers.home()
@@ -24,6 +96,37 @@ def contact():
   return jsonify({"message":"Contact"})
 
 
+@app.route("/ready")
+def ready():
+    return main_controllers.ready(app_setup.get_client(), job_queue, app_setup.get_mongo)
+
+@app.route("/cache-stats")
+def cache_stats():
+  return jsonify({
+    "llm_cache": llm_cache.response_cache.stats(),
+    "transcripts": transcript_store.transcript_store.stats(),
+    "tokens": tokens.token_cache.stats(),
+    "singleflight": singleflight.single_flight.stats(),
+    "pdf_cache": pdf_store.pdf_store.stats()
+  })
+
+@app.route("/pool-stats")
+def pool_stats():
+  # Connection pool utilization; checked_out near max_pool_size or a growing waiting count means the pool is too small
+  return jsonify({
+    "mongo": mongo_pool.stats(),
+    "gemini": genai.pool_stats(),
+    "gemini_resilience": resilience.stats(),
+    "rate_limit": rate_limit.limiter.stats(),
+    "bcrypt": passwords.stats(),
+    "jobs": job_queue.stats()
+  })
+
+@app.route("/metrics")
+def prometheus_metrics():
+  # Prometheus text format: routes, Gemini calls by instruction kind, YouTube, PDF extraction, Mongo commands
+  return metrics.exposition()
+
 @app.route('/register', methods=['POST'])
 def register():
     return auth_controllers.register(app,mongo_credentials['users_collection'])
@@ -47,6 +150,11 @@ def get_notes(current_user_id):
 def create_note(current_user_id):
     return notes_controllers.create_note(mongo_credentials['notes_collection'],current_user_id)
 
+@app.route('/notes/<note_id>', methods=['GET'])
+@token_required
+def get_note(current_user_id, note_id):
+    return notes_controllers.get_note(mongo_credentials['notes_collection'], current_user_id, note_id)
+
 @app.route('/notes/<note_id>', methods=['PUT'])
 @token_required
 def update_note(current_user_id, note_id):
@@ -65,8 +173,14 @@ def get_questions(current_user_id):
 
 @app.route('/questions', methods=['POST'])
 @token_required
-def create_questions(current_user_id):
-    return questions_controller.create_questions(mongo_credentials['questions_collection'], mongo_credentials['notes_collection'], current_user_id)
+@rate_limited
+async def create_questions(current_user_id):
+    return await questions_controller.create_questions(mongo_credentials['questions_collection'], mongo_credentials['notes_collection'], current_user_id)
+
+@app.route('/questions/<questions_id>', methods=['GET'])
+@token_required
+def get_question(current_user_id, questions_id):
+    return questions_controller.get_question(mongo_credentials['questions_collection'], current_user_id, questions_id)
 
 @app.route('/questions/<questions_id>', methods=['DELETE'])
 @token_required
@@ -81,8 +195,9 @@ def get_tests(current_user_id):
 
 @app.route('/tests', methods=['POST'])
 @token_required
-def create_test(current_user_id):
-    return tests_controller.create_test(mongo_credentials['tests_collection'], mongo_credentials['notes_collection'], current_user_id)
+@rate_limited
+async def create_test(current_user_id):
+    return await tests_controller.create_test(mongo_credentials['tests_collection'], mongo_credentials['notes_collection'], current_user_id)
 
 @app.route('/tests/<test_id>', methods=['GET'])
 @token_required
@@ -95,12 +210,28 @@ def delete_test(current_user_id, test_id):
     return tests_controller.delete_test(mongo_credentials['tests_collection'], current_user_id, test_id)
 
 @app.route('/transcribe', methods=['POST'])
-def generate_transcription():
-    return transcription_controller.generate_transcription()
+@rate_limited
+async def generate_transcription():
+    return await transcription_controller.generate_transcription(job_queue)
 
 @app.route('/process-pdf', methods=['POST'])
-def process_pdf():
-    return pdf_controller.process_pdf()
+@rate_limited
+async def process_pdf():
+    return await pdf_controller.process_pdf(job_queue)
+
+@app.route('/transcribe/stream', methods=['POST'])
+@rate_limited
+def stream_transcription():
+    return transcription_controller.stream_transcription()
+
+@app.route('/process-pdf/stream', methods=['POST'])
+@rate_limited
+def stream_pdf():
+    return pdf_controller.stream_pdf()
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    return jobs_controller.get_job(job_queue, job_id)
 
 if __name__ == '__main__':
   app.run(host='0.0.0.0',debug=True)
\ No newline at end of file
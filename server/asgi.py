@@ -0,0 +1,115 @@
+"""
+ASGI entry point for production serving, e.g.:
+    gunicorn -c gunicorn.conf.py -k uvicorn_worker.UvicornWorker asgi:app
+    uvicorn asgi:app --port 5000
+
+The generation routes are async views and are awaited on the server's event loop, so a request
+waiting on Gemini or YouTube doesn't hold a thread. Every other route runs on a pool of
+WEB_THREADS threads through a2wsgi, as it would under the gthread worker.
+"""
+import inspect
+import io
+import os
+
+from a2wsgi import WSGIMiddleware
+from a2wsgi.wsgi import build_environ
+from dotenv import load_dotenv
+from flask import request
+
+import app as api
+from aio import event_loop
+from config import app_setup
+
+load_dotenv()
+
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+
+flask_app = api.app
+wsgi = WSGIMiddleware(flask_app, workers=WEB_THREADS)
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if scope["type"] == "http":
+        view = async_view(scope)
+        if view is not None:
+            return await serve_async(view, scope, receive, send)
+    return await wsgi(scope, receive, send)
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            # Singleflight, the Gemini client and event_loop.run() all share the server's loop
+            event_loop.adopt()
+            try:
+                await event_loop.to_thread(app_setup.get_mongo)
+            except app_setup.MongoUnavailable as e:
+                # Requests keep answering 503 until Mongo is reachable
+                print(f"Starting without Mongo: {e}")
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await event_loop.to_thread(api.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def async_view(scope):
+    """
+    Returns the view function for the request when it is an async view, otherwise None
+    """
+    environ = build_environ(scope, io.BytesIO())
+    try:
+        rule, _ = flask_app.url_map.bind_to_environ(environ).match(return_rule=True)
+    except Exception:
+        # 404s, 405s and redirects are answered by Flask on the WSGI path
+        return None
+    view = flask_app.view_functions[rule.endpoint]
+    return view if inspect.iscoroutinefunction(view) else None
+
+
+async def serve_async(view, scope, receive, send):
+    """
+    Flask's full_dispatch_request, with the view awaited instead of run on a thread
+    """
+    body = await read_body(receive)
+    ctx = flask_app.request_context(build_environ(scope, io.BytesIO(body)))
+    ctx.push()
+    error = None
+    try:
+        try:
+            rv = flask_app.preprocess_request()
+            if rv is None:
+                if request.routing_exception is not None:
+                    flask_app.raise_routing_exception(request)
+                rv = await view(**request.view_args)
+        except Exception as e:
+            rv = flask_app.handle_user_exception(e)
+        response = flask_app.finalize_request(rv)
+    except Exception as e:
+        error = e
+        response = flask_app.handle_exception(e)
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": response.get_data()})
+    finally:
+        response.close()
+        ctx.pop(error)
+
+
+async def read_body(receive):
+    chunks = []
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
@@ -0,0 +1,127 @@
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hashes running at once across all worker processes; bcrypt releases the GIL, so one per core
+BCRYPT_CORES = int(os.getenv("BCRYPT_CORES", str(os.cpu_count() or 1)))
+# Same default as gunicorn.conf.py
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(2 * (os.cpu_count() or 1) + 1)))
+# Each process's share of the cores, rounded up so a busy worker can use a core an idle one leaves free
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(math.ceil(BCRYPT_CORES / WEB_WORKERS))))
+# Hashes allowed to wait for a worker before new ones are rejected
+BCRYPT_QUEUE_SIZE = int(os.getenv("BCRYPT_QUEUE_SIZE", str(4 * BCRYPT_WORKERS)))
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_RETRY_AFTER_SECONDS = int(os.getenv("BCRYPT_RETRY_AFTER_SECONDS", "1"))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_slots = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_QUEUE_SIZE)
+# Created at import, so with preload_app the gunicorn workers inherit one machine-wide budget
+_cores = multiprocessing.BoundedSemaphore(BCRYPT_CORES)
+_counters_lock = threading.Lock()
+_counters = {"in_flight": 0, "completed": 0, "rejected": 0, "rehashed": 0}
+
+
+class PoolSaturated(Exception):
+    """
+    Raised when every worker is busy and the queue is full; callers answer 503 with Retry-After
+    """
+
+    def __init__(self, retry_after=BCRYPT_RETRY_AFTER_SECONDS):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def _release(future):
+    _slots.release()
+    _count("in_flight", -1)
+    _count("completed")
+
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        _count("rejected")
+        raise PoolSaturated()
+    _count("in_flight")
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        _count("in_flight", -1)
+        raise
+    future.add_done_callback(_release)
+    return future
+
+
+def _hash(password, rounds):
+    import bcrypt
+    with _cores:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _check(password, stored_hash):
+    import bcrypt
+    with _cores:
+        return bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8'))
+
+
+def hash_password(password, rounds=None):
+    """
+    Hashes on the bounded pool at BCRYPT_ROUNDS, raises PoolSaturated under overload
+    """
+    return _submit(_hash, password, rounds or BCRYPT_ROUNDS).result()
+
+
+def verify_password(password, stored_hash):
+    """
+    Checks on the bounded pool, raises PoolSaturated under overload
+    """
+    return _submit(_check, password, stored_hash).result()
+
+
+def hash_rounds(stored_hash):
+    # Hashes look like $2b$12$<salt+digest>
+    return int(stored_hash.split('$')[2])
+
+
+def needs_rehash(stored_hash):
+    return hash_rounds(stored_hash) != BCRYPT_ROUNDS
+
+
+def rehash_later(password, save):
+    """
+    Re-hashes at the current work factor in the background and passes the new hash to save().
+    Skipped when the pool is busy; the next login tries again.
+    """
+    def run():
+        new_hash = _hash(password, BCRYPT_ROUNDS)
+        try:
+            save(new_hash)
+            _count("rehashed")
+        except Exception as e:
+            print(f"Error saving rehashed password: {e}")
+
+    try:
+        _submit(run)
+    except PoolSaturated:
+        pass
+
+
+def stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["workers"] = BCRYPT_WORKERS
+    stats["cores"] = BCRYPT_CORES
+    stats["queue_size"] = BCRYPT_QUEUE_SIZE
+    stats["rounds"] = BCRYPT_ROUNDS
+    return stats
@@ -0,0 +1,246 @@
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from pymongo.errors import DuplicateKeyError
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# "memory" limits per worker process; "mongo" shares buckets and slots across workers
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+# Token bucket per user (or IP): refills at this rate up to the burst size
+GENERATION_RATE_PER_MINUTE = float(os.getenv("GENERATION_RATE_PER_MINUTE", "10"))
+GENERATION_BURST = float(os.getenv("GENERATION_BURST", "20"))
+# Generations one user may have running at once
+GENERATION_MAX_CONCURRENT = int(os.getenv("GENERATION_MAX_CONCURRENT", "2"))
+# A request costs one token plus one per this many bytes of input, so a large PDF costs more than a URL
+GENERATION_COST_BYTES = int(os.getenv("GENERATION_COST_BYTES", str(512 * 1024)))
+RATE_LIMIT_CONCURRENCY_RETRY_SECONDS = int(os.getenv("RATE_LIMIT_CONCURRENCY_RETRY_SECONDS", "5"))
+# A slot whose request never released it (the worker died) is freed after this long
+RATE_LIMIT_SLOT_LEASE_SECONDS = int(os.getenv("RATE_LIMIT_SLOT_LEASE_SECONDS", "600"))
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+class RateLimited(Exception):
+    """
+    Raised when a request is over its rate or concurrency limit; callers answer 429 with Retry-After
+    """
+
+    def __init__(self, retry_after, reason):
+        super().__init__(f"Generation {reason} limit reached")
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def request_cost(input_bytes):
+    """
+    Tokens a request takes from the bucket, never more than the bucket holds
+    """
+    return min(GENERATION_BURST, 1 + (input_bytes or 0) // GENERATION_COST_BYTES)
+
+
+def refill(tokens, elapsed_seconds, rate=GENERATION_RATE_PER_MINUTE / 60, capacity=GENERATION_BURST):
+    return min(capacity, tokens + max(0.0, elapsed_seconds) * rate)
+
+
+def retry_after(tokens, cost, rate=GENERATION_RATE_PER_MINUTE / 60):
+    return max(1, math.ceil((cost - tokens) / rate))
+
+
+class MemoryStore:
+    """
+    Buckets and in-flight slots for this process, bounded to RATE_LIMIT_MAX_KEYS keys
+    """
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._slots = {}  # key -> in-flight count
+        self._lock = threading.Lock()
+
+    def take(self, key, cost):
+        """
+        Takes cost tokens and returns 0, or returns the seconds until they are available
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (GENERATION_BURST, now))
+            tokens = refill(tokens, now - updated_at)
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = retry_after(tokens, cost)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def acquire_slot(self, key):
+        with self._lock:
+            if self._slots.get(key, 0) >= GENERATION_MAX_CONCURRENT:
+                return None
+            self._slots[key] = self._slots.get(key, 0) + 1
+        return key
+
+    def release_slot(self, key, slot):
+        with self._lock:
+            remaining = self._slots.get(key, 0) - 1
+            if remaining > 0:
+                self._slots[key] = remaining
+            else:
+                self._slots.pop(key, None)
+
+    def in_flight(self):
+        with self._lock:
+            return sum(self._slots.values())
+
+
+class MongoStore:
+    """
+    Buckets and slots in a Mongo collection, so every worker process enforces the same limits.
+    Buckets are updated with optimistic concurrency on updated_at; slots are leases that expire.
+    """
+
+    def __init__(self, collection, attempts=5):
+        self.collection = collection
+        self.attempts = attempts
+        collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def take(self, key, cost):
+        _id = f"bucket:{key}"
+        for _ in range(self.attempts):
+            now = datetime.utcnow()
+            doc = self.collection.find_one({"_id": _id})
+            tokens = GENERATION_BURST
+            if doc is not None:
+                tokens = refill(doc["tokens"], (now - doc["updated_at"]).total_seconds())
+            wait = 0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = retry_after(tokens, cost)
+            # A bucket left alone long enough is full again, so the document can go
+            idle = (GENERATION_BURST - tokens) / (GENERATION_RATE_PER_MINUTE / 60)
+            fields = {"tokens": tokens, "updated_at": now, "expires_at": now + timedelta(seconds=idle + 60)}
+            if doc is None:
+                try:
+                    self.collection.insert_one({"_id": _id, **fields})
+                    return wait
+                except DuplicateKeyError:
+                    continue
+            result = self.collection.update_one({"_id": _id, "updated_at": doc["updated_at"]}, {"$set": fields})
+            if result.matched_count:
+                return wait
+        # Lost every race: someone else is hammering the same bucket
+        return 1
+
+    def acquire_slot(self, key):
+        _id = f"slots:{key}"
+        now = datetime.utcnow()
+        slot = uuid.uuid4().hex
+        expires_at = now + timedelta(seconds=RATE_LIMIT_SLOT_LEASE_SECONDS)
+        # Drop leases of requests that never released them
+        self.collection.update_one(
+            {"_id": _id},
+            {"$pull": {"slots": {"expires_at": {"$lt": now}}}, "$set": {"expires_at": expires_at}},
+            upsert=True
+        )
+        taken = self.collection.find_one_and_update(
+            {"_id": _id, f"slots.{GENERATION_MAX_CONCURRENT - 1}": {"$exists": False}},
+            {"$push": {"slots": {"id": slot, "expires_at": expires_at}}}
+        )
+        return slot if taken is not None else None
+
+    def release_slot(self, key, slot):
+        self.collection.update_one({"_id": f"slots:{key}"}, {"$pull": {"slots": {"id": slot}}})
+
+    def in_flight(self):
+        return None
+
+
+class Lease:
+    """
+    A granted request; release() frees its concurrency slot (idempotent)
+    """
+
+    def __init__(self, limiter, key, slot):
+        self.limiter = limiter
+        self.key = key
+        self.slot = slot
+        self._released = False
+
+    def release(self):
+        if self._released or self.slot is None:
+            return
+        self._released = True
+        self.limiter.release(self.key, self.slot)
+
+
+class Limiter:
+    def __init__(self, store=None):
+        self.store = store or MemoryStore()
+        self._counters_lock = threading.Lock()
+        self._counters = {"allowed": 0, "rate_limited": 0, "concurrency_limited": 0, "store_errors": 0}
+
+    def acquire(self, key, input_bytes=0):
+        """
+        Admits one generation for key (a user ID or client IP) or raises RateLimited.
+        The store failing lets the request through rather than failing it.
+        """
+        if not RATE_LIMIT_ENABLED:
+            return Lease(self, key, None)
+        try:
+            slot = self.store.acquire_slot(key)
+            if slot is None:
+                self._count("concurrency_limited")
+                raise RateLimited(RATE_LIMIT_CONCURRENCY_RETRY_SECONDS, "concurrency")
+            wait = self.store.take(key, request_cost(input_bytes))
+            if wait:
+                self.store.release_slot(key, slot)
+                self._count("rate_limited")
+                raise RateLimited(wait, "rate")
+        except RateLimited:
+            raise
+        except Exception as e:
+            print(f"Error checking rate limit for {key}: {e}")
+            self._count("store_errors")
+            return Lease(self, key, None)
+        self._count("allowed")
+        return Lease(self, key, slot)
+
+    def release(self, key, slot):
+        try:
+            self.store.release_slot(key, slot)
+        except Exception as e:
+            print(f"Error releasing generation slot for {key}: {e}")
+
+    def stats(self):
+        with self._counters_lock:
+            stats = dict(self._counters)
+        stats["enabled"] = RATE_LIMIT_ENABLED
+        stats["backend"] = type(self.store).__name__
+        stats["in_flight"] = self.store.in_flight()
+        return stats
+
+    def _count(self, name):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+
+limiter = Limiter()
+
+
+def setup(collection, backend=RATE_LIMIT_BACKEND):
+    """
+    Moves the limiter state to Mongo when RATE_LIMIT_BACKEND is "mongo"
+    """
+    if backend == "mongo":
+        limiter.store = MongoStore(collection)
+    return limiter
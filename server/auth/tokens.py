@@ -0,0 +1,88 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long a verified token is trusted without re-checking its signature
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified tokens: sha256(token) -> decoded claims.
+    An entry never outlives the token's own exp.
+    """
+
+    def __init__(self, max_entries=TOKEN_CACHE_MAX_ENTRIES, ttl=TOKEN_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # digest -> (expires_at, claims)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, digest):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(digest)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def set(self, digest, claims):
+        expires_at = time.time() + self.ttl
+        if isinstance(claims.get("exp"), (int, float)):
+            expires_at = min(expires_at, claims["exp"])
+        with self._lock:
+            self._entries[digest] = (expires_at, claims)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+token_cache = TokenCache()
+
+
+def bearer_token(header):
+    # Remove 'Bearer ' prefix if present
+    if header and header.startswith('Bearer '):
+        return header[7:]
+    return header
+
+
+def decode_token(token, secret):
+    """
+    Returns the token's claims, verifying the HS256 signature only on a cache miss.
+    Raises jwt.ExpiredSignatureError / jwt.InvalidTokenError like jwt.decode.
+    """
+    digest = hashlib.sha256(token.encode('utf-8')).digest()
+    claims = token_cache.get(digest)
+    if claims is None:
+        # Failures are not cached, so a bad token always gets the full check
+        claims = jwt.decode(token, secret, algorithms=['HS256'])
+        token_cache.set(digest, claims)
+    return claims
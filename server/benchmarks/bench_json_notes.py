@@ -0,0 +1,125 @@
+"""
+GET /notes serialization cost for a user with many notes: the previous path
+(list() + per-document str(_id) + stdlib jsonify) against the orjson provider
+streaming straight from the cursor. Mongo is replaced by an in-memory cursor stand-in,
+so only the Flask/serialization work is measured.
+
+Usage (from the server directory):
+    python benchmarks/bench_json_notes.py --notes 500 --note-kb 4 --runs 50
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId  # noqa: E402
+from flask import Flask, jsonify  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from config import json_provider  # noqa: E402
+
+
+class FakeCollection:
+    """
+    find() returns a fresh iterator over copies, like documents decoded from a cursor
+    """
+
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query=None, projection=None):
+        return (dict(document) for document in self.documents)
+
+
+def make_notes(count, note_kb):
+    user_id = str(ObjectId())
+    now = datetime.utcnow()
+    paragraph = "- **Photosynthesis** converts light energy into chemical energy in the chloroplast.\n"
+    content = paragraph * max(1, note_kb * 1024 // len(paragraph))
+    return [{
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "title": f"Note {index}",
+        "content": content,
+        "summary": content[:1024],
+        "created_at": now - timedelta(minutes=index),
+        "updated_at": now - timedelta(minutes=index),
+    } for index in range(count)]
+
+
+def previous_app(collection):
+    app = Flask("before")
+    app.json = DefaultJSONProvider(app)
+
+    @app.route("/notes")
+    def get_notes():
+        notes = list(collection.find({}, None))
+        for note in notes:
+            note['_id'] = str(note['_id'])
+        return jsonify({'notes': notes}), 200
+
+    return app
+
+
+def streaming_app(collection):
+    app = Flask("after")
+    app.json = json_provider.OrjsonProvider(app)
+
+    @app.route("/notes")
+    def get_notes():
+        return json_provider.stream_array(collection.find({}, None), 'notes'), 200
+
+    return app
+
+
+def run(name, app, runs):
+    client = app.test_client()
+    client.get("/notes").get_data()  # warm up
+    timings = []
+    size = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        response = client.get("/notes")
+        size = len(response.get_data())
+        timings.append(time.perf_counter() - start)
+    return {
+        "path": name,
+        "runs": runs,
+        "bytes": size,
+        "mean_ms": round(statistics.mean(timings) * 1000, 2),
+        "p50_ms": round(statistics.median(timings) * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--note-kb", type=int, default=4, help="markdown content size per note")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    collection = FakeCollection(make_notes(args.notes, args.note_kb))
+    results = [
+        run("before", previous_app(collection), args.runs),
+        run("after", streaming_app(collection), args.runs),
+    ]
+    speedup = round(results[0]["mean_ms"] / results[1]["mean_ms"], 2)
+
+    if args.json:
+        print(json.dumps({"notes": args.notes, "results": results, "speedup": speedup}, indent=2))
+        return
+    print(f"{'path':<8}{'bytes':>10}{'mean ms':>10}{'p50 ms':>10}{'max ms':>10}")
+    for result in results:
+        print(f"{result['path']:<8}{result['bytes']:>10}{result['mean_ms']:>10}{result['p50_ms']:>10}{result['max_ms']:>10}")
+    print(f"speedup: {speedup}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+Load generator for every route in app.py. By default the app runs in-process on a threaded
+server with local stand-ins for Mongo (mongomock), Gemini and YouTube, so the numbers measure
+this code base rather than the network. Each route is driven at every --concurrency level and
+reported with throughput and p50/p95/p99 latency.
+
+Usage (from the server directory):
+    python benchmarks/bench_load.py --concurrency 1 8 32 --requests 200
+    python benchmarks/bench_load.py --routes notes_list note_get transcribe --gemini-latency 0.8
+    python benchmarks/bench_load.py --json --output results/load-$(git rev-parse --short HEAD).json
+    python benchmarks/bench_load.py --url http://127.0.0.1:5000  # an already running server
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import standins  # noqa: E402
+
+import requests  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+class User:
+    def __init__(self, email, token):
+        self.email = email
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.note_ids = []
+        self.questions_ids = []
+        self.test_ids = []
+
+
+class Context:
+    """
+    Shared state of a run: base URL, signed-up users with their documents, the sample PDF
+    """
+
+    def __init__(self, base_url, videos, pdf):
+        self.base_url = base_url
+        self.videos = videos
+        self.pdf = pdf
+        self.users = []
+        self._local = threading.local()
+
+    def session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def call(self, method, path, **kwargs):
+        return self.session().request(method, self.base_url + path, timeout=600, **kwargs)
+
+    def user(self):
+        return random.choice(self.users)
+
+
+def signup(ctx, notes_per_user):
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    response = ctx.call("POST", "/register", json={"name": "Bench", "email": email, "password": PASSWORD})
+    response.raise_for_status()
+    user = User(email, response.json()["token"])
+    for index in range(notes_per_user):
+        user.note_ids.append(create_note(ctx, user, index))
+    return user
+
+
+def create_note(ctx, user, index=0):
+    response = ctx.call("POST", "/notes", headers=user.headers, json={
+        "title": f"Photosynthesis {index}",
+        "content": standins.text_of_size(4000),
+        "summary": standins.text_of_size(1000),
+    })
+    response.raise_for_status()
+    return response.json()["note"]["_id"]
+
+
+def create_questions(ctx, user):
+    response = ctx.call("POST", "/questions", headers=user.headers, json={"note_id": random.choice(user.note_ids)})
+    response.raise_for_status()
+    return response.json()["_id"]
+
+
+def create_test(ctx, user):
+    response = ctx.call("POST", "/tests", headers=user.headers, json={"note_ids": user.note_ids[:3]})
+    response.raise_for_status()
+    return response.json()["test"]["_id"]
+
+
+def pdf_upload(ctx):
+    return {"files": {"pdf": ("bench.pdf", ctx.pdf, "application/pdf")}}
+
+
+def submit_job(ctx):
+    response = ctx.call("POST", "/transcribe?async=true", json={"yturl": standins.video_url(random.randrange(ctx.videos))})
+    response.raise_for_status()
+    return response.json()["job_id"]
+
+
+def scenarios():
+    """
+    route name -> prepare(ctx, user) returning the (method, path, kwargs) of the timed request.
+    Untimed setup (a note to delete, a job to poll) happens inside prepare.
+    """
+    def auth(user, **kwargs):
+        return dict(kwargs, headers=user.headers)
+
+    return {
+        "home": lambda ctx, user: ("GET", "/", {}),
+        "about": lambda ctx, user: ("GET", "/about", {}),
+        "contact": lambda ctx, user: ("GET", "/contact", {}),
+        "ready": lambda ctx, user: ("GET", "/ready", {}),
+        "cache_stats": lambda ctx, user: ("GET", "/cache-stats", {}),
+        "pool_stats": lambda ctx, user: ("GET", "/pool-stats", {}),
+        "metrics": lambda ctx, user: ("GET", "/metrics", {}),
+        "register": lambda ctx, user: ("POST", "/register", {"json": {
+            "name": "Bench", "email": f"bench-{uuid.uuid4().hex[:12]}@example.com", "password": PASSWORD
+        }}),
+        "login": lambda ctx, user: ("POST", "/login", {"json": {"email": user.email, "password": PASSWORD}}),
+        "verify_token": lambda ctx, user: ("POST", "/verify-token", auth(user)),
+        "notes_list": lambda ctx, user: ("GET", "/notes", auth(user)),
+        "notes_page": lambda ctx, user: ("GET", "/notes?limit=20&view=summary", auth(user)),
+        "note_create": lambda ctx, user: ("POST", "/notes", auth(user, json={
+            "title": "Calvin cycle", "content": standins.text_of_size(4000)
+        })),
+        "note_get": lambda ctx, user: ("GET", f"/notes/{random.choice(user.note_ids)}", auth(user)),
+        "note_update": lambda ctx, user: ("PUT", f"/notes/{random.choice(user.note_ids)}", auth(user, json={
+            "title": "Light reactions", "content": standins.text_of_size(4000)
+        })),
+        "note_delete": lambda ctx, user: ("DELETE", f"/notes/{create_note(ctx, user)}", auth(user)),
+        "questions_create": lambda ctx, user: ("POST", "/questions", auth(user, json={
+            "note_id": random.choice(user.note_ids)
+        })),
+        "questions_list": lambda ctx, user: ("GET", "/questions", auth(user)),
+        "question_get": lambda ctx, user: ("GET", f"/questions/{random.choice(user.questions_ids)}", auth(user)),
+        "question_delete": lambda ctx, user: ("DELETE", f"/questions/{create_questions(ctx, user)}", auth(user)),
+        "tests_create": lambda ctx, user: ("POST", "/tests", auth(user, json={"note_ids": user.note_ids[:3]})),
+        "tests_list": lambda ctx, user: ("GET", "/tests", auth(user)),
+        "test_get": lambda ctx, user: ("GET", f"/tests/{random.choice(user.test_ids)}", auth(user)),
+        "test_delete": lambda ctx, user: ("DELETE", f"/tests/{create_test(ctx, user)}", auth(user)),
+        "transcribe": lambda ctx, user: ("POST", "/transcribe", {"json": {
+            "yturl": standins.video_url(random.randrange(ctx.videos))
+        }}),
+        "transcribe_stream": lambda ctx, user: ("POST", "/transcribe/stream", {"json": {
+            "yturl": standins.video_url(random.randrange(ctx.videos))
+        }}),
+        "process_pdf": lambda ctx, user: ("POST", "/process-pdf", pdf_upload(ctx)),
+        "process_pdf_stream": lambda ctx, user: ("POST", "/process-pdf/stream", pdf_upload(ctx)),
+        "job_get": lambda ctx, user: ("GET", f"/jobs/{submit_job(ctx)}", {}),
+    }
+
+
+def drive(ctx, name, prepare, concurrency, total):
+    """
+    Sends `total` requests for one route from `concurrency` threads; latency covers the full body
+    """
+    latencies = []
+    statuses = Counter()
+    errors = Counter()
+    lock = threading.Lock()
+    remaining = [total]
+
+    def worker():
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            try:
+                method, path, kwargs = prepare(ctx, ctx.user())
+                started = time.perf_counter()
+                response = ctx.call(method, path, **kwargs)
+                response.content
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                with lock:
+                    errors[type(e).__name__] += 1
+                continue
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(response.status_code)] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    server_errors = sum(count for status, count in statuses.items() if status.startswith("5"))
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        "route": name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": server_errors + sum(errors.values()),
+        "statuses": dict(statuses),
+        "exceptions": dict(errors),
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else None,
+        "mean_ms": ms(statistics.mean(latencies)) if latencies else None,
+        "p50_ms": ms(standins.percentile(latencies, 0.50)),
+        "p95_ms": ms(standins.percentile(latencies, 0.95)),
+        "p99_ms": ms(standins.percentile(latencies, 0.99)),
+        "max_ms": ms(latencies[-1] if latencies else None),
+    }
+
+
+def start_server(args):
+    """
+    Installs the stand-ins and serves app.py on a free local port
+    """
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    standins.install_mongo(args.mongo_uri)
+    import app
+
+    standins.install_gemini(args.gemini_latency, args.gemini_output_chars, args.gemini_jitter)
+    standins.install_youtube(args.youtube_latency, args.youtube_snippets)
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server("127.0.0.1", 0, app.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, name="bench-server", daemon=True).start()
+    return server, app, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    all_routes = list(scenarios())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=100, help="requests per route and concurrency level")
+    parser.add_argument("--routes", nargs="+", choices=all_routes, default=all_routes, metavar="ROUTE",
+                        help=f"subset of: {', '.join(all_routes)}")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--notes-per-user", type=int, default=20)
+    parser.add_argument("--videos", type=int, default=50, help="distinct video IDs /transcribe picks from")
+    parser.add_argument("--pdf-pages", type=int, default=20)
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="seconds per fake Gemini call")
+    parser.add_argument("--gemini-jitter", type=float, default=0.1)
+    parser.add_argument("--gemini-output-chars", type=int, default=2000)
+    parser.add_argument("--youtube-latency", type=float, default=0.3)
+    parser.add_argument("--youtube-snippets", type=int, default=600)
+    parser.add_argument("--mongo-uri", help="use this Mongo instead of the in-memory stand-in")
+    parser.add_argument("--url", help="drive an already running server instead of starting one with stand-ins")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        server, app, base_url = start_server(args)
+
+    ctx = Context(base_url, args.videos, standins.make_pdf(args.pdf_pages))
+    ctx.users = [signup(ctx, args.notes_per_user) for _ in range(args.users)]
+    for user in ctx.users:
+        user.questions_ids.append(create_questions(ctx, user))
+        user.test_ids.append(create_test(ctx, user))
+
+    table = scenarios()
+    results = []
+    if not args.json:
+        print(f"{'route':<20}{'conc':>5}{'reqs':>7}{'errors':>7}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in args.routes:
+        for concurrency in args.concurrency:
+            result = drive(ctx, name, table[name], concurrency, args.requests)
+            results.append(result)
+            if args.json:
+                continue
+            if not result["requests"]:
+                print(f"{name:<20}{concurrency:>5} failed: {result['exceptions']}", flush=True)
+                continue
+            print(f"{name:<20}{concurrency:>5}{result['requests']:>7}{result['errors']:>7}{result['throughput_rps']:>10}"
+                  f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}", flush=True)
+
+    report = {
+        "benchmark": "load",
+        "commit": standins.git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "target": "external" if args.url else "in-process stand-ins",
+        "settings": {key: value for key, value in vars(args).items() if key not in ("json", "output", "routes")},
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    if server is not None:
+        server.shutdown()
+        # Lets queued jobs from job_get finish instead of failing at interpreter exit
+        app.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Microbenchmarks for the hot paths behind the routes, with no network involved:
+
+- transcript: yt.fetch_transcript assembling captions from the fake YouTube source, and
+  yt.get_transcription answering from the transcript cache
+- pdf: extract.extract_pages on generated sample PDFs (and any --pdf files), inline and on the pool
+- serialization: GET /notes bodies, streamed from the cursor and as a 20-item page
+
+Usage (from the server directory):
+    python benchmarks/bench_micro.py --runs 20
+    python benchmarks/bench_micro.py --only pdf --pdf ~/Downloads/textbook.pdf
+    python benchmarks/bench_micro.py --json --output results/micro-$(git rev-parse --short HEAD).json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import standins  # noqa: E402
+from benchmarks.bench_json_notes import FakeCollection, make_notes  # noqa: E402
+
+# The pool benchmark uses every core, not one gunicorn worker's share
+POOL_WORKERS = os.cpu_count() or 1
+
+
+def measure(name, fn, runs, **details):
+    fn()  # warm up
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return dict(
+        details,
+        name=name,
+        runs=runs,
+        mean_ms=round(statistics.mean(timings) * 1000, 3),
+        p50_ms=round(standins.percentile(timings, 0.50) * 1000, 3),
+        p95_ms=round(standins.percentile(timings, 0.95) * 1000, 3),
+        max_ms=round(timings[-1] * 1000, 3),
+    )
+
+
+def bench_transcript(args):
+    from youtube import transcript_store, yt
+
+    results = []
+    for snippets in args.snippets:
+        standins.install_youtube(latency=0, snippets=snippets)
+        counter = iter(range(10 ** 9))
+
+        def assemble():
+            # A new video ID every run, so each one is a cache miss
+            yt.fetch_transcript(f"micro{next(counter):06d}")
+
+        results.append(measure("transcript_assembly", assemble, args.runs, snippets=snippets))
+        transcript_store.transcript_store.clear()
+
+        url = standins.video_url(0)
+        results.append(measure("transcript_cached", lambda: yt.get_transcription(url), args.runs, snippets=snippets))
+    return results
+
+
+def bench_pdf(args):
+    from pdf_handling import extract
+
+    samples = [(f"generated-{pages}p", standins.make_pdf(pages)) for pages in args.pdf_pages]
+    for path in args.pdf:
+        with open(path, "rb") as f:
+            samples.append((os.path.basename(path), f.read()))
+
+    results = []
+    try:
+        for name, pdf_bytes in samples:
+            page_count = extract.extract_pages(pdf_bytes, workers=1)["page_count"]
+            results.append(measure(
+                "pdf_extract_inline", lambda: extract.extract_pages(pdf_bytes, workers=1), args.runs,
+                sample=name, pages=page_count, bytes=len(pdf_bytes)
+            ))
+            results.append(measure(
+                "pdf_extract_pool", lambda: extract.extract_pages(pdf_bytes, workers=POOL_WORKERS, parallel_min_pages=1),
+                args.runs, sample=name, pages=page_count, bytes=len(pdf_bytes), workers=POOL_WORKERS
+            ))
+    finally:
+        extract.shutdown()
+    return results
+
+
+def bench_serialization(args):
+    from flask import Flask
+
+    from config import json_provider
+
+    collection = FakeCollection(make_notes(args.notes, args.note_kb))
+    app = Flask("micro")
+    app.json = json_provider.OrjsonProvider(app)
+
+    @app.route("/notes")
+    def stream_notes():
+        return json_provider.stream_array(collection.find({}, None), 'notes'), 200
+
+    @app.route("/notes/page")
+    def page_notes():
+        return app.json.response({'notes': list(collection.find({}, None))[:20], 'next_cursor': None}), 200
+
+    client = app.test_client()
+    return [
+        measure("notes_stream", lambda: client.get("/notes").get_data(), args.runs, notes=args.notes, note_kb=args.note_kb),
+        measure("notes_page", lambda: client.get("/notes/page").get_data(), args.runs, notes=20, note_kb=args.note_kb),
+    ]
+
+
+BENCHMARKS = {
+    "transcript": bench_transcript,
+    "pdf": bench_pdf,
+    "serialization": bench_serialization,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--snippets", type=int, nargs="+", default=[600, 6000], help="captions per fake transcript")
+    parser.add_argument("--pdf-pages", type=int, nargs="+", default=[10, 120], help="sizes of the generated PDFs")
+    parser.add_argument("--pdf", nargs="*", default=[], help="extra PDF files to extract")
+    parser.add_argument("--notes", type=int, default=500)
+    parser.add_argument("--note-kb", type=int, default=4)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.only:
+        results.extend(BENCHMARKS[name](args))
+
+    report = {
+        "benchmark": "micro",
+        "commit": standins.git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": sys.version.split()[0],
+        "settings": {key: value for key, value in vars(args).items() if key not in ("json", "output")},
+        "results": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'benchmark':<22}{'detail':<22}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for result in results:
+        detail = result.get("sample") or f"{result.get('snippets') or result.get('notes')}"
+        print(f"{result['name']:<22}{detail:<22}{result['mean_ms']:>10}{result['p50_ms']:>10}"
+              f"{result['p95_ms']:>10}{result['max_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Login throughput of the bcrypt pool: password verifications per second, overall and per core.
+
+The pool is sized by --workers (default: one thread per core) rather than by the per-gunicorn-worker
+share the app uses, and per-core throughput divides by the cores the pool can actually use.
+
+Usage (from the server directory):
+    python benchmarks/bench_passwords.py --rounds 12 --clients 16 --seconds 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CPU_COUNT = os.cpu_count() or 1
+
+
+def cores_used(passwords):
+    return min(passwords.BCRYPT_WORKERS, passwords.BCRYPT_CORES, CPU_COUNT)
+
+
+def run(passwords, clients, seconds, stored_hash):
+    deadline = time.perf_counter() + seconds
+    counts = {"ok": 0, "rejected": 0}
+    lock = threading.Lock()
+
+    def client():
+        while time.perf_counter() < deadline:
+            try:
+                passwords.verify_password("correct horse battery staple", stored_hash)
+                outcome = "ok"
+            except passwords.PoolSaturated:
+                outcome = "rejected"
+                time.sleep(0.001)
+            with lock:
+                counts[outcome] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    logins_per_second = counts["ok"] / elapsed
+    return {
+        "clients": clients,
+        "workers": passwords.BCRYPT_WORKERS,
+        "cores": cores_used(passwords),
+        "rounds": passwords.hash_rounds(stored_hash),
+        "logins": counts["ok"],
+        "rejected": counts["rejected"],
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins_per_second, 2),
+        "logins_per_second_per_core": round(logins_per_second / cores_used(passwords), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=CPU_COUNT, help="bcrypt pool threads (default: CPU count)")
+    parser.add_argument("--rounds", type=int, default=None, help="work factor (default: BCRYPT_ROUNDS)")
+    parser.add_argument("--clients", type=int, nargs="+", default=None)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    # The pool is built when auth.passwords is imported
+    os.environ["BCRYPT_WORKERS"] = str(args.workers)
+    os.environ["BCRYPT_CORES"] = str(args.workers)
+    from auth import passwords
+
+    clients = args.clients or [1, args.workers, 4 * args.workers]
+    stored_hash = passwords.hash_password("correct horse battery staple", rounds=args.rounds)
+    results = [run(passwords, count, args.seconds, stored_hash) for count in clients]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'clients':>8}{'workers':>9}{'cores':>7}{'rounds':>8}{'logins/s':>11}{'per core':>10}{'rejected':>10}")
+    for result in results:
+        print(f"{result['clients']:>8}{result['workers']:>9}{result['cores']:>7}{result['rounds']:>8}"
+              f"{result['logins_per_second']:>11}{result['logins_per_second_per_core']:>10}{result['rejected']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start import cost of the server, measured with `python -X importtime -c "import app"`.
+
+Reports the total import time, the slowest modules, and any heavy dependency that is
+imported eagerly although it should load on first use. Exits 1 when the median total
+exceeds the budget or a lazy dependency shows up, so it can gate releases.
+
+Usage (from the server directory):
+    python benchmarks/bench_startup.py --runs 5 --top 15
+    python benchmarks/bench_startup.py --budget-ms 150 --json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median cumulative import time of `app`, in milliseconds. Tracked across releases;
+# raise it only together with the change that needs it.
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "200"))
+
+# Loaded on first use; importing any of them at startup is a regression
+LAZY_MODULES = ("google.genai", "pydantic", "PyPDF2", "youtube_transcript_api", "bcrypt")
+
+
+def measure(module):
+    env = dict(os.environ)
+    # Placeholders so configuration code can run; nothing connects at import
+    env.setdefault("GEMINI_API", "startup-benchmark")
+    env.setdefault("MONGO_URI", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "startup_benchmark")
+    env.setdefault("COLLECTION_NAME", "users")
+    code = f"import sys, json; import {module}; print(json.dumps(sorted(sys.modules)))"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app", help="module to import")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    totals = [timings[args.module][1] / 1000 for timings, _ in runs]
+    total_ms = statistics.median(totals)
+
+    # Slowest modules by cumulative time, from the run closest to the median
+    timings, modules = min(runs, key=lambda run: abs(run[0][args.module][1] / 1000 - total_ms))
+    slowest = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[1:args.top + 1]
+    eager = [name for name in LAZY_MODULES if name in modules]
+
+    result = {
+        "module": args.module,
+        "runs": args.runs,
+        "total_ms": round(total_ms, 1),
+        "min_ms": round(min(totals), 1),
+        "max_ms": round(max(totals), 1),
+        "budget_ms": args.budget_ms,
+        "within_budget": total_ms <= args.budget_ms,
+        "eager_lazy_modules": eager,
+        "slowest": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1), "self_ms": round(own / 1000, 1)}
+            for name, (own, cumulative) in slowest
+        ],
+    }
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {args.module}: {result['total_ms']} ms median over {args.runs} runs "
+              f"(min {result['min_ms']}, max {result['max_ms']}, budget {args.budget_ms})")
+        print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+        for entry in result["slowest"]:
+            print(f"{entry['cumulative_ms']:>14}{entry['self_ms']:>10}  {entry['module']}")
+        if eager:
+            print(f"Imported at startup but expected to load on first use: {', '.join(eager)}")
+
+    if not result["within_budget"] or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
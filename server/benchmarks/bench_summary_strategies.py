@@ -0,0 +1,66 @@
+"""
+Compares wall-clock time of the generate_summary strategies against a fake Gemini client.
+
+Usage (from the server directory):
+    python benchmarks/bench_summary_strategies.py --latency 0.8 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GEMINI_API", "benchmark")
+
+from benchmarks import standins  # noqa: E402
+from genai import genai  # noqa: E402
+from genai import cache as llm_cache  # noqa: E402
+
+
+def run(strategy, transcript, runs):
+    timings = []
+    calls = 0
+    for _ in range(runs):
+        llm_cache.response_cache.clear()
+        before = genai.client.models.calls
+        start = time.perf_counter()
+        genai.generate_summary(transcript, strategy=strategy)
+        timings.append(time.perf_counter() - start)
+        calls = genai.client.models.calls - before
+    return {
+        "strategy": strategy,
+        "runs": runs,
+        "model_calls": calls,
+        "mean_s": round(statistics.mean(timings), 4),
+        "min_s": round(min(timings), 4),
+        "max_s": round(max(timings), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake round trip latency in seconds")
+    parser.add_argument("--per-kb", type=float, default=0.002, help="extra seconds per KB of input")
+    parser.add_argument("--output-chars", type=int, default=200, help="size of each fake answer")
+    parser.add_argument("--transcript-kb", type=int, default=60, help="size of the fake transcript")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", action="store_true", help="print machine-readable results")
+    args = parser.parse_args()
+
+    standins.install_gemini(latency=args.latency, output_chars=args.output_chars, per_kb=args.per_kb)
+    transcript = ("the chloroplast converts light energy into chemical energy " * 20 + "\n") * (args.transcript_kb)
+
+    results = [run(strategy, transcript, args.runs) for strategy in ("sequential", "concurrent", "structured")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'strategy':<12}{'calls':>7}{'mean s':>10}{'min s':>10}{'max s':>10}")
+    for result in results:
+        print(f"{result['strategy']:<12}{result['model_calls']:>7}{result['mean_s']:>10}{result['min_s']:>10}{result['max_s']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Local stand-ins for the services the API talks to, shared by the benchmarks:
+
+- Mongo: mongomock behind the pymongo client (or a real local mongod when a URI is given)
+- Gemini: a fake client with configurable latency and output size
+- YouTube: a fake transcript source with configurable latency and caption count
+
+Install them before the first request; the app connects lazily, so importing app first is fine.
+mongomock is a benchmark-only dependency: pip install -r benchmarks/requirements.txt
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings read at import time by the app modules
+os.environ.setdefault("GEMINI_API", "benchmark")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "notezy_benchmark")
+os.environ.setdefault("COLLECTION_NAME", "users")
+# The load generator is one client hammering every route; per-user limits would cap it, not the server
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+PARAGRAPH = "- **Photosynthesis** converts light energy into chemical energy in the chloroplast.\n"
+
+
+def text_of_size(chars):
+    return (PARAGRAPH * (chars // len(PARAGRAPH) + 1))[:max(1, chars)]
+
+
+# ---- Mongo ----
+
+def install_mongo(uri=None):
+    """
+    Points the app at a real Mongo when uri is given, otherwise at one shared in-memory mongomock
+    """
+    from config import app_setup
+
+    if uri:
+        os.environ["MONGO_URI"] = uri
+        return None
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("mongomock is required for the in-memory Mongo stand-in: "
+                         "pip install -r benchmarks/requirements.txt, or pass --mongo-uri")
+
+    client = mongomock.MongoClient()
+    # Pool and listener options are meaningless for mongomock and are dropped
+    app_setup.MongoClient = lambda *args, **kwargs: client
+    return client
+
+
+# ---- Gemini ----
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    """
+    Answers every instruction the way the parsers expect, after `latency` seconds (± jitter)
+    plus `per_kb` seconds per KB of input
+    """
+
+    def __init__(self, latency, output_chars, jitter, per_kb=0.0):
+        self.latency = latency
+        self.output_chars = output_chars
+        self.jitter = jitter
+        self.per_kb = per_kb
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def delay(self, contents=""):
+        with self._lock:
+            self.calls += 1
+        upload = self.per_kb * len(contents) / 1024
+        return max(0.0, self.latency + upload + random.uniform(-self.jitter, self.jitter))
+
+    def answer(self, config):
+        from genai import genai
+
+        if config.response_schema is not None:
+            return json.dumps({
+                "is_educational": True,
+                "title": "Photosynthesis and the Calvin cycle",
+                "summary": text_of_size(self.output_chars),
+            })
+        if config.system_instruction == genai.content_validation_instruction:
+            return "EDUCATIONAL"
+        if config.system_instruction == genai.title_instruction:
+            return "Photosynthesis and the Calvin cycle"
+        return text_of_size(self.output_chars)
+
+    def generate_content(self, model, contents, config):
+        time.sleep(self.delay(contents))
+        return FakeResponse(self.answer(config))
+
+    def generate_content_stream(self, model, contents, config):
+        text = self.answer(config)
+        chunks = [text[start:start + 200] for start in range(0, len(text), 200)]
+        pause = self.delay(contents) / max(1, len(chunks))
+        for chunk in chunks:
+            time.sleep(pause)
+            yield FakeResponse(chunk)
+
+
+class FakeAsyncModels:
+    def __init__(self, models):
+        self.models = models
+
+    async def generate_content(self, model, contents, config):
+        await asyncio.sleep(self.models.delay(contents))
+        return FakeResponse(self.models.answer(config))
+
+
+class FakeAio:
+    def __init__(self, models):
+        self.models = FakeAsyncModels(models)
+
+
+class FakeGemini:
+    def __init__(self, latency=0.5, output_chars=2000, jitter=0.0, per_kb=0.0):
+        self.models = FakeModels(latency, output_chars, jitter, per_kb)
+        self.aio = FakeAio(self.models)
+
+
+def install_gemini(latency=0.5, output_chars=2000, jitter=0.0, per_kb=0.0):
+    from genai import genai
+
+    client = FakeGemini(latency, output_chars, jitter, per_kb)
+    genai.set_client(client)
+    return client
+
+
+# ---- YouTube ----
+
+class FakeSnippet:
+    def __init__(self, text, start, duration):
+        self.text = text
+        self.start = start
+        self.duration = duration
+
+
+class FakeTranscript(list):
+    language_code = "en"
+    is_generated = False
+
+
+class FakeTranscriptApi:
+    """
+    YouTubeTranscriptApi-shaped source returning `snippets` captions after `latency` seconds
+    """
+
+    def __init__(self, latency=0.3, snippets=600):
+        self.latency = latency
+        self.snippets = snippets
+        self.calls = 0
+
+    def fetch(self, video_id, languages=None):
+        self.calls += 1
+        time.sleep(self.latency)
+        return FakeTranscript(
+            FakeSnippet(f"at {index} seconds the chloroplast converts light into chemical energy", index * 2.0, 2.0)
+            for index in range(self.snippets)
+        )
+
+
+def install_youtube(latency=0.3, snippets=600):
+    from youtube import yt
+
+    api = FakeTranscriptApi(latency, snippets)
+    yt.ytt_api = api
+    return api
+
+
+def video_url(index):
+    # 11-character IDs like YouTube's
+    return f"https://www.youtube.com/watch?v=bench{index:06d}"
+
+
+# ---- PDF ----
+
+def make_pdf(pages, lines_per_page=40):
+    """
+    A text-only PDF with `pages` pages, built by hand so no PDF writer is needed
+    """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{3 + 2 * page} 0 R" for page in range(pages))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    font_id = 3 + 2 * pages
+    for page in range(pages):
+        objects.append((
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + 2 * page} 0 R >>"
+        ).encode())
+        lines = " ".join(
+            f"(Page {page + 1} line {line}: the chloroplast converts light energy) Tj 0 -14 Td"
+            for line in range(lines_per_page)
+        )
+        body = f"BT /F1 10 Tf 40 750 Td {lines} ET"
+        objects.append(f"<< /Length {len(body)} >>\nstream\n{body}\nendstream".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def git_commit():
+    """
+    Short hash of the checked-out commit, recorded with results so runs can be diffed
+    """
+    import subprocess
+
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
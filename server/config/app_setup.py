@@ -1,34 +1,171 @@
-from flask import Flask
+from flask import Flask, request
 from flask_cors import CORS
+from flask_compress import Compress
 from pymongo import MongoClient
 from dotenv import load_dotenv
+from collections.abc import Mapping
 import os
+import threading
+import time
+from config import indexes
+from config import mongo_pool
+from config import json_provider
+from aio import event_loop
 
 load_dotenv()
 
+# After a failed start a process answers 503 for this long before trying to connect again
+MONGO_SETUP_RETRY_SECONDS = float(os.getenv("MONGO_SETUP_RETRY_SECONDS", "5"))
+
+class MongoUnavailable(Exception):
+  """
+  Raised by get_mongo() while the process can't connect to Mongo or finish its start hooks
+  """
+
+class App(Flask):
+  """
+  Flask app whose async views run on the process event loop when served over WSGI.
+  asgi.py awaits them directly, so there they don't hold a thread while waiting.
+  """
+
+  def async_to_sync(self, func):
+    def run(*args, **kwargs):
+      # Read the body on the request thread, so parsing it on the loop doesn't wait on the socket
+      request.get_data(cache=True)
+      return event_loop.run(func(*args, **kwargs))
+    return run
+
+
 def flask_setup():
-  app = Flask(__name__)
+  app = App(__name__)
+  # orjson-backed jsonify that understands ObjectId and datetime
+  app.json = json_provider.OrjsonProvider(app)
   CORS(app)
+  # gzip/brotli negotiated from Accept-Encoding; small bodies aren't worth compressing
+  app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+  # Streamed JSON lists; gzip has no streaming compressor in flask-compress
+  app.config['COMPRESS_ALGORITHM_STREAMING'] = ['br', 'deflate']
+  app.config['COMPRESS_MIN_SIZE'] = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+  app.config['COMPRESS_BR_LEVEL'] = int(os.getenv('COMPRESS_BR_LEVEL', '4'))
+  app.config['COMPRESS_LEVEL'] = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+  Compress(app)
     # JWT Secret Key - In production, use a strong random key
   app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production')
   return app
 
 
-def mongodb_setup():
+def mongodb_setup(ensure=None, client=None):
   uri = os.getenv("MONGO_URI")
   db_name = os.getenv("DB_NAME")
   collection_name = os.getenv("COLLECTION_NAME")
 
-  client = MongoClient(uri)
+  client = client or MongoClient(uri, **mongo_pool.client_options(mongo_pool.pool))
   db = client[db_name]
   users_collection = db[collection_name]
   notes_collection = db["notes"]
   questions_collection = db["questions"]
   tests_collection = db["tests"]
+  llm_cache_collection = db["llm_cache"]
+  transcripts_collection = db["transcripts"]
+  jobs_collection = db["jobs"]
+  inflight_collection = db["inflight"]
+  rate_limits_collection = db["rate_limits"]
+  pdf_cache_collection = db["pdf_cache"]
   mongo = {
+    "client":client,
+    "database":db,
     "users_collection":users_collection,
     "notes_collection":notes_collection,
     "questions_collection":questions_collection,
-    "tests_collection":tests_collection
+    "tests_collection":tests_collection,
+    "llm_cache_collection":llm_cache_collection,
+    "transcripts_collection":transcripts_collection,
+    "jobs_collection":jobs_collection,
+    "inflight_collection":inflight_collection,
+    "rate_limits_collection":rate_limits_collection,
+    "pdf_cache_collection":pdf_cache_collection
   }
-  return mongo
\ No newline at end of file
+
+  # Idempotently create the indexes every controller query relies on
+  if ensure is None:
+    ensure = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() in ("1", "true", "yes")
+  if ensure:
+    indexes.ensure_indexes(mongo)
+  return mongo
+
+
+# Per-process state: a MongoClient must not be shared across a fork, so each
+# worker connects on first use and then runs the registered start hooks
+_process = {
+  "pid": None, "mongo": None,
+  "client_pid": None, "client": None, "failed_pid": None, "failed_at": 0.0, "error": None
+}
+_process_lock = threading.Lock()
+_client_lock = threading.Lock()
+_process_hooks = []
+
+def on_process_start(hook):
+  """
+  Registers hook(mongo), run once in every process right after it connects to Mongo
+  """
+  _process_hooks.append(hook)
+  return hook
+
+def get_client():
+  """
+  This process's MongoClient, without running the start hooks, for health checks
+  """
+  pid = os.getpid()
+  if _process["client_pid"] != pid:
+    with _client_lock:
+      if _process["client_pid"] != pid:
+        client = MongoClient(os.getenv("MONGO_URI"), **mongo_pool.client_options(mongo_pool.pool))
+        _process.update(client_pid=pid, client=client)
+  return _process["client"]
+
+def get_mongo():
+  """
+  The mongodb_setup() dict for this process, running the start hooks on first use.
+  Raises MongoUnavailable if that fails, and keeps raising it without retrying for MONGO_SETUP_RETRY_SECONDS.
+  """
+  pid = os.getpid()
+  if _process["pid"] != pid:
+    with _process_lock:
+      if _process["pid"] != pid:
+        if _process["failed_pid"] == pid and time.monotonic() - _process["failed_at"] < MONGO_SETUP_RETRY_SECONDS:
+          raise MongoUnavailable(_process["error"])
+        try:
+          # Fails within serverSelectionTimeoutMS when Mongo is down, before any index build waits on it
+          get_client().admin.command("ping")
+          mongo = mongodb_setup(client=get_client())
+          for hook in _process_hooks:
+            hook(mongo)
+        except Exception as e:
+          print(f"Error starting process against Mongo: {e}")
+          _process.update(failed_pid=pid, failed_at=time.monotonic(), error=str(e))
+          raise MongoUnavailable(str(e)) from e
+        _process.update(pid=pid, mongo=mongo)
+  return _process["mongo"]
+
+def close_mongo():
+  # Only on the way out: the process keeps its (now closed) state so it isn't reconnected
+  with _process_lock:
+    if _process["client"] is not None and _process["client_pid"] == os.getpid():
+      _process["client"].close()
+
+class LazyMongo(Mapping):
+  """
+  Stands in for the mongodb_setup() dict, connecting on first access in each process
+  """
+
+  def __init__(self, get=get_mongo):
+    self.get = get
+
+  def __getitem__(self, key):
+    return self.get()[key]
+
+  def __iter__(self):
+    return iter(self.get())
+
+  def __len__(self):
+    return len(self.get())
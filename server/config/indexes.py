@@ -0,0 +1,155 @@
+"""
+Index definitions for the app's collections, and a report of missing indexes
+and query plans for every controller query.
+
+Usage (from the server directory):
+    python config/indexes.py            # report only
+    python config/indexes.py --create   # create missing indexes, then report
+"""
+import argparse
+import json
+import os
+import sys
+
+import pymongo
+from pymongo.errors import ConnectionFailure, PyMongoError
+
+# Longest one index build may take at startup, server selection included
+INDEX_TIMEOUT_SECONDS = float(os.getenv("MONGO_INDEX_TIMEOUT_SECONDS", "5"))
+
+# (collection key in mongodb_setup, key pattern, options)
+REQUIRED_INDEXES = [
+  # created_at/_id order also serves keyset pagination
+  ("notes_collection", [("user_id", 1), ("created_at", -1), ("_id", -1)], {"name": "user_created"}),
+  ("questions_collection", [("user_id", 1), ("created_at", -1), ("_id", -1)], {"name": "user_created"}),
+  ("tests_collection", [("user_id", 1), ("created_at", -1), ("_id", -1)], {"name": "user_created"}),
+  # Newest updated_at per user for list ETags, read from the index alone
+  ("notes_collection", [("user_id", 1), ("updated_at", -1)], {"name": "user_updated"}),
+  ("questions_collection", [("user_id", 1), ("updated_at", -1)], {"name": "user_updated"}),
+  ("tests_collection", [("user_id", 1), ("updated_at", -1)], {"name": "user_updated"}),
+  ("questions_collection", [("user_id", 1), ("note_id", 1)], {"name": "user_note"}),
+  ("users_collection", [("email", 1)], {"name": "email_unique", "unique": True}),
+]
+
+# Representative queries issued by the controllers: (description, collection key, filter, sort)
+SAMPLE_USER_ID = "000000000000000000000000"
+CONTROLLER_QUERIES = [
+  ("auth login/register by email", "users_collection", {"email": "someone@example.com"}, None),
+  ("notes list", "notes_collection", {"user_id": SAMPLE_USER_ID}, None),
+  ("notes page", "notes_collection", {"user_id": SAMPLE_USER_ID}, [("created_at", -1), ("_id", -1)]),
+  ("questions list", "questions_collection", {"user_id": SAMPLE_USER_ID}, [("created_at", -1)]),
+  ("questions page", "questions_collection", {"user_id": SAMPLE_USER_ID}, [("created_at", -1), ("_id", -1)]),
+  ("questions by note", "questions_collection", {"user_id": SAMPLE_USER_ID, "note_id": SAMPLE_USER_ID}, None),
+  ("tests list", "tests_collection", {"user_id": SAMPLE_USER_ID}, [("created_at", -1)]),
+  ("tests page", "tests_collection", {"user_id": SAMPLE_USER_ID}, [("created_at", -1), ("_id", -1)]),
+  ("notes version", "notes_collection", {"user_id": SAMPLE_USER_ID}, [("updated_at", -1)]),
+  ("questions version", "questions_collection", {"user_id": SAMPLE_USER_ID}, [("updated_at", -1)]),
+  ("tests version", "tests_collection", {"user_id": SAMPLE_USER_ID}, [("updated_at", -1)]),
+]
+
+
+def ensure_indexes(mongo, timeout=INDEX_TIMEOUT_SECONDS):
+  """
+  Creates any missing required index. create_index is a no-op when the index exists.
+  Each build is capped at timeout seconds; if Mongo is unreachable the rest are skipped.
+  """
+  for collection_key, keys, options in REQUIRED_INDEXES:
+    try:
+      with pymongo.timeout(timeout):
+        mongo[collection_key].create_index(keys, **options)
+    except ConnectionFailure as e:
+      print(f"Mongo unreachable, skipping index creation: {e}")
+      return
+    except PyMongoError as e:
+      # e.g. duplicate emails blocking the unique index; the app still works, just slower
+      print(f"Error creating index {options['name']} on {mongo[collection_key].name}: {e}")
+
+
+def missing_indexes(mongo):
+  missing = []
+  for collection_key, keys, options in REQUIRED_INDEXES:
+    collection = mongo[collection_key]
+    existing = [index["key"] for index in collection.index_information().values()]
+    if keys not in existing:
+      missing.append({"collection": collection.name, "keys": keys, "name": options["name"]})
+  return missing
+
+
+def _plan_stages(plan):
+  stages = [plan.get("stage")]
+  if "inputStage" in plan:
+    stages += _plan_stages(plan["inputStage"])
+  for child in plan.get("inputStages", []):
+    stages += _plan_stages(child)
+  return stages
+
+
+def _index_names(plan):
+  names = [plan["indexName"]] if "indexName" in plan else []
+  if "inputStage" in plan:
+    names += _index_names(plan["inputStage"])
+  for child in plan.get("inputStages", []):
+    names += _index_names(child)
+  return names
+
+
+def explain_queries(mongo):
+  """
+  Runs explain (executionStats) for each controller query and flags collection scans
+  and in-memory sorts
+  """
+  reports = []
+  for description, collection_key, query, sort in CONTROLLER_QUERIES:
+    collection = mongo[collection_key]
+    command = {"find": collection.name, "filter": query}
+    if sort:
+      command["sort"] = dict(sort)
+    explain = collection.database.command({"explain": command, "verbosity": "executionStats"})
+    winning_plan = explain["queryPlanner"]["winningPlan"]
+    # Newer servers nest the classic plan under queryPlan
+    winning_plan = winning_plan.get("queryPlan", winning_plan)
+    stages = _plan_stages(winning_plan)
+    stats = explain.get("executionStats", {})
+    reports.append({
+      "query": description,
+      "collection": collection.name,
+      "stages": stages,
+      "indexes": _index_names(winning_plan),
+      "keys_examined": stats.get("totalKeysExamined"),
+      "docs_examined": stats.get("totalDocsExamined"),
+      "ok": "COLLSCAN" not in stages and "SORT" not in stages,
+    })
+  return reports
+
+
+def main():
+  sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  from config import app_setup
+
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("--create", action="store_true", help="create missing indexes before reporting")
+  parser.add_argument("--json", action="store_true", help="print machine-readable output")
+  args = parser.parse_args()
+
+  mongo = app_setup.mongodb_setup(ensure=args.create)
+  missing = missing_indexes(mongo)
+  plans = explain_queries(mongo)
+
+  if args.json:
+    print(json.dumps({"missing_indexes": missing, "plans": plans}, indent=2))
+  else:
+    print("Missing indexes:" if missing else "All required indexes present")
+    for index in missing:
+      print(f"  {index['collection']}: {index['name']} {index['keys']}")
+    print("\nQuery plans:")
+    for plan in plans:
+      status = "ok " if plan["ok"] else "BAD"
+      print(f"  [{status}] {plan['query']:<30} {' <- '.join(plan['stages']):<30} "
+            f"index={','.join(plan['indexes']) or '-'} keys={plan['keys_examined']} docs={plan['docs_examined']}")
+
+  if missing or not all(plan["ok"] for plan in plans):
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,94 @@
+import os
+from datetime import date
+
+import orjson
+from bson import ObjectId
+from flask import current_app
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+from metrics import profiling
+
+# Datetimes go through _default so they keep Flask's HTTP-date format ("Wed, 21 Oct 2015 07:28:00 GMT")
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+# Streamed arrays are flushed to the socket in chunks of about this size
+JSON_STREAM_BUFFER_BYTES = int(os.getenv("JSON_STREAM_BUFFER_BYTES", "65536"))
+
+
+def _default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, date):
+        return http_date(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps_bytes(value):
+    return orjson.dumps(value, default=_default, option=ORJSON_OPTIONS)
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider on orjson: encodes ObjectId as its hex string and datetimes as HTTP dates
+    like Flask's default provider, so controllers can hand Mongo documents to jsonify as they come from the driver
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps_bytes(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        option = ORJSON_OPTIONS
+        if self._app.debug:
+            option |= orjson.OPT_INDENT_2
+        with profiling.span("serialization"):
+            body = orjson.dumps(obj, default=_default, option=option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def _profiled_dumps(value):
+    with profiling.span("serialization"):
+        return dumps_bytes(value)
+
+
+def stream_array(documents, key=None):
+    """
+    Response streaming {key: [...]} (or a bare array when key is None) straight from a
+    Mongo cursor, encoding one document at a time instead of building the whole list.
+    The first batch is fetched up front, so query errors still reach the caller's except block.
+    """
+    iterator = iter(documents)
+    first = next(iterator, None)
+    # The body is generated after the request context is gone; carry a running profile over
+    profile = profiling.current()
+    encode = dumps_bytes if profile is None else _profiled_dumps
+
+    def generate():
+        buffer = bytearray(b'{' + orjson.dumps(key) + b':[' if key is not None else b'[')
+        with profiling.activated(profile):
+            try:
+                if first is not None:
+                    buffer += encode(first)
+                for document in iterator:
+                    buffer += b','
+                    buffer += encode(document)
+                    if len(buffer) >= JSON_STREAM_BUFFER_BYTES:
+                        yield bytes(buffer)
+                        buffer.clear()
+            finally:
+                close = getattr(documents, "close", None)
+                if close is not None:
+                    close()
+        buffer += b']}' if key is not None else b']'
+        yield bytes(buffer)
+
+    return current_app.response_class(generate(), mimetype="application/json")
@@ -0,0 +1,113 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+from pymongo import monitoring
+
+from metrics import metrics
+
+load_dotenv()
+
+# Per worker process, each of which has its own client
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+# A request waiting longer than this for a free connection fails instead of queueing forever
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener keeping live utilization counters for one client
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "connections": 0,
+            "checked_out": 0,
+            "waiting": 0,
+            "max_checked_out": 0,
+            "max_waiting": 0,
+            "checkouts": 0,
+            "checkout_failures": 0,
+            "checkout_timeouts": 0,
+            "pool_clears": 0,
+        }
+
+    def _update(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._counters[name] += delta
+            self._counters["max_checked_out"] = max(self._counters["max_checked_out"], self._counters["checked_out"])
+            self._counters["max_waiting"] = max(self._counters["max_waiting"], self._counters["waiting"])
+            if "checked_out" in deltas or "waiting" in deltas:
+                metrics.observe_mongo_pool(self._counters["checked_out"], self._counters["waiting"])
+
+    def connection_check_out_started(self, event):
+        self._update(waiting=1)
+
+    def connection_checked_out(self, event):
+        self._update(waiting=-1, checked_out=1, checkouts=1)
+
+    def connection_check_out_failed(self, event):
+        timeouts = 1 if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT else 0
+        self._update(waiting=-1, checkout_failures=1, checkout_timeouts=timeouts)
+
+    def connection_checked_in(self, event):
+        self._update(checked_out=-1)
+
+    def connection_created(self, event):
+        self._update(connections=1)
+
+    def connection_closed(self, event):
+        self._update(connections=-1)
+
+    def pool_cleared(self, event):
+        self._update(pool_clears=1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["max_pool_size"] = MONGO_MAX_POOL_SIZE
+        stats["utilization"] = round(stats["checked_out"] / MONGO_MAX_POOL_SIZE, 4) if MONGO_MAX_POOL_SIZE else 0.0
+        return stats
+
+
+pool = PoolStats()
+
+
+def client_options(listener):
+    """
+    Keyword arguments for MongoClient with the tuned pool, the given stats
+    listener and command timings for /metrics
+    """
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+        "event_listeners": [listener, metrics.command_timings],
+    }
+
+
+def stats():
+    return pool.stats()
@@ -1,31 +1,7 @@
 from flask import request, jsonify
-import bcrypt
 import jwt
+from auth import passwords, tokens
 from datetime import datetime, timedelta
-from functools import wraps
-
-def token_required(app,f):
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = data['user_id']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid'}), 401
-        
-        return f(current_user_id, *args, **kwargs)
-    return decorated
 
 def register(app,users_collection):
     try:
@@ -40,13 +16,13 @@ def register(app,users_collection):
         if users_collection.find_one({"email": email}):
             return jsonify({"message": "Email already exists"}), 409
         
-        salt = bcrypt.gensalt()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), salt)
+        # Hashing runs on the bounded bcrypt pool, not the request thread
+        hashed_password = passwords.hash_password(password)
 
         user_data = {
             "name": name,
             "email": email,
-            "password": hashed_password.decode('utf-8')
+            "password": hashed_password
         }
 
         result = users_collection.insert_one(user_data)
@@ -69,6 +45,8 @@ def register(app,users_collection):
                 "email": email
             }
         }), 201
+    except passwords.PoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -84,10 +62,17 @@ def login(app,users_collection):
         if not user:
             return jsonify({"message": "User does not exist"}), 404
 
-        stored_hash = user["password"].encode('utf-8')
-        if not bcrypt.checkpw(password.encode('utf-8'), stored_hash):
+        stored_hash = user["password"]
+        if not passwords.verify_password(password, stored_hash):
             return jsonify({"message": "Incorrect password"}), 401
 
+        # Transparently upgrade hashes made with a different work factor
+        if passwords.needs_rehash(stored_hash):
+            passwords.rehash_later(password, lambda new_hash: users_collection.update_one(
+                {"_id": user["_id"], "password": stored_hash},
+                {"$set": {"password": new_hash}}
+            ))
+
         # Generate JWT token
         token = jwt.encode({
             'user_id': str(user['_id']),
@@ -105,21 +90,22 @@ def login(app,users_collection):
                 "email": user['email']
             }
         }), 200
+    except passwords.PoolSaturated as e:
+        return busy_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+def busy_response(error):
+    return jsonify({"error": "Server is busy, please try again shortly"}), 503, {"Retry-After": str(error.retry_after)}
     
 def verify_token(app):
     try:
-        token = request.headers.get('Authorization')
+        token = tokens.bearer_token(request.headers.get('Authorization'))
         
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
         
-        # Remove 'Bearer ' prefix if present
-        if token.startswith('Bearer '):
-            token = token[7:]
-        
-        data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
+        data = tokens.decode_token(token, app.config['JWT_SECRET_KEY'])
         
         return jsonify({
             'valid': True,
@@ -0,0 +1,44 @@
+import hashlib
+
+from flask import current_app, request
+
+# Bump when the list response format changes, so cached bodies aren't revalidated across it
+ETAG_VERSION = "1"
+
+
+def collection_etag(collection, user_id):
+    """
+    Strong ETag for one user's list in a collection, from the document count and the newest
+    updated_at. Both come from index-only queries, so nothing is loaded to compute it.
+    Any create, update or delete changes one of them.
+    """
+    query = {"user_id": user_id}
+    count = collection.count_documents(query)
+    latest = collection.find_one(query, {"updated_at": 1, "_id": 0}, sort=[("updated_at", -1)])
+    latest_updated = latest["updated_at"].isoformat() if latest and latest.get("updated_at") else ""
+    # The query string selects the variant (pagination cursor, limit, view)
+    version = f"{ETAG_VERSION}|{collection.name}|{user_id}|{count}|{latest_updated}|{request.query_string.decode('latin-1')}"
+    return hashlib.sha256(version.encode("utf-8")).hexdigest()[:32]
+
+
+def is_fresh(etag):
+    """
+    True when If-None-Match already holds this ETag. Compressed responses carry it
+    as "<etag>:<encoding>", which matches too.
+    """
+    for candidate in request.if_none_match.as_set():
+        if candidate == etag or candidate.split(":", 1)[0] == etag:
+            return True
+    return request.if_none_match.star_tag
+
+
+def not_modified(etag):
+    response = current_app.response_class(status=304)
+    return tagged(response, etag)
+
+
+def tagged(response, etag):
+    response.set_etag(etag)
+    # Per-user data: browsers may keep it but must revalidate on every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,13 @@
+from flask import jsonify
+from jobs.job_queue import public_view
+
+def get_job(job_queue, job_id):
+    try:
+        job = job_queue.get(job_id)
+
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+
+        return jsonify(public_view(job)), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
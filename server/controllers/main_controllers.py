@@ -6,3 +6,17 @@ def home():
 def about():
   return jsonify({"message":"About Us"})
 
+def ready(mongo_client, job_queue, start_process):
+  # Readiness: Mongo answers a ping and this worker isn't shutting down
+  if job_queue.draining:
+    return jsonify({"status":"draining"}), 503
+  try:
+    mongo_client.admin.command("ping")
+  except Exception as e:
+    return jsonify({"status":"unavailable","error":str(e)}), 503
+  # Mongo answers, so finish (or retry) this worker's start hooks
+  try:
+    start_process()
+  except Exception as e:
+    return jsonify({"status":"starting","error":str(e)}), 503
+  return jsonify({"status":"ready"}), 200
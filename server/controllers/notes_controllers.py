@@ -1,6 +1,9 @@
 from datetime import datetime
 from flask import jsonify, request
 from decorators import token_decorator
+from controllers import pagination, conditional
+from config import json_provider
+from repositories.repository import Repository
 
 # JWT Token verification decorator
 # def token_required(f):
@@ -10,13 +13,36 @@ from decorators import token_decorator
 # @token_required
 def get_notes(notes_collection,current_user_id):
     try:
-        notes = list(notes_collection.find({"user_id": current_user_id}))
-        
-        # Convert ObjectId to string for JSON serialization
-        for note in notes:
-            note['_id'] = str(note['_id'])
+        args = pagination.list_args()
+        query = {"user_id": current_user_id}
+
+        # Answer a revalidation before loading any note
+        etag = conditional.collection_etag(notes_collection, current_user_id)
+        if conditional.is_fresh(etag):
+            return conditional.not_modified(etag)
+
+        if args['paginate']:
+            notes, next_cursor = pagination.find_page(
+                notes_collection, query, args['limit'], args['cursor'], args['projection']
+            )
+            return conditional.tagged(jsonify({'notes': notes, 'next': next_cursor}), etag), 200
+
+        # Encoded straight from the cursor; the JSON provider handles ObjectId and datetime
+        return conditional.tagged(
+            json_provider.stream_array(notes_collection.find(query, args['projection']), 'notes'), etag
+        ), 200
+    except pagination.PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def get_note(notes_collection, current_user_id, note_id):
+    try:
+        note = Repository(notes_collection).find_owned(current_user_id, note_id)
+        if not note:
+            return jsonify({"error": "Note not found or access denied"}), 404
         
-        return jsonify({'notes': notes}), 200
+        return jsonify({'note': note}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -29,16 +55,17 @@ def create_note(notes_collection,current_user_id):
         if not title:
             return jsonify({"error": "Title is required"}), 400
         
+        # One timestamp, so a note that was never edited has updated_at == created_at
+        now = datetime.utcnow()
         note_data = {
             "user_id": current_user_id,
             "title": title,
             "content": content or "",
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
+            "created_at": now,
+            "updated_at": now
         }
         
-        result = notes_collection.insert_one(note_data)
-        note_id = str(result.inserted_id)
+        note_id = Repository(notes_collection).insert(note_data)
         
         note_data['_id'] = note_id
         
@@ -51,8 +78,6 @@ def create_note(notes_collection,current_user_id):
     
 def update_note(notes_collection, current_user_id, note_id):
     try:
-        from bson import ObjectId
-        
         data = request.get_json()
         title = data.get('title')
         content = data.get('content')
@@ -60,26 +85,16 @@ def update_note(notes_collection, current_user_id, note_id):
         if not title:
             return jsonify({"error": "Title is required"}), 400
         
-        # Find the note and verify ownership
-        note = notes_collection.find_one({"_id": ObjectId(note_id), "user_id": current_user_id})
-        if not note:
-            return jsonify({"error": "Note not found or access denied"}), 404
-        
-        # Update the note
         update_data = {
             "title": title,
             "content": content or "",
             "updated_at": datetime.utcnow()
         }
         
-        notes_collection.update_one(
-            {"_id": ObjectId(note_id), "user_id": current_user_id},
-            {"$set": update_data}
-        )
-        
-        # Get the updated note
-        updated_note = notes_collection.find_one({"_id": ObjectId(note_id)})
-        updated_note['_id'] = str(updated_note['_id'])
+        # Update the note and get it back in one call; the filter verifies ownership
+        updated_note = Repository(notes_collection).update_owned(current_user_id, note_id, update_data)
+        if not updated_note:
+            return jsonify({"error": "Note not found or access denied"}), 404
         
         return jsonify({
             "message": "Note updated successfully",
@@ -90,16 +105,10 @@ def update_note(notes_collection, current_user_id, note_id):
     
 def delete_note(notes_collection, current_user_id, note_id):
     try:
-        from bson import ObjectId
-        
-        # Find the note and verify ownership
-        note = notes_collection.find_one({"_id": ObjectId(note_id), "user_id": current_user_id})
-        if not note:
+        # Delete the note; the filter verifies ownership
+        if not Repository(notes_collection).delete_owned(current_user_id, note_id):
             return jsonify({"error": "Note not found or access denied"}), 404
         
-        # Delete the note
-        notes_collection.delete_one({"_id": ObjectId(note_id), "user_id": current_user_id})
-        
         return jsonify({"message": "Note deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
\ No newline at end of file
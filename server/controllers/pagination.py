@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import request
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Fields returned by list views with ?view=summary, full content is fetched per item
+SUMMARY_PROJECTION = {"_id": 1, "title": 1, "created_at": 1, "updated_at": 1}
+
+
+class PaginationError(ValueError):
+    pass
+
+
+def encode_cursor(doc):
+    payload = json.dumps({"c": doc["created_at"].isoformat(), "i": str(doc["_id"])})
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return datetime.fromisoformat(payload["c"]), ObjectId(payload["i"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise PaginationError("Invalid cursor")
+
+
+def list_args():
+    """
+    Reads ?limit, ?cursor and ?view from the query string.
+    Pagination is on when either limit or cursor is given.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    view = request.args.get('view', 'full')
+
+    if view not in ('full', 'summary'):
+        raise PaginationError("view must be 'full' or 'summary'")
+
+    paginate = limit is not None or cursor is not None
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if limit < 1:
+            raise PaginationError("limit must be positive")
+        limit = min(limit, MAX_LIMIT)
+    else:
+        limit = DEFAULT_LIMIT
+
+    return {
+        "paginate": paginate,
+        "limit": limit,
+        "cursor": decode_cursor(cursor) if cursor else None,
+        "projection": SUMMARY_PROJECTION if view == 'summary' else None,
+    }
+
+
+def find_page(collection, query, limit, cursor=None, projection=None):
+    """
+    Keyset pagination over (created_at, _id), newest first.
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor is not None:
+        created_at, last_id = cursor
+        query = {
+            "$and": [query, {"$or": [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}},
+            ]}]
+        }
+
+    docs = list(
+        collection.find(query, projection)
+        .sort([("created_at", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1])
+    return docs, next_cursor
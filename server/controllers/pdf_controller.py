@@ -1,79 +1,263 @@
+import hashlib
 from flask import request, jsonify
-import PyPDF2
-import io
-from genai.genai import generate_summary
+from genai.genai import generate_summary_async, stream_summary, summary_fingerprint
+from genai import resilience
+from pdf_handling import extract
+from pdf_handling import pdf_store
+from pdf_handling.uploads import pdf_uploads
+from jobs.job_queue import async_requested
+from decorators.rate_limit_decorator import hand_off_lease
+from controllers import sse
+from aio import event_loop
+from aio import singleflight
 
-def process_pdf():
+async def process_pdf(job_queue=None):
+    """
+    Async view: waiting on extraction and Gemini doesn't hold a thread under asgi.py
+    """
     try:
         # Check if a file was uploaded
         if 'pdf' not in request.files:
             return jsonify({'error': 'No PDF file uploaded'}), 400
-        
+
+        file = request.files['pdf']
+
+        # Check if file is selected
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+
+        # Check if file is PDF
+        if not file.filename.lower().endswith('.pdf'):
+            return jsonify({'error': 'Only PDF files are allowed'}), 400
+
+        # Read the file content, hashing it on the way to find repeat uploads
+        file_content, digest = await event_loop.to_thread(pdf_store.read_and_hash, file)
+
+        # Submit-and-poll mode: hand the pipeline to the job queue, the PDF itself goes to GridFS
+        if job_queue is not None and async_requested():
+            upload_id = await event_loop.to_thread(pdf_uploads.put, file_content, file.filename, digest)
+            try:
+                job_id = await event_loop.to_thread(
+                    job_queue.submit, 'process_pdf', {'upload_id': upload_id, 'filename': file.filename, 'digest': digest},
+                    on_finish=hand_off_lease()
+                )
+            except Exception:
+                await event_loop.to_thread(pdf_uploads.delete, upload_id)
+                raise
+            return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+        body, status_code = await summarize_pdf_async(file_content, file.filename, digest=digest)
+        return jsonify(body), status_code, resilience.retry_headers(body)
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def stream_pdf():
+    try:
+        # Check if a file was uploaded
+        if 'pdf' not in request.files:
+            return jsonify({'error': 'No PDF file uploaded'}), 400
+
         file = request.files['pdf']
-        
+
         # Check if file is selected
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
-        
+
         # Check if file is PDF
         if not file.filename.lower().endswith('.pdf'):
             return jsonify({'error': 'Only PDF files are allowed'}), 400
-        
-        # Read PDF content
-        pdf_content = ""
-        try:
-            # Read the file content
-            file_content = file.read()
-            
-            # Create a BytesIO object
-            pdf_file = io.BytesIO(file_content)
-            
-            # Create PDF reader
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # Extract text from all pages
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text.strip():  # Only add non-empty pages
-                    pdf_content += f"\n\n--- Page {page_num + 1} ---\n\n"
-                    pdf_content += page_text
-            
-            if not pdf_content.strip():
-                return jsonify({'error': 'No text content found in the PDF'}), 400
-                
-        except Exception as e:
-            return jsonify({'error': f'Error reading PDF: {str(e)}'}), 500
-        
-        # Generate summary using AI
-        try:
-            ai_response = generate_summary(pdf_content)
-            summary = ai_response.get('summary', pdf_content)
-            title = ai_response.get('title', f"PDF Summary: {file.filename}")
-            
-            # Check if content is educational
-            if not ai_response.get('is_educational', True):
-                return jsonify({
-                    'message': summary,
-                    'title': title,
-                    'is_educational': False
-                }), 400  # Return 400 status for non-educational content
-            
-            return jsonify({
+
+        # Read the file content, hashing it on the way to find repeat uploads
+        file_content, digest = pdf_store.read_and_hash(file)
+
+        return sse.response(summarize_pdf_events(file_content, file.filename, digest))
+
+    except Exception as e:
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+def summarize_pdf_events(file_content, filename, digest):
+    """
+    SSE variant of summarize_pdf: status events, partial markdown chunks, then the title
+    and a final summary event carrying the same body as /process-pdf.
+    A summary stored for this file is sent as a single chunk.
+    """
+    yield sse.event('status', {'stage': 'extracting_text'})
+    try:
+        pdf_content, cached = extract_cached(file_content, digest)
+    except Exception as e:
+        yield sse.event('error', {'error': f'Error reading PDF: {str(e)}', 'status_code': 500})
+        return
+
+    if not pdf_content.strip():
+        yield sse.event('error', {'error': 'No text content found in the PDF', 'status_code': 400})
+        return
+
+    yield sse.event('status', {'stage': 'summarizing'})
+    fingerprint = summary_fingerprint(streaming=True)
+    result = pdf_store.pdf_store.cached_summary(cached, fingerprint)
+    try:
+        if result is None:
+            for name, data in stream_summary(pdf_content):
+                if name == 'chunk':
+                    yield sse.event('chunk', {'text': data})
+                elif name == 'progress':
+                    yield sse.event('status', data)
+                elif name == 'title':
+                    yield sse.event('title', {'title': data})
+                else:
+                    result = data
+            pdf_store.pdf_store.save_summary(digest, fingerprint, result)
+        elif result['is_educational']:
+            yield sse.event('chunk', {'text': result['summary']})
+            yield sse.event('title', {'title': result['title']})
+    except Exception as e:
+        failure = resilience.failure_response(e)
+        if failure:
+            body, status_code = failure
+            yield sse.event('error', dict(body, status_code=status_code))
+            return
+        # If AI summary fails, return the raw content
+        print(f"Error summarizing PDF, returning raw text: {e}")
+        yield sse.event('summary', {
+            'message': pdf_content,
+            'title': f"PDF Content: {filename}",
+            'original_content': pdf_content,
+            'filename': filename,
+            'status_code': 200
+        })
+        return
+
+    if not result['is_educational']:
+        yield sse.event('summary', {
+            'message': result['summary'],
+            'title': result['title'],
+            'is_educational': False,
+            'status_code': 400
+        })
+        return
+
+    yield sse.event('summary', {
+        'message': result['summary'],
+        'title': result['title'],
+        'original_content': pdf_content,
+        'filename': filename,
+        'is_educational': True,
+        'status_code': 200
+    })
+
+def extract_cached(file_content, digest):
+    """
+    Text of the PDF, from the PDF cache when this file was uploaded before.
+    Returns (text, cached record or None).
+    """
+    cached = pdf_store.pdf_store.get(digest)
+    if cached is not None:
+        return cached['text'], cached
+    # Extract text from all pages, sharded across the PDF worker pool
+    extraction = extract.extract_pages(file_content)
+    pdf_store.pdf_store.save_extraction(digest, extraction, len(file_content))
+    return extraction['text'], None
+
+def summarize_pdf(file_content, filename, progress=None, digest=None):
+    """
+    Extract + summarize pipeline behind /process-pdf, returns (body, status_code)
+    """
+    return event_loop.run(summarize_pdf_async(file_content, filename, progress, digest))
+
+def summarize_pdf_upload(upload_id, filename, digest, progress=None):
+    """
+    Job pipeline for /process-pdf?async=true; deletes the upload once the job is done with it
+    """
+    try:
+        file_content = pdf_uploads.read(upload_id)
+        return summarize_pdf(file_content, filename, progress, digest)
+    finally:
+        pdf_uploads.delete(upload_id)
+
+async def summarize_pdf_async(file_content, filename, progress=None, digest=None):
+    """
+    Coalesced by content hash alone, so the same PDF arriving several times at once (under any
+    filename) is summarized once; each request's filename is filled in afterwards
+    """
+    digest = digest or hashlib.sha256(file_content).hexdigest()
+    key = singleflight.content_key("pdf", digest)
+    body, status_code = await singleflight.single_flight.do(
+        key, lambda: run_pdf_summary(file_content, digest, progress)
+    )
+    return with_filename(body, filename), status_code
+
+def with_filename(body, filename):
+    """
+    Fills this upload's filename into a shared result: the "filename" field and any fallback title
+    """
+    body = dict(body)
+    title_prefix = body.pop('title_prefix', None)
+    if title_prefix is not None and body.get('title') is None:
+        body['title'] = f"{title_prefix}: {filename}"
+    if 'filename' in body:
+        body['filename'] = filename
+    return body
+
+async def run_pdf_summary(file_content, digest, progress=None):
+    # Progress callbacks may write to the job store, so they run off the loop
+    async def report(stage):
+        if progress is not None:
+            await event_loop.to_thread(progress, stage)
+
+    # Read PDF content
+    await report('extracting_text')
+    pdf_content = ""
+    try:
+        pdf_content, cached = await event_loop.to_thread(extract_cached, file_content, digest)
+
+        if not pdf_content.strip():
+            return {'error': 'No text content found in the PDF'}, 400
+
+    except Exception as e:
+        return {'error': f'Error reading PDF: {str(e)}'}, 500
+
+    # Generate summary using AI
+    await report('summarizing')
+    fingerprint = summary_fingerprint()
+    try:
+        ai_response = pdf_store.pdf_store.cached_summary(cached, fingerprint)
+        if ai_response is None:
+            ai_response = await generate_summary_async(pdf_content)
+            await event_loop.to_thread(pdf_store.pdf_store.save_summary, digest, fingerprint, ai_response)
+        summary = ai_response.get('summary', pdf_content)
+        # Without a generated title each request gets "PDF Summary: <its filename>"
+        title = ai_response.get('title')
+
+        # Check if content is educational
+        if not ai_response.get('is_educational', True):
+            return {
                 'message': summary,
                 'title': title,
-                'original_content': pdf_content,
-                'filename': file.filename,
-                'is_educational': True
-            })
-            
-        except Exception as e:
-            # If AI summary fails, return the raw content
-            return jsonify({
-                'message': pdf_content,
-                'title': f"PDF Content: {file.filename}",
-                'original_content': pdf_content,
-                'filename': file.filename
-            })
-        
+                'title_prefix': 'PDF Summary',
+                'is_educational': False
+            }, 400  # Return 400 status for non-educational content
+
+        return {
+            'message': summary,
+            'title': title,
+            'title_prefix': 'PDF Summary',
+            'original_content': pdf_content,
+            'filename': None,
+            'is_educational': True
+        }, 200
+
     except Exception as e:
-        return jsonify({'error': f'Server error: {str(e)}'}), 500
+        # Breaker open or deadline exceeded: tell the client to retry instead of passing raw text off as a summary
+        failure = resilience.failure_response(e)
+        if failure:
+            return failure
+        # If AI summary fails, return the raw content
+        print(f"Error summarizing PDF, returning raw text: {e}")
+        return {
+            'message': pdf_content,
+            'title': None,
+            'title_prefix': 'PDF Content',
+            'original_content': pdf_content,
+            'filename': None
+        }, 200
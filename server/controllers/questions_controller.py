@@ -1,25 +1,55 @@
 from flask import request, jsonify
 from datetime import datetime
 from bson import ObjectId
-from genai.genai import generate_questions
+from genai.genai import generate_questions_async
+from controllers import pagination, conditional
+from config import json_provider
+from repositories.repository import Repository
+from aio import event_loop
+from aio import singleflight
+from genai import resilience
 
 def get_questions(questions_collection, current_user_id):
     try:
-        # Fetch all questions for the current user
-        questions = list(questions_collection.find(
-            {"user_id": current_user_id}
-        ).sort("created_at", -1))
+        args = pagination.list_args()
+        query = {"user_id": current_user_id}
+
+        # Answer a revalidation before loading any questions
+        etag = conditional.collection_etag(questions_collection, current_user_id)
+        if conditional.is_fresh(etag):
+            return conditional.not_modified(etag)
+
+        if args['paginate']:
+            questions, next_cursor = pagination.find_page(
+                questions_collection, query, args['limit'], args['cursor'], args['projection']
+            )
+            return conditional.tagged(jsonify({'questions': questions, 'next': next_cursor}), etag), 200
+
+        # Fetch all questions for the current user, encoded straight from the cursor
+        return conditional.tagged(json_provider.stream_array(questions_collection.find(
+            query, args['projection']
+        ).sort("created_at", -1)), etag), 200
+    except pagination.PaginationError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def get_question(questions_collection, current_user_id, questions_id):
+    try:
+        question = Repository(questions_collection).find_owned(current_user_id, questions_id)
         
-        # Convert ObjectId to string for JSON serialization
-        for question in questions:
-            question['_id'] = str(question['_id'])
-            question['note_id'] = str(question['note_id'])
+        if not question:
+            return jsonify({'error': 'Questions not found'}), 404
         
-        return jsonify(questions), 200
+        return jsonify(question), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def create_questions(questions_collection, notes_collection, current_user_id):
+async def create_questions(questions_collection, notes_collection, current_user_id):
+    """
+    Async view: Mongo calls run on the blocking pool and the generation is awaited, so under
+    asgi.py a waiting request doesn't hold a thread
+    """
     try:
         data = request.get_json()
         note_id = data.get('note_id')
@@ -27,58 +57,62 @@ def create_questions(questions_collection, notes_collection, current_user_id):
         if not note_id:
             return jsonify({'error': 'Note ID is required'}), 400
         
-        # Verify the note belongs to the current user
-        note = notes_collection.find_one({
-            "_id": ObjectId(note_id),
-            "user_id": current_user_id
-        })
+        body, status_code = await create_questions_for_note(questions_collection, notes_collection, current_user_id, note_id)
+        return jsonify(body), status_code, resilience.retry_headers(body)
         
-        if not note:
-            return jsonify({'error': 'Note not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+async def create_questions_for_note(questions_collection, notes_collection, current_user_id, note_id):
+    # Verify the note belongs to the current user, reading only what generation needs
+    note = await event_loop.to_thread(
+        Repository(notes_collection).find_owned, current_user_id, note_id, projection={"title": 1, "content": 1}
+    )
+    
+    if not note:
+        return {'error': 'Note not found'}, 404
+    
+    # Generate questions using AI
+    try:
+        # Identical note content being generated for elsewhere shares that call
+        ai_response = await singleflight.single_flight.do(
+            singleflight.content_key("questions", note['content']),
+            lambda: generate_questions_async(note['content'])
+        )
+        questions_text = ai_response.get('questions', '')
         
-        # Generate questions using AI
-        try:
-            ai_response = generate_questions(note['content'])
-            questions_text = ai_response.get('questions', '')
+        if not questions_text:
+            return {'error': 'Failed to generate questions'}, 500
             
-            if not questions_text:
-                return jsonify({'error': 'Failed to generate questions'}), 500
-                
-        except Exception as e:
-            return jsonify({'error': f'AI generation failed: {str(e)}'}), 500
-        
-        # Create questions document
-        questions_doc = {
-            "user_id": current_user_id,
-            "note_id": ObjectId(note_id),
-            "note_title": note['title'],
-            "title": f"Questions for: {note['title'][:50]}{'...' if len(note['title']) > 50 else ''}",
-            "content": questions_text,
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-        
-        # Insert the questions
-        result = questions_collection.insert_one(questions_doc)
-        
-        # Return the created questions with string ID
-        questions_doc['_id'] = str(result.inserted_id)
-        questions_doc['note_id'] = str(questions_doc['note_id'])
-        
-        return jsonify(questions_doc), 201
-        
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        failure = resilience.failure_response(e)
+        if failure:
+            return failure
+        return {'error': f'AI generation failed: {str(e)}'}, 500
+    
+    # Create questions document
+    questions_doc = {
+        "user_id": current_user_id,
+        "note_id": ObjectId(note_id),
+        "note_title": note['title'],
+        "title": f"Questions for: {note['title'][:50]}{'...' if len(note['title']) > 50 else ''}",
+        "content": questions_text,
+        "created_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }
+    
+    # Insert the questions
+    questions_id = await event_loop.to_thread(Repository(questions_collection).insert, questions_doc)
+    
+    # Return the created questions with string ID
+    questions_doc['_id'] = questions_id
+    
+    return questions_doc, 201
 
 def delete_questions(questions_collection, current_user_id, questions_id):
     try:
         # Verify the questions belong to the current user and delete
-        result = questions_collection.delete_one({
-            "_id": ObjectId(questions_id),
-            "user_id": current_user_id
-        })
-        
-        if result.deleted_count == 0:
+        if not Repository(questions_collection).delete_owned(current_user_id, questions_id):
             return jsonify({'error': 'Questions not found'}), 404
         
         return jsonify({'message': 'Questions deleted successfully'}), 200
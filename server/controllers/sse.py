@@ -0,0 +1,16 @@
+import json
+from flask import Response, stream_with_context
+
+def event(name, data):
+    """
+    Formats one Server-Sent Event with a JSON payload
+    """
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+def response(events):
+    # Disable proxy buffering so each event reaches the client as soon as it is yielded
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
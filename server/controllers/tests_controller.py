@@ -1,23 +1,45 @@
 from flask import request, jsonify
-from bson import ObjectId
 from datetime import datetime
+from controllers import pagination, conditional
+from config import json_provider
+from repositories.repository import Repository
+from genai.genai import generate_test_async
+from aio import event_loop
+from aio import singleflight
+from genai import resilience
 
 def get_tests(tests_collection, current_user_id):
     try:
-        # Fetch all tests for the user
-        tests = list(tests_collection.find({'user_id': current_user_id}).sort('created_at', -1))
-        
-        # Convert ObjectId to string
-        for test in tests:
-            test['_id'] = str(test['_id'])
-        
-        return jsonify({'tests': tests}), 200
+        args = pagination.list_args()
+        query = {'user_id': current_user_id}
+
+        # Answer a revalidation before loading any test
+        etag = conditional.collection_etag(tests_collection, current_user_id)
+        if conditional.is_fresh(etag):
+            return conditional.not_modified(etag)
+
+        if args['paginate']:
+            tests, next_cursor = pagination.find_page(
+                tests_collection, query, args['limit'], args['cursor'], args['projection']
+            )
+            return conditional.tagged(jsonify({'tests': tests, 'next': next_cursor}), etag), 200
+
+        # Fetch all tests for the user, encoded straight from the cursor
+        return conditional.tagged(
+            json_provider.stream_array(tests_collection.find(query, args['projection']).sort('created_at', -1), 'tests'), etag
+        ), 200
     
+    except pagination.PaginationError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error fetching tests: {e}")
         return jsonify({'error': str(e)}), 500
 
-def create_test(tests_collection, notes_collection, current_user_id):
+async def create_test(tests_collection, notes_collection, current_user_id):
+    """
+    Async view: Mongo calls run on the blocking pool and the generation is awaited, so under
+    asgi.py a waiting request doesn't hold a thread
+    """
     try:
         data = request.get_json()
         
@@ -26,62 +48,69 @@ def create_test(tests_collection, notes_collection, current_user_id):
         if not note_ids:
             return jsonify({'error': 'No notes selected for test generation'}), 400
         
-        # Fetch the selected notes
-        selected_notes = list(notes_collection.find({
-            '_id': {'$in': [ObjectId(note_id) for note_id in note_ids]},
-            'user_id': current_user_id
-        }))
-        
-        if not selected_notes:
-            return jsonify({'error': 'No valid notes found'}), 404
-        
-        # Combine content from all selected notes
-        combined_content = ""
-        note_titles = []
-        for note in selected_notes:
-            note_titles.append(note.get('title', 'Untitled'))
-            combined_content += f"\n\n{note.get('title', 'Untitled')}:\n{note.get('summary', '')}"
-        
-        # Generate test using AI
-        from genai.genai import generate_test
-        test_result = generate_test(combined_content)
-        
-        # Create test document
-        test_doc = {
-            'user_id': current_user_id,
-            'title': f"Test from {len(note_titles)} notes",
-            'source_notes': note_titles,
-            'source_note_ids': note_ids,
-            'test_content': test_result.get('test', ''),
-            'created_at': datetime.utcnow(),
-            'updated_at': datetime.utcnow()
-        }
-        
-        # Insert into database
-        result = tests_collection.insert_one(test_doc)
-        test_doc['_id'] = str(result.inserted_id)
-        
-        return jsonify({
-            'message': 'Test generated successfully',
-            'test': test_doc
-        }), 201
+        body, status_code = await create_test_from_notes(tests_collection, notes_collection, current_user_id, note_ids)
+        return jsonify(body), status_code, resilience.retry_headers(body)
     
     except Exception as e:
         print(f"Error creating test: {e}")
         return jsonify({'error': str(e)}), 500
 
+async def create_test_from_notes(tests_collection, notes_collection, current_user_id, note_ids):
+    # Fetch the selected notes
+    selected_notes = await event_loop.to_thread(
+        Repository(notes_collection).find_many_owned, current_user_id, note_ids, projection={'title': 1, 'summary': 1}
+    )
+    
+    if not selected_notes:
+        return {'error': 'No valid notes found'}, 404
+    
+    # Combine content from all selected notes
+    combined_content = ""
+    note_titles = []
+    for note in selected_notes:
+        note_titles.append(note.get('title', 'Untitled'))
+        combined_content += f"\n\n{note.get('title', 'Untitled')}:\n{note.get('summary', '')}"
+    
+    # Generate test using AI
+    try:
+        # Identical note selections being generated for elsewhere share that call
+        test_result = await singleflight.single_flight.do(
+            singleflight.content_key("test", combined_content),
+            lambda: generate_test_async(combined_content)
+        )
+    except Exception as e:
+        failure = resilience.failure_response(e)
+        if failure:
+            return failure
+        raise
+    
+    # Create test document
+    test_doc = {
+        'user_id': current_user_id,
+        'title': f"Test from {len(note_titles)} notes",
+        'source_notes': note_titles,
+        'source_note_ids': note_ids,
+        'test_content': test_result.get('test', ''),
+        'created_at': datetime.utcnow(),
+        'updated_at': datetime.utcnow()
+    }
+    
+    # Insert into database
+    test_doc['_id'] = await event_loop.to_thread(Repository(tests_collection).insert, test_doc)
+    
+    return {
+        'message': 'Test generated successfully',
+        'test': test_doc
+    }, 201
+
 def get_test(tests_collection, current_user_id, test_id):
     try:
         # Fetch specific test
-        test = tests_collection.find_one({
-            '_id': ObjectId(test_id),
-            'user_id': current_user_id
-        })
+        test = Repository(tests_collection).find_owned(current_user_id, test_id)
         
         if not test:
             return jsonify({'error': 'Test not found'}), 404
         
-        test['_id'] = str(test['_id'])
         return jsonify({'test': test}), 200
     
     except Exception as e:
@@ -91,12 +120,7 @@ def get_test(tests_collection, current_user_id, test_id):
 def delete_test(tests_collection, current_user_id, test_id):
     try:
         # Delete the test
-        result = tests_collection.delete_one({
-            '_id': ObjectId(test_id),
-            'user_id': current_user_id
-        })
-        
-        if result.deleted_count == 0:
+        if not Repository(tests_collection).delete_owned(current_user_id, test_id):
             return jsonify({'error': 'Test not found'}), 404
         
         return jsonify({'message': 'Test deleted successfully'}), 200
@@ -1,48 +1,160 @@
 from flask import jsonify, request
 from youtube import yt
 from genai import genai
+from genai import resilience
+from jobs.job_queue import async_requested
+from decorators.rate_limit_decorator import hand_off_lease
+from controllers import sse
+from aio import event_loop
+from aio.singleflight import single_flight
 
-def generate_transcription():
+async def generate_transcription(job_queue=None):
+    """
+    Async view: waiting on YouTube and Gemini doesn't hold a thread under asgi.py
+    """
     try:
         data = request.get_json()
         you = data.get('yturl')
-        
+
         if not you:
             return jsonify({"error": "YouTube URL is required"}), 400
 
-        # Get transcript from YouTube
-        try:
-            ts = yt.get_transcription(you)
-        except Exception as transcript_error:
-            return jsonify({
-                "error": f"Failed to fetch transcript: {str(transcript_error)}",
-                "message": "Unable to fetch transcript from this YouTube video. This could be due to: 1) The video doesn't have captions/subtitles, 2) The video is private or restricted, 3) Invalid YouTube URL format, or 4) The video may not exist."
-            }), 400
-
-        # Generate summary using AI
-        try:
-            result = genai.generate_summary(ts)
-        except Exception as ai_error:
-            return jsonify({
-                "error": f"Failed to generate summary: {str(ai_error)}",
-                "message": "Successfully fetched transcript but failed to generate summary. Please try again."
-            }), 500
-
-        # Check if content is educational
-        if not result.get('is_educational', True):
-            return jsonify({
-                'title': result['title'],
-                'message': result['summary'],
-                'is_educational': False
-            }), 400  # Return 400 status for non-educational content
+        # Submit-and-poll mode: hand the pipeline to the job queue
+        if job_queue is not None and async_requested():
+            job_id = await event_loop.to_thread(job_queue.submit, 'transcribe', {'yturl': you}, on_finish=hand_off_lease())
+            return jsonify({'job_id': job_id, 'status': 'queued'}), 202
 
+        body, status_code = await transcribe_async(you)
+        return jsonify(body), status_code, resilience.retry_headers(body)
+    except Exception as e:
         return jsonify({
-            'title': result['title'],
-            'message': result['summary'],
-            'is_educational': True
-        })
+            "error": str(e),
+            "message": "An unexpected error occurred while processing the video."
+        }), 500
+
+def stream_transcription():
+    try:
+        data = request.get_json()
+        you = data.get('yturl')
+
+        if not you:
+            return jsonify({"error": "YouTube URL is required"}), 400
+
+        return sse.response(transcribe_events(you))
     except Exception as e:
         return jsonify({
             "error": str(e),
             "message": "An unexpected error occurred while processing the video."
-        }), 500
\ No newline at end of file
+        }), 500
+
+def transcribe_events(yturl):
+    """
+    SSE variant of transcribe: status events, partial markdown chunks, then the title
+    and a final summary event carrying the same body as /transcribe
+    """
+    yield sse.event('status', {'stage': 'fetching_transcript'})
+    try:
+        transcript = yt.get_transcript(yturl)
+    except Exception as transcript_error:
+        yield sse.event('error', {
+            "error": f"Failed to fetch transcript: {str(transcript_error)}",
+            "message": "Unable to fetch transcript from this YouTube video. This could be due to: 1) The video doesn't have captions/subtitles, 2) The video is private or restricted, 3) Invalid YouTube URL format, or 4) The video may not exist.",
+            "status_code": 400
+        })
+        return
+
+    yield sse.event('status', {'stage': 'summarizing'})
+    try:
+        segments = [snippet['text'] for snippet in transcript['snippets']]
+        for name, data in genai.stream_summary(transcript['text'], segments=segments):
+            if name == 'chunk':
+                yield sse.event('chunk', {'text': data})
+            elif name == 'progress':
+                yield sse.event('status', data)
+            elif name == 'title':
+                yield sse.event('title', {'title': data})
+            else:
+                result = data
+    except Exception as ai_error:
+        failure = resilience.failure_response(ai_error)
+        if failure:
+            body, status_code = failure
+            yield sse.event('error', dict(body, status_code=status_code))
+            return
+        yield sse.event('error', {
+            "error": f"Failed to generate summary: {str(ai_error)}",
+            "message": "Successfully fetched transcript but failed to generate summary. Please try again.",
+            "status_code": 500
+        })
+        return
+
+    yield sse.event('summary', {
+        'title': result['title'],
+        'message': result['summary'],
+        'is_educational': result['is_educational'],
+        'status_code': 200 if result['is_educational'] else 400
+    })
+
+def transcribe(yturl, progress=None):
+    """
+    Fetch + summarize pipeline behind /transcribe, returns (body, status_code)
+    """
+    return event_loop.run(transcribe_async(yturl, progress))
+
+async def transcribe_async(yturl, progress=None):
+    """
+    Coalesced by video ID: requests for a video that is already being transcribed
+    wait for that run instead of fetching and summarizing it again
+    """
+    video_id = yt.extract_video_id(yturl)
+    if not video_id:
+        return await run_transcription(yturl, progress)
+    body, status_code = await single_flight.do(f"transcribe:{video_id}", lambda: run_transcription(yturl, progress))
+    return body, status_code
+
+async def run_transcription(yturl, progress=None):
+    # Progress callbacks may write to the job store, so they run off the loop
+    async def report(stage):
+        if progress is not None:
+            await event_loop.to_thread(progress, stage)
+
+    # Get transcript from YouTube
+    await report('fetching_transcript')
+    try:
+        transcript = await yt.get_transcript_async(yturl)
+        ts = transcript['text']
+    except Exception as transcript_error:
+        return {
+            "error": f"Failed to fetch transcript: {str(transcript_error)}",
+            "message": "Unable to fetch transcript from this YouTube video. This could be due to: 1) The video doesn't have captions/subtitles, 2) The video is private or restricted, 3) Invalid YouTube URL format, or 4) The video may not exist."
+        }, 400
+
+    # Generate summary using AI
+    await report('summarizing')
+    try:
+        # Caption snippets mark timestamp boundaries for chunking long transcripts
+        segments = [snippet['text'] for snippet in transcript['snippets']]
+        result = await genai.generate_summary_async(ts, segments=segments)
+    except Exception as ai_error:
+        # Breaker open or deadline exceeded: 503/504 instead of a generic 500
+        failure = resilience.failure_response(ai_error)
+        if failure:
+            return failure
+        return {
+            "error": f"Failed to generate summary: {str(ai_error)}",
+            "message": "Successfully fetched transcript but failed to generate summary. Please try again."
+        }, 500
+
+    # Check if content is educational
+    if not result.get('is_educational', True):
+        return {
+            'title': result['title'],
+            'message': result['summary'],
+            'is_educational': False
+        }, 400  # Return 400 status for non-educational content
+
+    return {
+        'title': result['title'],
+        'message': result['summary'],
+        'is_educational': True
+    }, 200
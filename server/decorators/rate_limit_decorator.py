@@ -0,0 +1,91 @@
+from flask import g, jsonify, make_response, request
+import inspect
+import jwt
+import os
+from functools import wraps
+from auth import rate_limit, tokens
+from aio import event_loop
+
+# Behind a reverse proxy the client address comes from X-Forwarded-For
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes")
+
+def client_key(app):
+    """
+    The signed-in user when a valid bearer token is sent, otherwise the client IP
+    """
+    token = tokens.bearer_token(request.headers.get('Authorization'))
+    if token:
+        try:
+            return f"user:{tokens.decode_token(token, app.config['JWT_SECRET_KEY'])['user_id']}"
+        except (jwt.InvalidTokenError, KeyError):
+            pass
+    address = request.access_route[0] if TRUST_FORWARDED_FOR and request.access_route else request.remote_addr
+    return f"ip:{address}"
+
+def hand_off_lease():
+    """
+    Takes this request's generation slot away from the decorator, for work that outlives the
+    response (an async job). Returns the callable that releases it, or None when not rate limited.
+    """
+    lease = g.pop('rate_limit_lease', None)
+    return lease.release if lease is not None else None
+
+def too_many_requests(e):
+    return jsonify({
+        'error': 'Too many requests',
+        'message': 'You are generating too much too quickly, please try again shortly.' if e.reason == 'rate'
+        else 'You already have generations in progress, please wait for them to finish.',
+        'retry_after': e.retry_after
+    }), 429, {'Retry-After': str(e.retry_after)}
+
+def rate_limited(app,f):
+    if inspect.iscoroutinefunction(f):
+        return rate_limited_async(app, f)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            lease = rate_limit.limiter.acquire(client_key(app), request.content_length)
+        except rate_limit.RateLimited as e:
+            return too_many_requests(e)
+
+        g.rate_limit_lease = lease
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            lease.release()
+            raise
+        if g.pop('rate_limit_lease', None) is None:
+            # Handed off to a job, which releases it when it finishes
+            return response
+        # A streamed body keeps generating after the view returns
+        if response.is_streamed:
+            response.call_on_close(lease.release)
+        else:
+            lease.release()
+        return response
+    return decorated
+
+def rate_limited_async(app,f):
+    """
+    rate_limited for async views: the limiter's store calls (Mongo with that backend) run off the loop
+    """
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        try:
+            lease = await event_loop.to_thread(rate_limit.limiter.acquire, client_key(app), request.content_length)
+        except rate_limit.RateLimited as e:
+            return too_many_requests(e)
+
+        g.rate_limit_lease = lease
+        try:
+            response = make_response(await f(*args, **kwargs))
+        except Exception:
+            await event_loop.to_thread(lease.release)
+            raise
+        if g.pop('rate_limit_lease', None) is None:
+            # Handed off to a job, which releases it when it finishes
+            return response
+        await event_loop.to_thread(lease.release)
+        return response
+    return decorated
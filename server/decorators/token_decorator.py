@@ -1,26 +1,42 @@
 from flask import jsonify, request
+import inspect
 import jwt
 from functools import wraps
+from auth import tokens
+
+def authenticate(app):
+    """
+    Returns (current_user_id, None) for a valid bearer token, otherwise (None, error response)
+    """
+    token = tokens.bearer_token(request.headers.get('Authorization'))
+
+    if not token:
+        return None, (jsonify({'message': 'Token is missing'}), 401)
+
+    try:
+        # Signature is only verified on a cache miss
+        data = tokens.decode_token(token, app.config['JWT_SECRET_KEY'])
+        return data['user_id'], None
+    except jwt.ExpiredSignatureError:
+        return None, (jsonify({'message': 'Token has expired'}), 401)
+    except jwt.InvalidTokenError:
+        return None, (jsonify({'message': 'Token is invalid'}), 401)
 
 def token_required(app,f):
+    # Async views stay async, so the ASGI entry point can await them
+    if inspect.iscoroutinefunction(f):
+        @wraps(f)
+        async def decorated_async(*args, **kwargs):
+            current_user_id, error = authenticate(app)
+            if error:
+                return error
+            return await f(current_user_id, *args, **kwargs)
+        return decorated_async
+
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
-        
-        try:
-            # Remove 'Bearer ' prefix if present
-            if token.startswith('Bearer '):
-                token = token[7:]
-            
-            data = jwt.decode(token, app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-            current_user_id = data['user_id']
-        except jwt.ExpiredSignatureError:
-            return jsonify({'message': 'Token has expired'}), 401
-        except jwt.InvalidTokenError:
-            return jsonify({'message': 'Token is invalid'}), 401
-        
+        current_user_id, error = authenticate(app)
+        if error:
+            return error
         return f(current_user_id, *args, **kwargs)
-    return decorated
\ No newline at end of file
+    return decorated
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Calls at or below this temperature are deterministic enough to reuse
+CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.1"))
+CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+
+def make_key(model, system_instruction, temperature, contents, extra=None):
+    """
+    Content-addressed cache key for a single generate_content call
+    """
+    payload = json.dumps(
+        [model, system_instruction, temperature, contents, extra],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two tier cache for model responses.
+    The first tier is an in-process LRU bounded by entry count and total bytes,
+    the optional second tier is a Mongo collection shared by every worker.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.collection = None
+        self._entries = OrderedDict()  # key -> (expires_at, text)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+
+    def attach_collection(self, collection):
+        """
+        Enables the persistent tier. Expired documents are removed by a TTL index.
+        """
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection = collection
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, text = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return text
+                self._remove(key)
+                self._counters["expirations"] += 1
+
+        text = self._get_persistent(key)
+        with self._lock:
+            if text is None:
+                self._counters["misses"] += 1
+                return None
+            self._counters["persistent_hits"] += 1
+            self._store(key, text, now + self.ttl)
+        return text
+
+    def set(self, key, text):
+        if text is None:
+            return
+        with self._lock:
+            self._store(key, text, time.time() + self.ttl)
+        self._set_persistent(key, text)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["persistent_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["persistent_hits"]) / lookups, 4) if lookups else 0.0
+        stats["persistent"] = self.collection is not None
+        return stats
+
+    def _store(self, key, text, expires_at):
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (expires_at, text)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters["evictions"] += 1
+
+    def _remove(self, key):
+        _, text = self._entries.pop(key)
+        self._bytes -= len(text.encode('utf-8'))
+
+    def _get_persistent(self, key):
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"text": 1}
+            )
+        except Exception as e:
+            print(f"Error reading LLM cache: {e}")
+            return None
+        return doc["text"] if doc else None
+
+    def _set_persistent(self, key, text):
+        if self.collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {"_id": key},
+                {"$set": {
+                    "text": text,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl)
+                }},
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing LLM cache: {e}")
+
+
+response_cache = ResponseCache()
+
+
+def setup(collection):
+    """
+    Attaches the Mongo tier when LLM_CACHE_PERSIST is enabled
+    """
+    if os.getenv("LLM_CACHE_PERSIST", "false").lower() in ("1", "true", "yes"):
+        response_cache.attach_collection(collection)
+    return response_cache
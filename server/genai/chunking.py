@@ -0,0 +1,83 @@
+import re
+
+# Rough size of a token for Gemini models on English text
+CHARS_PER_TOKEN = 4
+
+page_marker = re.compile(r"(?=\n\n--- Page \d+ ---\n\n)")
+paragraph_break = re.compile(r"\n\s*\n")
+sentence_end = re.compile(r"(?<=[.!?])\s+")
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_segments(text):
+    """
+    Splits text on its natural boundaries: PDF page markers if present, otherwise paragraphs
+    """
+    if page_marker.search(text):
+        segments = page_marker.split(text)
+    else:
+        segments = paragraph_break.split(text)
+    return [segment for segment in segments if segment.strip()]
+
+
+def _split_oversized(segment, budget):
+    """
+    Breaks a segment that alone exceeds the budget on sentence, then word, boundaries
+    """
+    pieces = sentence_end.split(segment)
+    if len(pieces) == 1:
+        pieces = segment.split(" ")
+    parts = []
+    current = []
+    current_tokens = 0
+    for piece in pieces:
+        piece_tokens = estimate_tokens(piece)
+        if current and current_tokens + piece_tokens > budget:
+            parts.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(piece)
+        current_tokens += piece_tokens
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+
+def chunk_segments(segments, budget, separator="\n\n"):
+    """
+    Greedily packs consecutive segments into chunks of at most `budget` estimated tokens.
+    Chunk boundaries always fall on segment boundaries unless a single segment is too big.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for segment in segments:
+        segment_tokens = estimate_tokens(segment)
+        if segment_tokens > budget:
+            pieces = _split_oversized(segment, budget)
+        else:
+            pieces = [segment]
+        for piece in pieces:
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > budget:
+                chunks.append(separator.join(current))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_text(text, budget, segments=None):
+    """
+    Chunks text for map-reduce summarization. Transcripts can pass their caption
+    snippets as `segments` so chunks end on timestamp boundaries.
+    """
+    if segments:
+        return chunk_segments(segments, budget, separator=" ")
+    return chunk_segments(split_segments(text), budget)
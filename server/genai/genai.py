@@ -1,18 +1,138 @@
-from google import genai
-from google.genai import types
+import asyncio
+import hashlib
+import json
 import os
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from genai import cache as llm_cache
+from genai import chunking
+from genai import resilience
+from aio import event_loop
+from metrics import metrics
 
 load_dotenv()
 
 api = os.getenv("GEMINI_API")
 llm = "gemini-2.0-flash-001"
 
-# Configure the API key
-client = genai.Client(
-    api_key=api,
-    http_options=types.HttpOptions(api_version='v1alpha')
-)
+# How generate_summary talks to the model: "sequential" (validate, summary, title one after another),
+# "concurrent" (validate, then summary and title in parallel) or "structured" (one JSON response)
+summary_strategy = os.getenv("SUMMARY_STRATEGY", "sequential").lower()
+
+# Inputs above this many estimated tokens are summarized chunk by chunk (map-reduce)
+map_reduce_threshold_tokens = int(os.getenv("SUMMARY_MAP_REDUCE_THRESHOLD_TOKENS", "30000"))
+chunk_tokens = int(os.getenv("SUMMARY_CHUNK_TOKENS", "8000"))
+map_concurrency = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+# While chunks are summarized, streamed responses repeat their progress at least this often
+stream_progress_seconds = float(os.getenv("SUMMARY_STREAM_PROGRESS_SECONDS", "10"))
+# Gemini calls one process keeps in flight on the async path; the rest wait their turn
+max_concurrency = int(os.getenv("GENAI_MAX_CONCURRENCY", "256"))
+
+# HTTP connection pool of the Gemini client, per process and per (sync/async) transport
+http_max_connections = int(os.getenv("GEMINI_HTTP_MAX_CONNECTIONS", "100"))
+http_max_keepalive = int(os.getenv("GEMINI_HTTP_MAX_KEEPALIVE", "50"))
+http_keepalive_seconds = float(os.getenv("GEMINI_HTTP_KEEPALIVE_SECONDS", "60"))
+# Whole-request timeout (connect, upload and generation)
+http_timeout_seconds = float(os.getenv("GEMINI_HTTP_TIMEOUT_SECONDS", "120"))
+
+# Created on first use in each process, so pre-forking servers never share one across workers
+client = None
+client_pid = None
+client_lock = threading.Lock()
+http_transports = {}
+call_counters = {"in_flight": 0, "waiting": 0, "max_in_flight": 0}
+
+def http_options():
+    """
+    HttpOptions with our own keepalive-pooled httpx transports, kept in http_transports for pool_stats()
+    """
+    import httpx
+    from google.genai import types
+
+    limits = httpx.Limits(
+        max_connections=http_max_connections,
+        max_keepalive_connections=http_max_keepalive,
+        keepalive_expiry=http_keepalive_seconds,
+    )
+    # Passing a transport also keeps the async client on httpx rather than aiohttp
+    http_transports["sync"] = httpx.HTTPTransport(limits=limits)
+    http_transports["async"] = httpx.AsyncHTTPTransport(limits=limits)
+    return types.HttpOptions(
+        api_version='v1alpha',
+        timeout=int(http_timeout_seconds * 1000),
+        client_args={"transport": http_transports["sync"]},
+        async_client_args={"transport": http_transports["async"]},
+    )
+
+def get_client():
+    global client, client_pid
+    if client is None or client_pid != os.getpid():
+        with client_lock:
+            if client is None or client_pid != os.getpid():
+                # Imported on first use: google-genai and its pydantic models dominate startup time
+                from google import genai
+
+                # Configure the API key
+                client = genai.Client(
+                    api_key=api,
+                    http_options=http_options()
+                )
+                client_pid = os.getpid()
+    return client
+
+def set_client(new_client):
+    """
+    Replaces the Gemini client for this process, e.g. with a fake in benchmarks
+    """
+    global client, client_pid
+    client = new_client
+    client_pid = os.getpid()
+    http_transports.clear()
+
+@contextmanager
+def http_request():
+    """
+    Wraps one Gemini HTTP request for the in-flight and connection pool gauges on /metrics
+    """
+    metrics.gemini_requests_in_flight.inc()
+    try:
+        yield
+    finally:
+        metrics.gemini_requests_in_flight.dec()
+        for name, connections in http_connections().items():
+            metrics.gemini_http_connections.labels(transport=name, state="active").set(connections["connections"] - connections["idle"])
+            metrics.gemini_http_connections.labels(transport=name, state="idle").set(connections["idle"])
+
+def http_connections():
+    connections = {}
+    for name, transport in list(http_transports.items()):
+        # httpcore has no public counters; read the pool's connection and request lists
+        pool = getattr(transport, "_pool", None)
+        if pool is None:
+            continue
+        pool_connections = list(pool.connections)
+        requests = list(getattr(pool, "_requests", []))
+        connections[name] = {
+            "connections": len(pool_connections),
+            "idle": sum(1 for connection in pool_connections if connection.is_idle()),
+            "active_requests": len(requests),
+            "queued_requests": sum(1 for request in requests if request.is_queued()),
+        }
+    return connections
+
+def pool_stats():
+    """
+    Gemini calls in flight / waiting for a GENAI_MAX_CONCURRENCY slot, plus the HTTP connection pools
+    """
+    stats = dict(call_counters)
+    stats["max_concurrency"] = max_concurrency
+    stats["max_connections"] = http_max_connections
+    stats["max_keepalive"] = http_max_keepalive
+    stats.update(http_connections())
+    return stats
 
 instruction = "You are a helpful study guide. You will receive long text inputs, which can be any language, but you will respond in english only, unless asked otherwise. Your task is to summarize that text into 400 words or less. List the key topics as points. Do this, unless stated otherwise. If it is asked to explain a topic which is not included in the transcript, briefly respond that the requested content is not available. Just generate the summary. No need to generate content like 'Here's a summary of the text about the topic'. Don't mention the word 'video' anywhere in the response. Generate the response in markdown format."
 
@@ -24,86 +144,458 @@ test_instruction = "You are an educational assessment creator. Based on the prov
 
 content_validation_instruction = "You are a content validator for an educational application. Your task is to determine if the provided text content is related to educational, academic, or study purposes. Educational content includes: academic subjects, tutorials, lectures, educational explanations, skill development, professional training, science, mathematics, history, literature, language learning, certification courses, etc. Non-educational content includes: entertainment, gaming, personal vlogs, comedy, music videos, movie reviews, gossip, non-educational personal stories, etc. Respond with only 'EDUCATIONAL' if the content is study-related, or 'NON_EDUCATIONAL' if it's not related to studies. Do not provide any explanation."
 
+structured_summary_instruction = "You are a helpful study guide for an educational application. You will receive long text inputs, which can be any language, but you will respond in english only. First decide whether the text is related to educational, academic, or study purposes (academic subjects, tutorials, lectures, skill development, professional training, science, mathematics, history, literature, language learning, certification courses, etc.) or not (entertainment, gaming, personal vlogs, comedy, music videos, movie reviews, gossip, non-educational personal stories, etc.) and set is_educational accordingly. If it is educational, set title to a concise, descriptive title (maximum 80 characters) that captures the main topic, and set summary to a markdown summary of the text in 400 words or less that lists the key topics as points. Don't add content like 'Here's a summary of the text about the topic'. Don't mention the word 'video' in the title or the summary. If it is not educational, leave title and summary empty."
+
+structured_summary_schema = {
+    "type": "OBJECT",
+    "properties": {
+        "is_educational": {"type": "BOOLEAN"},
+        "title": {"type": "STRING"},
+        "summary": {"type": "STRING"},
+    },
+    "required": ["is_educational", "title", "summary"],
+    "property_ordering": ["is_educational", "title", "summary"],
+}
+
+chunk_summary_instruction = "You are a helpful study guide. You will receive one part of a longer text, which can be any language, but you will respond in english only. Summarize this part in 200 words or less as markdown bullet points, keeping every key topic, definition, formula and example it covers. Just generate the summary without any introduction. Don't mention the word 'video' anywhere in the response."
+
+reduce_instruction = "You are a helpful study guide. You will receive partial summaries of consecutive parts of one long text, in order. Combine them into a single summary of the whole text in 400 words or less. List the key topics as points. Remove repetition between parts. Just generate the summary. No need to generate content like 'Here's a summary of the text about the topic'. Don't mention the word 'video' or 'part' anywhere in the response. Generate the response in markdown format."
+
+non_educational_result = {
+    'title': 'Non-Educational Content',
+    'summary': 'Sorry, this content is not related to study purposes. This application is designed for educational content only.',
+    'is_educational': False
+}
+
+# Short names for each kind of call, used for latency tracking (hedge delays) and stats
+instruction_kinds = {
+    instruction: "summary",
+    title_instruction: "title",
+    questions_instruction: "questions",
+    test_instruction: "test",
+    content_validation_instruction: "validation",
+    structured_summary_instruction: "structured_summary",
+    chunk_summary_instruction: "chunk_summary",
+    reduce_instruction: "reduce",
+}
+
+def instruction_kind(system_instruction):
+    return instruction_kinds.get(system_instruction, "other")
+
+def summary_fingerprint(strategy=None, streaming=False):
+    """
+    Identifies the model and prompts a summary comes from, so a stored summary is only reused while they are unchanged.
+    The sequential, concurrent and streaming paths send the same prompts and share a fingerprint.
+    """
+    strategy = strategy or summary_strategy
+    if strategy == "structured" and not streaming:
+        prompts = [structured_summary_instruction, structured_summary_schema]
+    else:
+        prompts = [content_validation_instruction, instruction, title_instruction]
+    # Long inputs go through map-reduce whatever the strategy
+    prompts += [chunk_summary_instruction, reduce_instruction, map_reduce_threshold_tokens, chunk_tokens]
+    payload = json.dumps([llm, prompts], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+# Pool for the model calls the streaming path fans out from request threads
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("GENAI_WORKERS", "8")))
+
+# asyncio.Semaphore bound to the running loop, recreated if the process loop changes (after a fork)
+call_slots = {"loop": None, "semaphore": None}
+
+def get_call_slots():
+    loop = asyncio.get_running_loop()
+    if call_slots["loop"] is not loop:
+        call_slots.update(loop=loop, semaphore=asyncio.Semaphore(max_concurrency))
+    return call_slots["semaphore"]
+
+def generation_config(system_instruction, temperature, response_schema=None, timeout=None):
+    from google.genai import types
+
+    config = {
+        "system_instruction": system_instruction,
+        "temperature": temperature,
+    }
+    if response_schema is not None:
+        config["response_mime_type"] = "application/json"
+        config["response_schema"] = response_schema
+    if timeout is not None:
+        # What is left of the call deadline for this attempt
+        config["http_options"] = types.HttpOptions(timeout=max(1, int(timeout * 1000)))
+    return types.GenerateContentConfig(**config)
+
+def generate_text(contents, system_instruction, temperature, cacheable=None, response_schema=None):
+    """
+    Runs a single generate_content call and returns the stripped response text.
+    Calls at or below LLM_CACHE_MAX_TEMPERATURE are served from the response cache.
+    Passing a response_schema asks the model for JSON matching that schema.
+    Retries, the call deadline and the circuit breaker come from genai.resilience.
+    """
+    if cacheable is None:
+        cacheable = temperature <= llm_cache.CACHE_MAX_TEMPERATURE
+
+    key = None
+    if cacheable:
+        key = llm_cache.make_key(llm, system_instruction, temperature, contents, response_schema)
+        cached = llm_cache.response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    kind = instruction_kind(system_instruction)
+
+    def attempt(timeout):
+        with http_request(), metrics.timed(metrics.gemini_call_seconds, span="llm", kind=kind):
+            return get_client().models.generate_content(
+                model=llm,
+                contents=contents,
+                config=generation_config(system_instruction, temperature, response_schema, timeout)
+            )
+
+    response = resilience.call(attempt, kind)
+    text = response.text.strip()
+    metrics.observe_gemini_sizes(kind, contents, text)
+
+    if cacheable:
+        llm_cache.response_cache.set(key, text)
+    return text
+
+async def cache_call(method, *args):
+    # The Mongo tier is synchronous, keep it off the event loop
+    if llm_cache.response_cache.collection is None:
+        return method(*args)
+    return await event_loop.to_thread(method, *args)
+
+async def generate_text_async(contents, system_instruction, temperature, cacheable=None, response_schema=None):
+    """
+    Async counterpart of generate_text on the client's aio API.
+    At most GENAI_MAX_CONCURRENCY calls are in flight per process; with GEMINI_HEDGE
+    a slow attempt is raced against a second one after the recent p95 latency.
+    """
+    if cacheable is None:
+        cacheable = temperature <= llm_cache.CACHE_MAX_TEMPERATURE
+
+    key = None
+    if cacheable:
+        key = llm_cache.make_key(llm, system_instruction, temperature, contents, response_schema)
+        cached = await cache_call(llm_cache.response_cache.get, key)
+        if cached is not None:
+            return cached
+
+    kind = instruction_kind(system_instruction)
+
+    async def attempt(timeout):
+        slots = get_call_slots()
+        call_counters["waiting"] += 1
+        try:
+            await slots.acquire()
+        finally:
+            call_counters["waiting"] -= 1
+        call_counters["in_flight"] += 1
+        call_counters["max_in_flight"] = max(call_counters["max_in_flight"], call_counters["in_flight"])
+        try:
+            with http_request(), metrics.timed(metrics.gemini_call_seconds, span="llm", kind=kind):
+                return await get_client().aio.models.generate_content(
+                    model=llm,
+                    contents=contents,
+                    config=generation_config(system_instruction, temperature, response_schema, timeout)
+                )
+        finally:
+            call_counters["in_flight"] -= 1
+            slots.release()
+
+    response = await resilience.call_async(attempt, kind)
+    text = response.text.strip()
+    metrics.observe_gemini_sizes(kind, contents, text)
+
+    if cacheable:
+        await cache_call(llm_cache.response_cache.set, key, text)
+    return text
+
+def generate_text_stream(contents, system_instruction, temperature):
+    """
+    Streaming counterpart of generate_text, yields the response text as it is generated
+    """
+    cacheable = temperature <= llm_cache.CACHE_MAX_TEMPERATURE
+    key = None
+    if cacheable:
+        key = llm_cache.make_key(llm, system_instruction, temperature, contents)
+        cached = llm_cache.response_cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    parts = []
+    # Not retried once text has been sent, but still subject to the breaker and the deadline
+    kind = instruction_kind(system_instruction)
+    with resilience.breaker.guard(), http_request(), metrics.timed(metrics.gemini_call_seconds, span="llm", kind=kind):
+        for chunk in get_client().models.generate_content_stream(
+            model=llm,
+            contents=contents,
+            config=generation_config(system_instruction, temperature, timeout=resilience.GEMINI_DEADLINE_SECONDS)
+        ):
+            if chunk.text:
+                parts.append(chunk.text)
+                yield chunk.text
+    metrics.observe_gemini_sizes(kind, contents, "".join(parts))
+
+    if cacheable:
+        llm_cache.response_cache.set(key, "".join(parts).strip())
+
 def validate_educational_content(transcript):
     """
     Validates if the content is educational/study-related
     Returns True if educational, False if not
     """
-    validation_response = client.models.generate_content(
-        model=llm,
-        contents=transcript,
-        config=types.GenerateContentConfig(
-            system_instruction=content_validation_instruction,
-            temperature=0.1,  # Low temperature for consistent validation
-        )
+    validation_result = generate_text(
+        transcript,
+        content_validation_instruction,
+        0.1,  # Low temperature for consistent validation
     )
-    
-    validation_result = validation_response.text.strip().upper()
-    return validation_result == "EDUCATIONAL"
+    return validation_result.upper() == "EDUCATIONAL"
+
+async def validate_educational_content_async(transcript):
+    validation_result = await generate_text_async(
+        transcript,
+        content_validation_instruction,
+        0.1,  # Low temperature for consistent validation
+    )
+    return validation_result.upper() == "EDUCATIONAL"
+
+def generate_summary(transcript, strategy=None, segments=None):
+    """
+    Returns {title, summary, is_educational} for the transcript.
+    The strategy defaults to SUMMARY_STRATEGY. Inputs too long for a single call
+    are summarized with map-reduce; `segments` (e.g. caption snippets) set the chunk boundaries.
+    Blocks the calling thread while generate_summary_async runs on the process event loop.
+    """
+    return event_loop.run(generate_summary_async(transcript, strategy, segments))
 
-def generate_summary(transcript):
+async def generate_summary_async(transcript, strategy=None, segments=None):
+    if chunking.estimate_tokens(transcript) > map_reduce_threshold_tokens:
+        return await generate_summary_map_reduce(transcript, segments)
+
+    strategy = strategy or summary_strategy
+    if strategy == "structured":
+        return await generate_summary_structured(transcript)
+    if strategy == "concurrent":
+        return await generate_summary_concurrent(transcript)
+    return await generate_summary_sequential(transcript)
+
+async def generate_summary_sequential(transcript):
     # First validate if content is educational
-    if not validate_educational_content(transcript):
-        return {
-            'title': 'Non-Educational Content',
-            'summary': 'Sorry, this content is not related to study purposes. This application is designed for educational content only.',
-            'is_educational': False
-        }
+    if not await validate_educational_content_async(transcript):
+        return dict(non_educational_result)
     
     # Generate summary
-    summary_response = client.models.generate_content(
-        model=llm,
-        contents=transcript,
-        config=types.GenerateContentConfig(
-            system_instruction=instruction,
-            temperature=0.3,
-        )
-    )
+    summary = await generate_text_async(transcript, instruction, 0.3)
     
     # Generate title
-    title_response = client.models.generate_content(
-        model=llm,
-        contents=transcript,
-        config=types.GenerateContentConfig(
-            system_instruction=title_instruction,
-            temperature=0.3,
-        )
-    )
+    title = await generate_text_async(transcript, title_instruction, 0.3)
     
     return {
-        'title': title_response.text.strip(),
-        'summary': summary_response.text.strip(),
+        'title': title,
+        'summary': summary,
+        'is_educational': True
+    }
+
+async def generate_summary_concurrent(transcript):
+    # First validate if content is educational
+    if not await validate_educational_content_async(transcript):
+        return dict(non_educational_result)
+
+    # Summary and title don't depend on each other, so request them together
+    summary, title = await asyncio.gather(
+        generate_text_async(transcript, instruction, 0.3),
+        generate_text_async(transcript, title_instruction, 0.3),
+    )
+
+    return {
+        'title': title,
+        'summary': summary,
+        'is_educational': True
+    }
+
+async def generate_summary_structured(transcript):
+    """
+    Validation, summary and title from a single schema-constrained JSON response.
+    Falls back to the concurrent strategy if the response can't be parsed.
+    """
+    response_text = await generate_text_async(
+        transcript,
+        structured_summary_instruction,
+        0.3,
+        response_schema=structured_summary_schema,
+    )
+    try:
+        result = json.loads(response_text)
+        is_educational = bool(result['is_educational'])
+        title = str(result.get('title', '')).strip()
+        summary = str(result.get('summary', '')).strip()
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Error parsing structured summary: {e}")
+        return await generate_summary_concurrent(transcript)
+
+    if not is_educational:
+        return dict(non_educational_result)
+    if not title or not summary:
+        return await generate_summary_concurrent(transcript)
+
+    return {
+        'title': title,
+        'summary': summary,
+        'is_educational': True
+    }
+
+async def summarize_chunks(chunks, on_done=None):
+    """
+    Map step: summarizes every chunk, at most SUMMARY_MAP_CONCURRENCY at a time, preserving order.
+    on_done() is called as each chunk finishes.
+    """
+    slots = asyncio.Semaphore(map_concurrency)
+
+    async def summarize(chunk):
+        async with slots:
+            partial = await generate_text_async(chunk, chunk_summary_instruction, 0.3)
+        if on_done is not None:
+            on_done()
+        return partial
+
+    return list(await asyncio.gather(*(summarize(chunk) for chunk in chunks)))
+
+def join_partials(partials):
+    return "\n\n".join(f"Part {index}:\n{partial}" for index, partial in enumerate(partials, start=1))
+
+async def collapse_partials(partials):
+    """
+    Summarizes groups of partial summaries until they fit in one chunk
+    """
+    while len(partials) > 1 and chunking.estimate_tokens(join_partials(partials)) > chunk_tokens:
+        groups = chunking.chunk_segments(partials, chunk_tokens)
+        if len(groups) == len(partials):
+            break
+        partials = await summarize_chunks(groups)
+    return partials
+
+async def reduce_summaries(partials):
+    """
+    Reduce step: merges partial summaries into the final summary
+    """
+    return await generate_text_async(join_partials(await collapse_partials(partials)), reduce_instruction, 0.3)
+
+async def generate_summary_map_reduce(transcript, segments=None):
+    chunks = chunking.chunk_text(transcript, chunk_tokens, segments)
+
+    # Validate on the opening chunk, which is representative and fits in one call
+    if not await validate_educational_content_async(chunks[0]):
+        return dict(non_educational_result)
+
+    partials = await summarize_chunks(chunks)
+
+    # The title only needs the gist, so it is generated from the partials alongside the reduce
+    title_input = join_partials(partials)[:chunk_tokens * chunking.CHARS_PER_TOKEN]
+    title, summary = await asyncio.gather(
+        generate_text_async(title_input, title_instruction, 0.3),
+        reduce_summaries(partials),
+    )
+
+    return {
+        'title': title,
+        'summary': summary,
+        'is_educational': True
+    }
+
+def summarize_chunks_with_progress(chunks):
+    """
+    Runs the map step on the loop, yielding ("progress", {...}) as chunks finish and at least every
+    SUMMARY_STREAM_PROGRESS_SECONDS. Returns the partial summaries (use with `yield from`).
+    """
+    finished = queue.Queue()
+    future = event_loop.submit(summarize_chunks(chunks, on_done=lambda: finished.put("chunk")))
+    future.add_done_callback(lambda _: finished.put("all"))
+    done = 0
+    try:
+        yield "progress", {"stage": "summarizing_chunks", "done": done, "total": len(chunks)}
+        while True:
+            try:
+                item = finished.get(timeout=stream_progress_seconds)
+            except queue.Empty:
+                item = None
+            if item == "all":
+                break
+            if item == "chunk":
+                done += 1
+            yield "progress", {"stage": "summarizing_chunks", "done": done, "total": len(chunks)}
+        return future.result()
+    finally:
+        # The client went away mid-map
+        future.cancel()
+
+def stream_summary(transcript, segments=None):
+    """
+    Streaming counterpart of generate_summary. Yields ("chunk", markdown) pieces as the
+    summary is generated, then ("title", title) and finally ("summary", result dict).
+    Validation runs alongside the first summary chunk; nothing is yielded until it passes.
+    Long inputs first yield ("progress", {...}) events while validating and mapping the chunks,
+    then stream the reduce step.
+    """
+    if chunking.estimate_tokens(transcript) > map_reduce_threshold_tokens:
+        chunks = chunking.chunk_text(transcript, chunk_tokens, segments)
+        yield "progress", {"stage": "validating"}
+        if not validate_educational_content(chunks[0]):
+            yield "summary", dict(non_educational_result)
+            return
+        partials = yield from summarize_chunks_with_progress(chunks)
+        yield "progress", {"stage": "combining"}
+        title_input = join_partials(partials)[:chunk_tokens * chunking.CHARS_PER_TOKEN]
+        validation_future = None
+        stream = generate_text_stream(join_partials(event_loop.run(collapse_partials(partials))), reduce_instruction, 0.3)
+    else:
+        title_input = transcript
+        validation_future = executor.submit(validate_educational_content, transcript)
+        stream = generate_text_stream(transcript, instruction, 0.3)
+
+    first = next(stream, "")
+    if validation_future is not None and not validation_future.result():
+        stream.close()
+        yield "summary", dict(non_educational_result)
+        return
+
+    title_future = executor.submit(generate_text, title_input, title_instruction, 0.3)
+    parts = [first]
+    if first:
+        yield "chunk", first
+    for text in stream:
+        parts.append(text)
+        yield "chunk", text
+
+    title = title_future.result()
+    yield "title", title
+    yield "summary", {
+        'title': title,
+        'summary': "".join(parts).strip(),
         'is_educational': True
     }
 
 def generate_questions(content):
+    return event_loop.run(generate_questions_async(content))
+
+async def generate_questions_async(content):
     # Generate questions
-    questions_response = client.models.generate_content(
-        model=llm,
-        contents=content,
-        config=types.GenerateContentConfig(
-            system_instruction=questions_instruction,
-            temperature=0.4,
-        )
-    )
+    questions = await generate_text_async(content, questions_instruction, 0.4)
     
     return {
-        'questions': questions_response.text.strip()
+        'questions': questions
     }
 
 def generate_test(content):
+    return event_loop.run(generate_test_async(content))
+
+async def generate_test_async(content):
     # Generate test
-    test_response = client.models.generate_content(
-        model=llm,
-        contents=content,
-        config=types.GenerateContentConfig(
-            system_instruction=test_instruction,
-            temperature=0.4,
-        )
-    )
+    test = await generate_text_async(content, test_instruction, 0.4)
     
     return {
-        'test': test_response.text.strip()
+        'test': test
     }
 
 # print(response.text)
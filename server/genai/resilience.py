@@ -0,0 +1,317 @@
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+load_dotenv()
+
+GEMINI_RETRY_ATTEMPTS = int(os.getenv("GEMINI_RETRY_ATTEMPTS", "3"))
+GEMINI_RETRY_INITIAL_SECONDS = float(os.getenv("GEMINI_RETRY_INITIAL_SECONDS", "1"))
+GEMINI_RETRY_MAX_SECONDS = float(os.getenv("GEMINI_RETRY_MAX_SECONDS", "8"))
+# Budget for one logical call: every attempt, hedge and backoff sleep together
+GEMINI_DEADLINE_SECONDS = float(os.getenv("GEMINI_DEADLINE_SECONDS", "90"))
+# Longest a single attempt may take, so a hung request leaves time in the budget for retries
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("GEMINI_ATTEMPT_TIMEOUT_SECONDS", "30"))
+# Hedging sends a second identical request when the first is slower than the recent p95
+GEMINI_HEDGE = os.getenv("GEMINI_HEDGE", "false").lower() in ("1", "true", "yes")
+GEMINI_HEDGE_PERCENTILE = float(os.getenv("GEMINI_HEDGE_PERCENTILE", "0.95"))
+GEMINI_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("GEMINI_HEDGE_MIN_DELAY_SECONDS", "2"))
+GEMINI_HEDGE_MIN_SAMPLES = int(os.getenv("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+# Consecutive upstream failures that open the breaker, and how long it stays open
+GEMINI_BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+GEMINI_BREAKER_COOLDOWN_SECONDS = float(os.getenv("GEMINI_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Rate limiting, timeouts and server-side errors; anything else is the request's fault
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """
+    Raised without calling Gemini while the breaker is open; callers answer 503 with Retry-After
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("The AI service is temporarily unavailable")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def is_retryable(error):
+    # Imported here to keep google-genai and httpx off the startup path
+    import httpx
+    from google.genai import errors
+
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+class CircuitBreaker:
+    """
+    Opens after GEMINI_BREAKER_FAILURES consecutive upstream failures and rejects calls for the
+    cooldown. Then a single probe is let through (half-open); its outcome closes or reopens it.
+    """
+
+    def __init__(self, failures=GEMINI_BREAKER_FAILURES, cooldown=GEMINI_BREAKER_COOLDOWN_SECONDS):
+        self.failures = failures
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._counters = {"opened": 0, "rejected": 0, "successes": 0, "failures": 0}
+
+    def allow(self):
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.cooldown - time.monotonic()
+                if remaining > 0:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpen(math.ceil(remaining))
+                self._state = HALF_OPEN
+                metrics.observe_breaker(self._state, self._consecutive_failures)
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    self._counters["rejected"] += 1
+                    raise CircuitOpen(1)
+                self._probe_in_flight = True
+
+    def record(self, healthy):
+        with self._lock:
+            self._probe_in_flight = False
+            if healthy:
+                self._counters["successes"] += 1
+                self._consecutive_failures = 0
+                self._state = CLOSED
+            else:
+                self._counters["failures"] += 1
+                self._consecutive_failures += 1
+                if self._state == HALF_OPEN or self._consecutive_failures >= self.failures:
+                    if self._state != OPEN:
+                        self._counters["opened"] += 1
+                    self._state = OPEN
+                    self._opened_at = time.monotonic()
+            metrics.observe_breaker(self._state, self._consecutive_failures)
+
+    def release(self):
+        """
+        Frees the probe slot without recording an outcome
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    @contextmanager
+    def guard(self):
+        """
+        Wraps one upstream request: rejects it while open and records whether the upstream answered.
+        A cancelled request (the losing side of a hedge) never answered, so it counts as neither.
+        """
+        self.allow()
+        try:
+            yield
+        except Exception as e:
+            self.record(not is_retryable(e))
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record(True)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["state"] = self._state
+            stats["consecutive_failures"] = self._consecutive_failures
+            if self._state == OPEN:
+                stats["retry_after"] = max(0, math.ceil(self._opened_at + self.cooldown - time.monotonic()))
+        return stats
+
+
+class LatencyTracker:
+    """
+    Recent successful call latencies per kind of call, for the hedge delay
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, seconds):
+        with self._lock:
+            self._samples.setdefault(kind, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, kind, fraction):
+        with self._lock:
+            samples = sorted(self._samples.get(kind, ()))
+        if len(samples) < GEMINI_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+breaker = CircuitBreaker()
+latencies = LatencyTracker()
+_counters_lock = threading.Lock()
+_counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedges_won": 0, "deadline_exceeded": 0}
+
+
+def _count(name, delta=1):
+    with _counters_lock:
+        _counters[name] += delta
+
+
+def hedge_delay(kind):
+    if not GEMINI_HEDGE:
+        return None
+    p95 = latencies.percentile(kind, GEMINI_HEDGE_PERCENTILE)
+    if p95 is None:
+        return None
+    return max(GEMINI_HEDGE_MIN_DELAY_SECONDS, p95)
+
+
+def _retrying(retrying_class):
+    import tenacity
+
+    def before_sleep(retry_state):
+        _count("retries")
+
+    return retrying_class(
+        stop=tenacity.stop_after_attempt(GEMINI_RETRY_ATTEMPTS) | tenacity.stop_after_delay(GEMINI_DEADLINE_SECONDS),
+        wait=tenacity.wait_exponential_jitter(initial=GEMINI_RETRY_INITIAL_SECONDS, max=GEMINI_RETRY_MAX_SECONDS),
+        retry=tenacity.retry_if_exception(is_retryable),
+        before_sleep=before_sleep,
+        reraise=True,
+    )
+
+
+def _attempt_timeout(deadline):
+    """
+    Timeout for the next attempt: GEMINI_ATTEMPT_TIMEOUT_SECONDS, or whatever is left of the deadline
+    """
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        _count("deadline_exceeded")
+        raise DeadlineExceeded(f"Gemini call exceeded its {GEMINI_DEADLINE_SECONDS:g}s deadline")
+    return min(GEMINI_ATTEMPT_TIMEOUT_SECONDS, remaining)
+
+
+def call(attempt, kind):
+    """
+    Runs attempt(timeout_seconds) with retries, the call deadline and the circuit breaker.
+    Synchronous; used by the streaming path's side calls.
+    """
+    import tenacity
+
+    _count("calls")
+    deadline = time.monotonic() + GEMINI_DEADLINE_SECONDS
+    for retry_attempt in _retrying(tenacity.Retrying):
+        with retry_attempt:
+            timeout = _attempt_timeout(deadline)
+            _count("attempts")
+            started = time.monotonic()
+            with breaker.guard():
+                result = attempt(timeout)
+            latencies.record(kind, time.monotonic() - started)
+    return result
+
+
+async def _timed(attempt, kind, timeout):
+    _count("attempts")
+    started = time.monotonic()
+    with breaker.guard():
+        result = await asyncio.wait_for(attempt(timeout), timeout)
+    latencies.record(kind, time.monotonic() - started)
+    return result
+
+
+async def _hedged(attempt, kind, timeout):
+    delay = hedge_delay(kind)
+    if delay is None or delay >= timeout:
+        return await _timed(attempt, kind, timeout)
+
+    primary = asyncio.ensure_future(_timed(attempt, kind, timeout))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        return primary.result()
+
+    # The first request is slower than usual: race an identical one and keep whichever answers first
+    _count("hedges")
+    hedge = asyncio.ensure_future(_timed(attempt, kind, timeout - delay))
+    pending = {primary, hedge}
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _count("hedges_won")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in (primary, hedge):
+            if not task.done():
+                task.cancel()
+
+
+async def call_async(attempt, kind):
+    """
+    Runs the coroutine factory attempt(timeout_seconds) with retries, an optional hedged
+    request, the call deadline and the circuit breaker
+    """
+    import tenacity
+
+    _count("calls")
+    deadline = time.monotonic() + GEMINI_DEADLINE_SECONDS
+    async for retry_attempt in _retrying(tenacity.AsyncRetrying):
+        with retry_attempt:
+            result = await _hedged(attempt, kind, _attempt_timeout(deadline))
+    return result
+
+
+def stats():
+    with _counters_lock:
+        stats = dict(_counters)
+    stats["breaker"] = breaker.stats()
+    stats["hedging"] = GEMINI_HEDGE
+    return stats
+
+
+def failure_response(error):
+    """
+    (body, status_code) for a call the breaker rejected or that ran out of time, None for other errors
+    """
+    if isinstance(error, CircuitOpen):
+        return {
+            "error": str(error),
+            "message": "The AI service is having trouble right now. Please try again shortly.",
+            "retry_after": error.retry_after
+        }, 503
+    if isinstance(error, DeadlineExceeded):
+        return {
+            "error": str(error),
+            "message": "The AI service took too long to respond. Please try again."
+        }, 504
+    return None
+
+
+def retry_headers(body):
+    if isinstance(body, dict) and "retry_after" in body:
+        return {"Retry-After": str(body["retry_after"])}
+    return {}
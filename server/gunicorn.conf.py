@@ -0,0 +1,34 @@
+"""
+Gunicorn settings for the API. Every value can be overridden from the environment.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# Requests spend most of their time waiting on Gemini, YouTube and Mongo, so each
+# worker process serves several threads. With asgi:app use uvicorn_worker.UvicornWorker,
+# which awaits the generation routes instead of holding a thread for each
+worker_class = os.getenv("WEB_WORKER_CLASS", "gthread")
+workers = int(os.getenv("WEB_WORKERS", str(2 * (os.cpu_count() or 1) + 1)))
+threads = int(os.getenv("WEB_THREADS", "8"))
+# Synchronous summaries of long videos can take minutes
+timeout = int(os.getenv("WEB_TIMEOUT", "300"))
+keepalive = 5
+# Import the app once in the master; Mongo and Gemini clients are created lazily in each worker
+preload_app = True
+# Leave room for the job queue to drain before a worker is killed
+graceful_timeout = int(os.getenv("JOB_DRAIN_SECONDS", "60")) + 10
+accesslog = "-"
+
+
+def worker_exit(server, worker):
+    import app
+    app.shutdown()
+
+
+def child_exit(server, worker):
+    from metrics import metrics
+    metrics.mark_process_dead(worker.pid)
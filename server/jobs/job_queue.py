@@ -0,0 +1,322 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from flask import request
+from pymongo import ReturnDocument
+
+load_dotenv()
+
+JOB_BACKEND = os.getenv("JOB_BACKEND", "mongo").lower()
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# A running job whose lease runs out (e.g. the worker process died) is picked up again
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "600"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+# How long a stopping worker waits for running jobs before exiting
+JOB_DRAIN_SECONDS = int(os.getenv("JOB_DRAIN_SECONDS", "60"))
+# How often each worker looks for jobs whose lease ran out
+JOB_SWEEP_SECONDS = float(os.getenv("JOB_SWEEP_SECONDS", "60"))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def async_requested():
+    """
+    True when the client asked for submit-and-poll mode with ?async=true
+    """
+    return request.args.get("async", "").lower() in ("1", "true", "yes")
+
+
+def public_view(job):
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "result": job.get("result"),
+        "status_code": job.get("status_code"),
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat(),
+        "updated_at": job["updated_at"].isoformat(),
+    }
+
+
+class MemoryJobStore:
+    """
+    In-process job store for local development, jobs are lost on restart
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def insert(self, job):
+        now = datetime.utcnow()
+        with self._lock:
+            # Drop finished jobs past their result TTL
+            expired = [job_id for job_id, existing in self._jobs.items() if existing.get("expires_at", now) < now]
+            for job_id in expired:
+                del self._jobs[job_id]
+            self._jobs[job["_id"]] = job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def claim(self, job_id):
+        now = datetime.utcnow()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job or not self._claimable(job, now):
+                return None
+            job.update(status=RUNNING, updated_at=now, lease_expires_at=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            return dict(job)
+
+    def update(self, job_id, fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(fields)
+                if fields.get("status") in (DONE, FAILED):
+                    job.pop("params", None)
+
+    def claimable_ids(self, queued_before=None):
+        now = datetime.utcnow()
+        with self._lock:
+            return [
+                job_id for job_id, job in self._jobs.items()
+                if self._claimable(job, now) and not (
+                    queued_before and job["status"] == QUEUED and job["created_at"] >= queued_before
+                )
+            ]
+
+    def _claimable(self, job, now):
+        return job["status"] == QUEUED or (job["status"] == RUNNING and job["lease_expires_at"] < now)
+
+
+class MongoJobStore:
+    """
+    Jobs persisted in a Mongo collection so a restart doesn't lose in-flight work
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        collection.create_index("expires_at", expireAfterSeconds=0)
+
+    def insert(self, job):
+        self.collection.insert_one(job)
+
+    def get(self, job_id):
+        return self.collection.find_one({"_id": job_id}, {"params": 0})
+
+    def claim(self, job_id):
+        now = datetime.utcnow()
+        # Atomic so only one worker process runs a job
+        return self.collection.find_one_and_update(
+            {"_id": job_id, **self._claimable_filter(now)},
+            {"$set": {
+                "status": RUNNING,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS)
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def update(self, job_id, fields):
+        update = {"$set": fields}
+        if fields.get("status") in (DONE, FAILED):
+            update["$unset"] = {"params": ""}
+        self.collection.update_one({"_id": job_id}, update)
+
+    def claimable_ids(self, queued_before=None):
+        now = datetime.utcnow()
+        return [job["_id"] for job in self.collection.find(self._claimable_filter(now, queued_before), {"_id": 1})]
+
+    def _claimable_filter(self, now, queued_before=None):
+        queued = {"status": QUEUED}
+        if queued_before:
+            queued["created_at"] = {"$lt": queued_before}
+        return {"$or": [
+            queued,
+            {"status": RUNNING, "lease_expires_at": {"$lt": now}},
+        ]}
+
+
+class JobQueue:
+    """
+    Runs registered pipelines on a worker pool. A pipeline is called as
+    pipeline(**params, progress=callback) and returns (result, status_code).
+    The store and pool are attached per process by start().
+    """
+
+    def __init__(self, workers=JOB_WORKERS):
+        self.workers = workers
+        self.pipelines = {}
+        self.store = None
+        self.executor = None
+        self.draining = False
+        self._futures = {}  # job_id -> future of the jobs scheduled in this process
+        self._futures_lock = threading.Lock()
+        # job_id -> callable run once the job is finished or dropped in this process
+        self._on_finish = {}
+        self._stop_sweeping = threading.Event()
+        self._sweeper = None
+
+    def register(self, kind, pipeline):
+        self.pipelines[kind] = pipeline
+
+    def start(self, store):
+        """
+        Attaches the store, starts the worker pool, picks up unfinished jobs and starts
+        sweeping for expired leases every JOB_SWEEP_SECONDS
+        """
+        self.store = store
+        # Start hooks are retried after a failure, so this can run more than once per process
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self.draining = False
+        recovered = self.recover()
+        if self._sweeper is None:
+            self._stop_sweeping.clear()
+            self._sweeper = threading.Thread(target=self._sweep, name="job-sweeper", daemon=True)
+            self._sweeper.start()
+        return recovered
+
+    def submit(self, kind, params, on_finish=None):
+        """
+        Queues a job and returns its ID. on_finish() is called once the job has run in this
+        process, or right away if this process won't run it.
+        """
+        if kind not in self.pipelines:
+            raise ValueError(f"Unknown job kind: {kind}")
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "stage": QUEUED,
+            "params": params,
+            "created_at": now,
+            "updated_at": now,
+            "lease_expires_at": now,
+        }
+        try:
+            self.store.insert(job)
+        except Exception:
+            if on_finish is not None:
+                on_finish()
+            raise
+        # While draining the job stays queued in the store for the next process to recover
+        if self.draining:
+            if on_finish is not None:
+                on_finish()
+            return job["_id"]
+        if on_finish is not None:
+            with self._futures_lock:
+                self._on_finish[job["_id"]] = on_finish
+        self._schedule(job["_id"])
+        return job["_id"]
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def recover(self, queued_before=None):
+        """
+        Requeues jobs that were queued or whose worker died, e.g. after a restart.
+        With queued_before, only jobs queued before then are taken from other processes' queues.
+        """
+        job_ids = self.store.claimable_ids(queued_before)
+        for job_id in job_ids:
+            self._schedule(job_id)
+        return len(job_ids)
+
+    def drain(self, timeout=JOB_DRAIN_SECONDS):
+        """
+        Stops taking work and waits up to `timeout` seconds for running jobs.
+        Jobs that haven't started stay queued; unfinished ones are resumed elsewhere once their lease expires.
+        Returns the number of jobs still running.
+        """
+        self.draining = True
+        self._stop_sweeping.set()
+        if self.executor is None:
+            return 0
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        with self._futures_lock:
+            futures = list(self._futures.values())
+        _, not_done = wait(futures, timeout=timeout)
+        return len(not_done)
+
+    def stats(self):
+        with self._futures_lock:
+            pending = len(self._futures)
+        return {"workers": self.workers, "pending": pending, "draining": self.draining}
+
+    def _sweep(self):
+        while not self._stop_sweeping.wait(JOB_SWEEP_SECONDS):
+            try:
+                # Queued jobs are left to the process that queued them unless it's gone quiet for a lease
+                self.recover(queued_before=datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS))
+            except Exception as e:
+                print(f"Error sweeping jobs: {e}")
+
+    def _schedule(self, job_id):
+        with self._futures_lock:
+            # Already waiting or running here, e.g. a queued job seen again by the sweeper
+            if job_id in self._futures:
+                return
+            future = self.executor.submit(self._run, job_id)
+            self._futures[job_id] = future
+        # Also called when drain() cancels a job that hasn't started
+        future.add_done_callback(lambda done: self._forget(job_id, done))
+
+    def _forget(self, job_id, future):
+        with self._futures_lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+            on_finish = self._on_finish.pop(job_id, None)
+        if on_finish is not None:
+            try:
+                on_finish()
+            except Exception as e:
+                print(f"Error finishing job {job_id}: {e}")
+
+    def _run(self, job_id):
+        job = self.store.claim(job_id)
+        if not job:
+            return
+
+        def progress(stage):
+            now = datetime.utcnow()
+            self.store.update(job_id, {
+                "stage": stage,
+                "updated_at": now,
+                "lease_expires_at": now + timedelta(seconds=JOB_LEASE_SECONDS)
+            })
+
+        try:
+            result, status_code = self.pipelines[job["kind"]](**job["params"], progress=progress)
+            fields = {"status": DONE, "stage": DONE, "result": result, "status_code": status_code}
+        except Exception as e:
+            print(f"Error running job {job_id}: {e}")
+            fields = {"status": FAILED, "stage": FAILED, "error": str(e), "status_code": 500}
+
+        now = datetime.utcnow()
+        fields.update(updated_at=now, expires_at=now + timedelta(seconds=JOB_RESULT_TTL_SECONDS))
+        self.store.update(job_id, fields)
+
+
+def make_store(collection, backend=JOB_BACKEND):
+    """
+    Builds the job store for the configured backend ("mongo" or "memory")
+    """
+    if backend == "memory":
+        return MemoryJobStore()
+    return MongoJobStore(collection)
@@ -0,0 +1,197 @@
+import os
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from pymongo import monitoring
+
+from metrics import profiling
+
+load_dotenv()
+
+# With several gunicorn workers set PROMETHEUS_MULTIPROC_DIR (an empty, writable directory)
+# so /metrics adds up the samples of every worker instead of reporting whichever one answered
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+GEMINI_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route"], buckets=LATENCY_BUCKETS
+)
+http_requests = Counter("http_requests", "Requests by route and status", ["method", "route", "status"])
+http_request_bytes = Histogram("http_request_size_bytes", "Request body size by route", ["route"], buckets=SIZE_BUCKETS)
+# Measured before compression; streamed responses have no length and aren't counted
+http_response_bytes = Histogram("http_response_size_bytes", "Response body size by route", ["route"], buckets=SIZE_BUCKETS)
+
+gemini_call_seconds = Histogram(
+    "gemini_call_duration_seconds", "Latency of one Gemini request by instruction kind",
+    ["kind", "outcome"], buckets=GEMINI_BUCKETS
+)
+gemini_input_characters = Histogram(
+    "gemini_input_characters", "Prompt size of Gemini calls by instruction kind", ["kind"], buckets=SIZE_BUCKETS
+)
+gemini_output_characters = Histogram(
+    "gemini_output_characters", "Response size of Gemini calls by instruction kind", ["kind"], buckets=SIZE_BUCKETS
+)
+
+youtube_fetch_seconds = Histogram(
+    "youtube_fetch_duration_seconds", "Caption fetches from YouTube (cache misses only)", ["outcome"],
+    buckets=LATENCY_BUCKETS
+)
+youtube_transcript_characters = Histogram(
+    "youtube_transcript_characters", "Size of fetched transcripts", buckets=SIZE_BUCKETS
+)
+
+pdf_extract_seconds = Histogram(
+    "pdf_extract_duration_seconds", "Text extraction of a whole PDF", ["mode"], buckets=LATENCY_BUCKETS
+)
+pdf_page_seconds = Histogram(
+    "pdf_page_extract_duration_seconds", "Text extraction of one PDF page", ["status"], buckets=LATENCY_BUCKETS
+)
+
+mongo_command_seconds = Histogram(
+    "mongo_command_duration_seconds", "Mongo command round trips", ["command", "outcome"], buckets=LATENCY_BUCKETS
+)
+
+# Pool utilization, summed over live workers in multiprocess mode
+mongo_pool_connections = Gauge(
+    "mongo_pool_connections", "Mongo connections checked out, and requests waiting for one", ["state"],
+    multiprocess_mode="livesum"
+)
+gemini_requests_in_flight = Gauge(
+    "gemini_requests_in_flight", "Gemini HTTP requests being sent or awaiting a response", multiprocess_mode="livesum"
+)
+gemini_http_connections = Gauge(
+    "gemini_http_connections", "Connections in the Gemini HTTP pools, as of the last request", ["transport", "state"],
+    multiprocess_mode="livesum"
+)
+
+# The breaker is per process, so each worker reports its own (pid label in multiprocess mode)
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+gemini_breaker_state = Gauge(
+    "gemini_circuit_breaker_state", "Gemini circuit breaker: 0 closed, 1 half-open, 2 open", multiprocess_mode="liveall"
+)
+gemini_breaker_consecutive_failures = Gauge(
+    "gemini_circuit_breaker_consecutive_failures", "Consecutive failed Gemini requests", multiprocess_mode="liveall"
+)
+
+
+@contextmanager
+def timed(histogram, span=None, **labels):
+    """
+    Observes the duration of the block, labelled outcome="ok" or "error",
+    and adds it to the profiling span of that name when the request is being profiled
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        seconds = time.perf_counter() - started
+        histogram.labels(outcome=outcome, **labels).observe(seconds)
+        if span is not None:
+            profiling.add_span(span, seconds)
+
+
+def observe_gemini_sizes(kind, contents, text):
+    size = len(contents) if isinstance(contents, str) else len(str(contents))
+    gemini_input_characters.labels(kind=kind).observe(size)
+    gemini_output_characters.labels(kind=kind).observe(len(text))
+
+
+def observe_breaker(state, consecutive_failures):
+    gemini_breaker_state.set(BREAKER_STATES[state])
+    gemini_breaker_consecutive_failures.set(consecutive_failures)
+
+
+def observe_mongo_pool(checked_out, waiting):
+    mongo_pool_connections.labels(state="checked_out").set(checked_out)
+    mongo_pool_connections.labels(state="waiting").set(waiting)
+
+
+observe_mongo_pool(0, 0)
+
+
+def observe_pdf_extraction(extraction):
+    profiling.add_span("extraction", extraction["seconds"])
+    pdf_extract_seconds.labels(mode="parallel" if extraction["workers"] > 1 else "inline").observe(extraction["seconds"])
+    for page in extraction["pages"]:
+        if page["seconds"] is not None:
+            pdf_page_seconds.labels(status=page["status"]).observe(page["seconds"])
+
+
+class CommandTimings(monitoring.CommandListener):
+    """
+    Command monitoring listener feeding mongo_command_duration_seconds
+    """
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        mongo_command_seconds.labels(command=event.command_name, outcome="ok").observe(event.duration_micros / 1e6)
+        profiling.add_span("mongo", event.duration_micros / 1e6)
+
+    def failed(self, event):
+        mongo_command_seconds.labels(command=event.command_name, outcome="error").observe(event.duration_micros / 1e6)
+        profiling.add_span("mongo", event.duration_micros / 1e6)
+
+
+command_timings = CommandTimings()
+
+
+def _route():
+    # The URL rule, not the path, so /notes/<note_id> is one series
+    return request.url_rule.rule if request.url_rule is not None else "unmatched"
+
+
+def instrument(app):
+    """
+    Registers the per-request hooks on the Flask app
+    """
+
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        started = g.pop("metrics_started", None)
+        if started is None:
+            return response
+        route = _route()
+        http_request_seconds.labels(method=request.method, route=route).observe(time.perf_counter() - started)
+        http_requests.labels(method=request.method, route=route, status=str(response.status_code)).inc()
+        if request.content_length:
+            http_request_bytes.labels(route=route).observe(request.content_length)
+        if not response.is_streamed and response.content_length is not None:
+            http_response_bytes.labels(route=route).observe(response.content_length)
+        return response
+
+    return app
+
+
+def exposition():
+    """
+    The /metrics response in the Prometheus text format
+    """
+    registry = REGISTRY
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def mark_process_dead(pid):
+    """
+    Drops a finished worker's live gauges in multiprocess mode (called from gunicorn's child_exit)
+    """
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
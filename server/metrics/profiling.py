@@ -0,0 +1,260 @@
+import asyncio
+import contextvars
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from flask import g, request
+
+load_dotenv()
+
+# Requests sending "X-Profile: <PROFILE_TOKEN>" are profiled; unset disables the header
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+# Fraction of all requests profiled without the header, e.g. 0.001
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+PROFILE_HEADER = "X-Profile"
+REQUEST_ID_HEADER = "X-Request-ID"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_current = contextvars.ContextVar("profile", default=None)
+# Loop tasks and pool threads working for a profiled request, so the sampler skips everyone else's
+_tasks = weakref.WeakKeyDictionary()  # task -> profile
+_threads = {}  # thread ident -> (profile, thread name)
+
+
+class Profile:
+    """
+    One profiled request: a sampler thread records the stacks of the request thread, of the
+    aio-loop while it runs one of the request's tasks and of aio-blocking threads while they run
+    the request's calls. Spans add up time spent in each dependency.
+    """
+
+    def __init__(self, request_id, interval=PROFILE_INTERVAL_MS / 1000):
+        self.request_id = request_id
+        # Client-supplied request IDs can repeat, so files are named by a unique profile ID
+        self.profile_id = f"{request_id}-{uuid.uuid4().hex[:12]}"
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.samples = 0
+        self._spans = {}  # name -> [seconds, count]
+        self._loops = {}  # loop thread ident -> loop
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{request_id}", daemon=True)
+
+    def start(self):
+        self._sampler.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._sampler.join()
+        return time.perf_counter() - self.started
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            span = self._spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def spans(self):
+        with self._lock:
+            return {name: {"seconds": round(seconds, 6), "count": count} for name, (seconds, count) in self._spans.items()}
+
+    def attach_loop(self, loop):
+        with self._lock:
+            self._loops[threading.get_ident()] = loop
+
+    def _threads(self):
+        threads = {self.thread_id: "request"}
+        with self._lock:
+            loops = list(self._loops.items())
+        for ident, loop in loops:
+            task = asyncio.current_task(loop)
+            if task is not None and _tasks.get(task) is self:
+                threads[ident] = "aio-loop"
+        for ident, (profile, name) in list(_threads.items()):
+            if profile is self:
+                threads[ident] = name
+        return threads
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            threads = self._threads()
+            frames = sys._current_frames()
+            for ident, name in threads.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write(self, details, directory=PROFILE_DIR):
+        """
+        Writes <profile_id>.collapsed (flamegraph.pl / speedscope input) and <profile_id>.json,
+        never over an existing profile
+        """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self.profile_id)
+        with open(path + ".collapsed", "x") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(path + ".json", "x") as f:
+            json.dump(dict(details, request_id=self.request_id, profile_id=self.profile_id,
+                           samples=self.samples, spans=self.spans()), f, indent=2)
+        return path
+
+
+def current():
+    return _current.get()
+
+
+def add_span(name, seconds):
+    """
+    Adds time to a span of the request being profiled; a no-op otherwise
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.add_span(name, seconds)
+
+
+@contextmanager
+def span(name):
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, time.perf_counter() - started)
+
+
+@contextmanager
+def on_thread():
+    """
+    Attributes the calling thread to the current profile while the block runs; for pool threads
+    """
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    ident = threading.get_ident()
+    previous = _threads.get(ident)
+    _threads[ident] = (profile, threading.current_thread().name)
+    try:
+        yield
+    finally:
+        if previous is None:
+            _threads.pop(ident, None)
+        else:
+            _threads[ident] = previous
+
+
+def task_factory(loop, coro, **kwargs):
+    """
+    Loop task factory remembering which profile, if any, each task was created for
+    """
+    task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    profile = context.get(_current) if context is not None else _current.get()
+    if profile is not None:
+        _tasks[task] = profile
+        profile.attach_loop(loop)
+    return task
+
+
+@contextmanager
+def activated(profile):
+    """
+    Makes profile current for code running after the request context is gone (streamed bodies)
+    """
+    if profile is None:
+        yield
+        return
+    token = _current.set(profile)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def requested():
+    header = request.headers.get(PROFILE_HEADER)
+    if header and PROFILE_TOKEN and hmac.compare_digest(header, PROFILE_TOKEN):
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def request_id():
+    candidate = request.headers.get(REQUEST_ID_HEADER, "")
+    return candidate if REQUEST_ID_PATTERN.match(candidate) else uuid.uuid4().hex
+
+
+def instrument(app):
+    """
+    Registers the profiling hooks; nothing is registered unless PROFILE_TOKEN or PROFILE_SAMPLE_RATE is set
+    """
+    if not PROFILE_TOKEN and PROFILE_SAMPLE_RATE <= 0:
+        return app
+
+    @app.before_request
+    def start_profile():
+        if not requested():
+            return
+        profile = Profile(request_id()).start()
+        g.profile = profile
+        g.profile_token = _current.set(profile)
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.get("profile")
+        if profile is None:
+            return response
+        method, path = request.method, request.path
+        response.headers["X-Profile-Id"] = profile.profile_id
+
+        # On close, so a streamed body's serialization is part of the profile
+        def write():
+            seconds = profile.stop()
+            try:
+                profile.write({
+                    "method": method,
+                    "path": path,
+                    "status": response.status_code,
+                    "seconds": round(seconds, 6),
+                })
+            except OSError as e:
+                print(f"Error writing profile {profile.profile_id}: {e}")
+
+        response.call_on_close(write)
+        return response
+
+    @app.teardown_request
+    def reset_profile(error=None):
+        token = g.pop("profile_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    return app
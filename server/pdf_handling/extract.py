@@ -0,0 +1,256 @@
+import ctypes
+import io
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from dotenv import load_dotenv
+
+from metrics import metrics
+
+load_dotenv()
+
+# Same default as gunicorn.conf.py
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(2 * (os.cpu_count() or 1) + 1)))
+# Each gunicorn worker's share of the cores, rounded up; 1 extracts every PDF inline
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(math.ceil((os.cpu_count() or 1) / WEB_WORKERS))))
+PDF_PAGE_TIMEOUT_SECONDS = float(os.getenv("PDF_PAGE_TIMEOUT_SECONDS", "10"))
+# Below this many pages the process pool costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+_pools = {}  # workers -> ProcessPoolExecutor
+_pool_lock = threading.Lock()
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def _raise_page_timeout(signum, frame):
+    raise PageTimeout()
+
+
+class _AlarmDeadline:
+    """
+    Raises PageTimeout in the main thread through SIGALRM
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+    def __enter__(self):
+        self.previous_handler = signal.signal(signal.SIGALRM, _raise_page_timeout)
+        signal.setitimer(signal.ITIMER_REAL, self.seconds)
+
+    def __exit__(self, *exc):
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, self.previous_handler)
+
+
+class _ThreadDeadline:
+    """
+    Raises PageTimeout in another thread (request, event loop) from a timer, as an asynchronous
+    exception. PyPDF2 is pure Python, so it's raised between two bytecodes of the parser.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.ident = threading.get_ident()
+        self._lock = threading.Lock()
+        self._done = False
+        self._fired = False
+
+    def __enter__(self):
+        self._timer = threading.Timer(self.seconds, self._fire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self._done = True
+            self._timer.cancel()
+            if self._fired and exc[0] is not PageTimeout:
+                # Fired as the page finished; drop the exception before it lands elsewhere
+                ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.ident), None)
+
+    def _fire(self):
+        with self._lock:
+            if self._done:
+                return
+            self._fired = True
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(self.ident), ctypes.py_object(PageTimeout))
+
+
+class _NoDeadline:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+def _deadline(seconds):
+    if not seconds:
+        return _NoDeadline()
+    # SIGALRM is only delivered to the main thread
+    if hasattr(signal, "SIGALRM") and threading.current_thread() is threading.main_thread():
+        return _AlarmDeadline(seconds)
+    return _ThreadDeadline(seconds)
+
+
+def _extract_page(page, page_timeout):
+    """
+    Extracts one page, returning (status, text).
+    The timeout is enforced with SIGALRM in the main thread and an asynchronous exception elsewhere.
+    """
+    # Pages without a content stream have no text, skip the parser entirely
+    if page.get_contents() is None:
+        return "empty", ""
+
+    try:
+        with _deadline(page_timeout):
+            text = page.extract_text() or ""
+    except PageTimeout:
+        return "timeout", ""
+    except Exception as e:
+        print(f"Error extracting PDF page: {e}")
+        return "error", ""
+
+    if not text.strip():
+        return "empty", ""
+    return "ok", text
+
+
+def _reader(pdf_bytes):
+    # Imported on first use to keep PyPDF2 off the server's startup path
+    import PyPDF2
+    return PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+
+
+def _extract_range(pdf_bytes, start, end, page_timeout):
+    """
+    Extracts pages [start, end). Runs inside a pool worker, so the reader is rebuilt per shard.
+    """
+    reader = _reader(pdf_bytes)
+    pages = []
+    for page_num in range(start, end):
+        started = time.perf_counter()
+        status, text = _extract_page(reader.pages[page_num], page_timeout)
+        pages.append({
+            "page": page_num + 1,
+            "status": status,
+            "text": text,
+            "seconds": round(time.perf_counter() - started, 6),
+        })
+    return pages
+
+
+def _pool_context():
+    # Forking a process that already runs request, loop and job threads can deadlock the child
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+def _get_pool(workers):
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context())
+        return pool
+
+
+def _reset_pool(workers):
+    with _pool_lock:
+        pool = _pools.pop(workers, None)
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown():
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _shards(page_count, workers):
+    # A few shards per worker keeps the pool busy when some pages are much slower than others
+    size = max(1, math.ceil(page_count / (workers * 4)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def _timed_out_pages(start, end):
+    return [
+        {"page": page_num + 1, "status": "timeout", "text": "", "seconds": None}
+        for page_num in range(start, end)
+    ]
+
+
+def assemble_text(pages):
+    return "".join(
+        f"\n\n--- Page {page['page']} ---\n\n{page['text']}"
+        for page in pages
+        if page["status"] == "ok"
+    )
+
+
+def extract_pages(pdf_bytes, workers=None, page_timeout=None, parallel_min_pages=None):
+    """
+    Extracts the text of every page, in page order.
+    Large documents are sharded across a process pool; small ones are read inline.
+    Returns {"text", "pages", "page_count", "workers", "seconds"}.
+    """
+    workers = workers or PDF_WORKERS
+    page_timeout = PDF_PAGE_TIMEOUT_SECONDS if page_timeout is None else page_timeout
+    parallel_min_pages = PDF_PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+
+    started = time.perf_counter()
+    page_count = len(_reader(pdf_bytes).pages)
+
+    if workers <= 1 or page_count < parallel_min_pages:
+        pages = _extract_range(pdf_bytes, 0, page_count, page_timeout)
+        used_workers = 1
+    else:
+        pages = _extract_parallel(pdf_bytes, page_count, workers, page_timeout)
+        used_workers = workers
+
+    extraction = {
+        "text": assemble_text(pages),
+        "pages": pages,
+        "page_count": page_count,
+        "workers": used_workers,
+        "seconds": round(time.perf_counter() - started, 6),
+    }
+    metrics.observe_pdf_extraction(extraction)
+    return extraction
+
+
+def _extract_parallel(pdf_bytes, page_count, workers, page_timeout):
+    shards = _shards(page_count, workers)
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(_extract_range, pdf_bytes, start, end, page_timeout) for start, end in shards]
+    except BrokenProcessPool:
+        _reset_pool(workers)
+        return _extract_range(pdf_bytes, 0, page_count, page_timeout)
+
+    pages = []
+    for (start, end), future in zip(shards, futures):
+        # Backstop for platforms without SIGALRM, where a page can't be interrupted inside the worker
+        deadline = page_timeout * (end - start) + 5 if page_timeout else None
+        try:
+            pages.extend(future.result(timeout=deadline))
+        except FutureTimeoutError:
+            future.cancel()
+            pages.extend(_timed_out_pages(start, end))
+        except BrokenProcessPool:
+            _reset_pool(workers)
+            pages.extend(_extract_range(pdf_bytes, start, end, page_timeout))
+    return pages
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import threading
+from datetime import datetime
+
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
+
+load_dotenv()
+
+PDF_CACHE_ENABLED = os.getenv("PDF_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# Entries nobody uploaded for this long are dropped by a TTL index on last_accessed_at
+PDF_CACHE_IDLE_SECONDS = int(os.getenv("PDF_CACHE_IDLE_SECONDS", str(30 * 24 * 3600)))
+# Above this many entries the least recently accessed ones are evicted
+PDF_CACHE_MAX_ENTRIES = int(os.getenv("PDF_CACHE_MAX_ENTRIES", "5000"))
+# Extractions bigger than this aren't stored; Mongo documents are capped at 16 MB
+PDF_CACHE_MAX_TEXT_BYTES = int(os.getenv("PDF_CACHE_MAX_TEXT_BYTES", str(12 * 1024 * 1024)))
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def read_and_hash(stream, chunk_size=READ_CHUNK_BYTES):
+    """
+    Reads an upload in chunks, hashing each one as it arrives. Returns (bytes, sha256 hex digest).
+    """
+    digest = hashlib.sha256()
+    parts = []
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        digest.update(chunk)
+        parts.append(chunk)
+    return b"".join(parts), digest.hexdigest()
+
+
+def page_offsets(extraction):
+    """
+    Where each page's text starts and ends in extraction["text"], so pages needn't be stored twice
+    """
+    offsets = []
+    position = 0
+    for page in extraction["pages"]:
+        entry = {"page": page["page"], "status": page["status"]}
+        if page["status"] == "ok":
+            position += len(f"\n\n--- Page {page['page']} ---\n\n")
+            entry["start"] = position
+            position += len(page["text"])
+            entry["end"] = position
+        offsets.append(entry)
+    return offsets
+
+
+def pages_from_offsets(text, offsets):
+    return [
+        {
+            "page": entry["page"],
+            "status": entry["status"],
+            "text": text[entry["start"]:entry["end"]] if "start" in entry else "",
+            "seconds": None,
+        }
+        for entry in offsets
+    ]
+
+
+class PdfStore:
+    """
+    Extracted text and summaries of uploaded PDFs keyed by the SHA-256 of the file.
+    Summaries are kept per fingerprint (model, strategy and prompts), so changing any of them
+    regenerates the summary while the extraction is still reused.
+    """
+
+    def __init__(self, max_entries=PDF_CACHE_MAX_ENTRIES, idle_seconds=PDF_CACHE_IDLE_SECONDS,
+                 max_text_bytes=PDF_CACHE_MAX_TEXT_BYTES):
+        self.max_entries = max_entries
+        self.idle_seconds = idle_seconds
+        self.max_text_bytes = max_text_bytes
+        self.collection = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "hits": 0,
+            "summary_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "too_large": 0,
+            "incomplete": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    def attach_collection(self, collection):
+        try:
+            collection.create_index("last_accessed_at", expireAfterSeconds=self.idle_seconds)
+        except OperationFailure:
+            # The index exists with another PDF_CACHE_IDLE_SECONDS
+            collection.database.command({
+                "collMod": collection.name,
+                "index": {"keyPattern": {"last_accessed_at": 1}, "expireAfterSeconds": self.idle_seconds}
+            })
+        self.collection = collection
+
+    def get(self, digest):
+        """
+        Returns {"text", "pages", "page_count", "summaries"} for a known upload, or None, and marks it accessed
+        """
+        if self.collection is None:
+            return None
+        try:
+            doc = self.collection.find_one_and_update(
+                {"_id": digest},
+                {"$set": {"last_accessed_at": datetime.utcnow()}, "$inc": {"uploads": 1}},
+                projection={"text": 1, "page_offsets": 1, "page_count": 1, "summaries": 1}
+            )
+        except Exception as e:
+            print(f"Error reading PDF cache: {e}")
+            self._count("errors")
+            return None
+        if doc is None:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return {
+            "text": doc["text"],
+            "pages": pages_from_offsets(doc["text"], doc["page_offsets"]),
+            "page_count": doc["page_count"],
+            "summaries": doc.get("summaries", {}),
+        }
+
+    def cached_summary(self, record, fingerprint):
+        """
+        The summary stored on a get() record for this fingerprint, or None
+        """
+        if record is None:
+            return None
+        summary = record["summaries"].get(fingerprint)
+        if summary is not None:
+            self._count("summary_hits")
+        return summary
+
+    def save_extraction(self, digest, extraction, size):
+        if self.collection is None:
+            return
+        # A page that timed out or failed may read fine next time, so don't make it permanent
+        if any(page["status"] in ("timeout", "error") for page in extraction["pages"]):
+            self._count("incomplete")
+            return
+        if len(extraction["text"].encode('utf-8')) > self.max_text_bytes:
+            self._count("too_large")
+            return
+        now = datetime.utcnow()
+        try:
+            self.collection.update_one(
+                {"_id": digest},
+                {
+                    "$set": {
+                        "text": extraction["text"],
+                        "page_offsets": page_offsets(extraction),
+                        "page_count": extraction["page_count"],
+                        "size": size,
+                        "extraction_seconds": extraction.get("seconds"),
+                        "last_accessed_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now, "uploads": 1},
+                },
+                upsert=True
+            )
+            self._count("stored")
+            self._evict()
+        except Exception as e:
+            print(f"Error writing PDF cache: {e}")
+            self._count("errors")
+
+    def save_summary(self, digest, fingerprint, summary):
+        """
+        Adds a summary to an already stored extraction; a no-op if it wasn't stored
+        """
+        if self.collection is None:
+            return
+        try:
+            self.collection.update_one(
+                {"_id": digest},
+                {"$set": {f"summaries.{fingerprint}": dict(summary, created_at=datetime.utcnow())}}
+            )
+        except Exception as e:
+            print(f"Error writing PDF cache: {e}")
+            self._count("errors")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["persistent"] = self.collection is not None
+        return stats
+
+    def _evict(self):
+        excess = self.collection.estimated_document_count() - self.max_entries
+        if excess <= 0:
+            return
+        oldest = [
+            doc["_id"] for doc in
+            self.collection.find({}, {"_id": 1}).sort("last_accessed_at", 1).limit(excess)
+        ]
+        result = self.collection.delete_many({"_id": {"$in": oldest}})
+        self._count("evictions", result.deleted_count)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+
+pdf_store = PdfStore()
+
+
+def setup(collection):
+    """
+    Attaches the pdf_cache collection unless PDF_CACHE_ENABLED is turned off
+    """
+    if PDF_CACHE_ENABLED:
+        pdf_store.attach_collection(collection)
+    return pdf_store
@@ -1,7 +1,61 @@
-import PyPDF2
+"""
+Command line front-end for the PDF extraction engine used by /process-pdf.
 
-with open("hello.pdf","rb") as f:
-  reader = PyPDF2.PdfReader(f)
-  for i, page in enumerate(reader.pages):
-    print(f"Page {i+1}:")
-    print(page.extract_text())
\ No newline at end of file
+Usage (from the server directory):
+    python pdf_handling/read_pdf.py hello.pdf
+    python pdf_handling/read_pdf.py textbook.pdf --workers 8 --timings
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_handling import extract  # noqa: E402
+
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+  parser.add_argument("path", nargs="?", default="hello.pdf")
+  parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="pool processes (default: CPU count)")
+  parser.add_argument("--page-timeout", type=float, default=extract.PDF_PAGE_TIMEOUT_SECONDS)
+  parser.add_argument("--parallel-min-pages", type=int, default=extract.PDF_PARALLEL_MIN_PAGES)
+  parser.add_argument("--timings", action="store_true", help="print per-page timings instead of the text")
+  parser.add_argument("--json", action="store_true", help="print machine-readable timings")
+  args = parser.parse_args()
+
+  with open(args.path, "rb") as f:
+    pdf_bytes = f.read()
+
+  result = extract.extract_pages(
+    pdf_bytes,
+    workers=args.workers,
+    page_timeout=args.page_timeout,
+    parallel_min_pages=args.parallel_min_pages,
+  )
+  extract.shutdown()
+
+  if args.json:
+    print(json.dumps({
+      "path": args.path,
+      "page_count": result["page_count"],
+      "workers": result["workers"],
+      "seconds": result["seconds"],
+      "pages": [{key: page[key] for key in ("page", "status", "seconds")} for page in result["pages"]],
+    }, indent=2))
+    return
+
+  if args.timings:
+    for page in result["pages"]:
+      print(f"Page {page['page']}: {page['status']} {page['seconds']}s")
+    print(f"{result['page_count']} pages in {result['seconds']}s using {result['workers']} worker(s)")
+    return
+
+  for page in result["pages"]:
+    print(f"Page {page['page']}:")
+    print(page["text"])
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,51 @@
+import gridfs
+from bson import ObjectId
+
+BUCKET_NAME = "pdf_uploads"
+
+
+class PdfUploads:
+    """
+    Uploaded PDFs waiting for a background job, kept in GridFS so job documents only carry an ID.
+    The job deletes its upload once it has finished.
+    """
+
+    def __init__(self):
+        self.database = None
+        self._bucket = None
+
+    def attach_database(self, database):
+        self.database = database
+        self._bucket = None
+
+    @property
+    def bucket(self):
+        # Built on first use, so workers that never queue a PDF don't need GridFS
+        if self._bucket is None:
+            self._bucket = gridfs.GridFSBucket(self.database, bucket_name=BUCKET_NAME)
+        return self._bucket
+
+    def put(self, file_content, filename, digest):
+        """
+        Stores the upload and returns its ID as a string
+        """
+        upload_id = self.bucket.upload_from_stream(filename, file_content, metadata={"sha256": digest})
+        return str(upload_id)
+
+    def read(self, upload_id):
+        with self.bucket.open_download_stream(ObjectId(upload_id)) as stream:
+            return stream.read()
+
+    def delete(self, upload_id):
+        try:
+            self.bucket.delete(ObjectId(upload_id))
+        except gridfs.errors.NoFile:
+            pass
+
+
+pdf_uploads = PdfUploads()
+
+
+def setup(database):
+    pdf_uploads.attach_database(database)
+    return pdf_uploads
@@ -0,0 +1,49 @@
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+
+class Repository:
+    """
+    Per-user document access shared by the controllers.
+    Every mutation is a single atomic Mongo call that checks ownership in its filter,
+    so there is no read-modify-write window and no extra round trip.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def _owned(self, user_id, item_id):
+        return {"_id": ObjectId(item_id), "user_id": user_id}
+
+    def find_owned(self, user_id, item_id, projection=None):
+        return self.collection.find_one(self._owned(user_id, item_id), projection)
+
+    def find_many_owned(self, user_id, item_ids, projection=None):
+        return list(self.collection.find(
+            {"_id": {"$in": [ObjectId(item_id) for item_id in item_ids]}, "user_id": user_id},
+            projection
+        ))
+
+    def insert(self, document):
+        """
+        Inserts the document and returns its id as a string
+        """
+        return str(self.collection.insert_one(document).inserted_id)
+
+    def update_owned(self, user_id, item_id, fields):
+        """
+        Applies $set and returns the updated document, or None if it doesn't exist or isn't owned
+        """
+        return self.collection.find_one_and_update(
+            self._owned(user_id, item_id),
+            {"$set": fields},
+            return_document=ReturnDocument.AFTER
+        )
+
+    def delete_owned(self, user_id, item_id):
+        """
+        Deletes the document and returns True, or False if it doesn't exist or isn't owned
+        """
+        deleted = self.collection.find_one_and_delete(self._owned(user_id, item_id), projection={"_id": 1})
+        return deleted is not None
+
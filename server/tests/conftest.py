@@ -0,0 +1,85 @@
+"""
+Shared fixtures. The app runs against the benchmark stand-ins: mongomock for Mongo and the fake
+Gemini and YouTube clients, so the suite needs no services or network.
+
+Run from the server directory:
+    pip install -r tests/requirements.txt
+    python -m pytest tests
+"""
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import standins  # noqa: E402
+
+import mongomock  # noqa: E402
+
+
+class Clock:
+    """
+    Stand-in for time.time / time.monotonic that only moves when told to. Tests patch it into
+    one module's `time`, so the event loop and other threads keep the real clock.
+    """
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.fixture
+def collection():
+    """
+    An empty collection of its own for each test
+    """
+    return mongomock.MongoClient()["tests"][f"c{uuid.uuid4().hex}"]
+
+
+@pytest.fixture(scope="session")
+def app():
+    standins.install_mongo()
+    standins.install_gemini(latency=0, output_chars=200)
+    standins.install_youtube(latency=0, snippets=20)
+    import app as api
+
+    yield api.app
+    api.shutdown()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """
+    Registers a fresh user and returns its Authorization header, so tests don't see each other's data
+    """
+    def register():
+        response = client.post("/register", json={
+            "name": "Test User",
+            "email": f"{uuid.uuid4().hex}@example.com",
+            "password": "correct horse battery staple",
+        })
+        assert response.status_code == 201
+        return {"Authorization": f"Bearer {response.json['token']}"}
+    return register
+
+
+@pytest.fixture
+def auth_headers(register):
+    return register()
@@ -0,0 +1,98 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from genai import resilience
+
+
+@pytest.fixture
+def breaker(monkeypatch, clock):
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=clock))
+    return resilience.CircuitBreaker(failures=3, cooldown=30)
+
+
+def fail(breaker, times):
+    for _ in range(times):
+        with pytest.raises(httpx.ConnectError):
+            with breaker.guard():
+                raise httpx.ConnectError("upstream down")
+
+
+def test_opens_after_consecutive_failures(breaker):
+    fail(breaker, 2)
+    assert breaker.stats()["state"] == resilience.CLOSED
+    fail(breaker, 1)
+    assert breaker.stats()["state"] == resilience.OPEN
+
+    with pytest.raises(resilience.CircuitOpen) as raised:
+        breaker.allow()
+    assert raised.value.retry_after == 30
+
+
+def test_success_resets_the_failure_count(breaker):
+    fail(breaker, 2)
+    with breaker.guard():
+        pass
+    fail(breaker, 2)
+    assert breaker.stats()["state"] == resilience.CLOSED
+
+
+def test_non_upstream_errors_count_as_healthy(breaker):
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            with breaker.guard():
+                raise ValueError("bad response body")
+    assert breaker.stats()["state"] == resilience.CLOSED
+
+
+def test_half_open_lets_one_probe_through(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(29)
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.allow()
+
+    clock.advance(1)
+    breaker.allow()
+    assert breaker.stats()["state"] == resilience.HALF_OPEN
+    # Everyone else waits for the probe
+    with pytest.raises(resilience.CircuitOpen) as raised:
+        breaker.allow()
+    assert raised.value.retry_after == 1
+
+
+def test_successful_probe_closes(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    with breaker.guard():
+        pass
+    assert breaker.stats()["state"] == resilience.CLOSED
+    with breaker.guard():
+        pass
+
+
+def test_failed_probe_reopens_for_a_full_cooldown(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    fail(breaker, 1)
+    assert breaker.stats()["state"] == resilience.OPEN
+    assert breaker.stats()["opened"] == 2
+
+    clock.advance(29)
+    with pytest.raises(resilience.CircuitOpen):
+        breaker.allow()
+
+
+def test_cancelled_probe_frees_the_slot(breaker, clock):
+    fail(breaker, 3)
+    clock.advance(30)
+    with pytest.raises(asyncio.CancelledError):
+        with breaker.guard():
+            raise asyncio.CancelledError()
+    assert breaker.stats()["state"] == resilience.HALF_OPEN
+
+    # The next caller becomes the probe instead of being rejected
+    with breaker.guard():
+        pass
+    assert breaker.stats()["state"] == resilience.CLOSED
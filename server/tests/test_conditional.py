@@ -0,0 +1,68 @@
+import pytest
+
+
+@pytest.fixture
+def note(client, auth_headers):
+    response = client.post("/notes", json={"title": "Calvin cycle", "content": "Carbon fixation"}, headers=auth_headers)
+    return response.json["note"]
+
+
+def get(client, url, headers, etag=None):
+    if etag is not None:
+        headers = {**headers, "If-None-Match": etag}
+    return client.get(url, headers=headers)
+
+
+def test_list_carries_a_private_etag(client, auth_headers, note):
+    response = get(client, "/notes", auth_headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+
+@pytest.mark.parametrize("url", ["/notes", "/notes?limit=5", "/questions", "/tests"])
+def test_unchanged_list_answers_304(client, auth_headers, note, url):
+    etag = get(client, url, auth_headers).headers["ETag"]
+
+    response = get(client, url, auth_headers, etag)
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_compressed_variant_matches(client, auth_headers, note):
+    etag = get(client, "/notes", auth_headers).headers["ETag"]
+    compressed = etag[:-1] + ':br"'
+    assert get(client, "/notes", auth_headers, compressed).status_code == 304
+
+
+def test_star_matches(client, auth_headers, note):
+    assert get(client, "/notes", auth_headers, "*").status_code == 304
+
+
+@pytest.mark.parametrize("change", ["create", "update", "delete"])
+def test_any_change_invalidates(client, auth_headers, note, change):
+    etag = get(client, "/notes", auth_headers).headers["ETag"]
+
+    if change == "create":
+        client.post("/notes", json={"title": "Light reactions"}, headers=auth_headers)
+    elif change == "update":
+        client.put(f"/notes/{note['_id']}", json={"title": "Calvin cycle, revised"}, headers=auth_headers)
+    else:
+        client.delete(f"/notes/{note['_id']}", headers=auth_headers)
+
+    response = get(client, "/notes", auth_headers, etag)
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_differs_per_variant(client, auth_headers, note):
+    full = get(client, "/notes", auth_headers).headers["ETag"]
+    summary = get(client, "/notes?view=summary", auth_headers).headers["ETag"]
+    assert full != summary
+    assert get(client, "/notes?view=summary", auth_headers, full).status_code == 200
+
+
+def test_other_users_etag_does_not_match(client, auth_headers, register, note):
+    etag = get(client, "/notes", auth_headers).headers["ETag"]
+    assert get(client, "/notes", register(), etag).status_code == 200
@@ -0,0 +1,122 @@
+import pytest
+
+from aio import event_loop
+from genai import chunking
+from genai import genai
+
+
+def paragraph(index, sentences=3):
+    return " ".join(f"Paragraph {index} sentence {n} is about the chloroplast." for n in range(sentences))
+
+
+def pieces(chunk, separator="\n\n"):
+    return chunk.split(separator)
+
+
+def test_chunks_end_on_paragraph_boundaries():
+    paragraphs = [paragraph(index) for index in range(30)]
+    chunks = chunking.chunk_text("\n\n".join(paragraphs), budget=100)
+
+    assert len(chunks) > 1
+    assert [p for chunk in chunks for p in pieces(chunk)] == paragraphs
+    for chunk in chunks:
+        assert sum(chunking.estimate_tokens(p) for p in pieces(chunk)) <= 100
+
+
+def test_chunks_pack_greedily():
+    paragraphs = [paragraph(index) for index in range(30)]
+    chunks = chunking.chunk_text("\n\n".join(paragraphs), budget=100)
+    # Each chunk was closed because the next paragraph didn't fit
+    for chunk, following in zip(chunks, chunks[1:]):
+        used = sum(chunking.estimate_tokens(p) for p in pieces(chunk))
+        assert used + chunking.estimate_tokens(pieces(following)[0]) > 100
+
+
+def test_pdf_chunks_start_on_page_markers():
+    text = "".join(f"\n\n--- Page {page} ---\n\n{paragraph(page)}\n\n{paragraph(page + 100)}" for page in range(1, 13))
+    chunks = chunking.chunk_text(text, budget=120)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith("\n\n--- Page ")
+    assert "".join(chunks).replace("\n\n\n\n", "\n\n") == text
+
+
+def test_oversized_paragraph_is_split_on_sentences():
+    text = paragraph(0, sentences=40)
+    chunks = chunking.chunk_text(text, budget=50)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.endswith(".")
+        assert chunking.estimate_tokens(chunk) <= 50 + 1
+    assert " ".join(chunks) == text
+
+
+def test_transcript_chunks_end_on_caption_boundaries():
+    captions = [f"at {n} seconds the chloroplast converts light" for n in range(200)]
+    chunks = chunking.chunk_text(" ".join(captions), budget=80, segments=captions)
+
+    assert len(chunks) > 1
+    assert " ".join(chunks) == " ".join(captions)
+    boundaries = set()
+    position = 0
+    for caption in captions:
+        position += len(caption)
+        boundaries.add(position)
+        position += 1
+    position = 0
+    for chunk in chunks[:-1]:
+        position += len(chunk)
+        assert position in boundaries
+        position += 1
+
+
+@pytest.fixture
+def recorded_calls(monkeypatch):
+    calls = []
+
+    async def generate_text_async(text, instruction, temperature):
+        calls.append((instruction, text))
+        if instruction == genai.chunk_summary_instruction:
+            return f"partial<{text[:40]}>"
+        return "combined"
+
+    async def validate(text):
+        return True
+
+    monkeypatch.setattr(genai, "generate_text_async", generate_text_async)
+    monkeypatch.setattr(genai, "validate_educational_content_async", validate)
+    monkeypatch.setattr(genai, "chunk_tokens", 200)
+    return calls
+
+
+def test_map_step_summarizes_each_chunk_once_in_order(recorded_calls):
+    transcript = "\n\n".join(paragraph(index) for index in range(60))
+    expected = chunking.chunk_text(transcript, 200)
+
+    result = event_loop.run(genai.generate_summary_map_reduce(transcript))
+
+    mapped = [text for instruction, text in recorded_calls if instruction == genai.chunk_summary_instruction]
+    assert sorted(mapped) == sorted(expected)
+    reduced = [text for instruction, text in recorded_calls if instruction == genai.reduce_instruction]
+    assert len(reduced) == 1
+    # The reduce sees the partials in transcript order
+    positions = [reduced[0].find(f"partial<{chunk[:40]}>") for chunk in expected]
+    assert -1 not in positions
+    assert positions == sorted(positions)
+    assert result == {"title": "combined", "summary": "combined", "is_educational": True}
+
+
+def test_progress_counts_every_chunk(recorded_calls):
+    chunks = chunking.chunk_text("\n\n".join(paragraph(index) for index in range(40)), 200)
+    progress = genai.summarize_chunks_with_progress(chunks)
+    events = []
+    try:
+        while True:
+            events.append(next(progress))
+    except StopIteration as done:
+        partials = done.value
+
+    assert len(partials) == len(chunks)
+    assert events[-1] == ("progress", {"stage": "summarizing_chunks", "done": len(chunks), "total": len(chunks)})
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from controllers import pagination
+
+
+def insert_items(collection, count, same_time=False):
+    start = datetime(2025, 1, 1)
+    for index in range(count):
+        created_at = start if same_time else start + timedelta(minutes=index)
+        collection.insert_one({"user_id": "u1", "n": index, "created_at": created_at})
+
+
+def walk(collection, limit):
+    pages = []
+    cursor = None
+    while True:
+        docs, next_cursor = pagination.find_page(collection, {"user_id": "u1"}, limit, cursor)
+        pages.append([doc["n"] for doc in docs])
+        if next_cursor is None:
+            return pages
+        cursor = pagination.decode_cursor(next_cursor)
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "created_at": datetime(2025, 3, 4, 5, 6, 7, 890123)}
+    assert pagination.decode_cursor(pagination.encode_cursor(doc)) == (doc["created_at"], doc["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30=", "eyJjIjogIngiLCAiaSI6ICJ5In0="])
+def test_invalid_cursor(cursor):
+    with pytest.raises(pagination.PaginationError):
+        pagination.decode_cursor(cursor)
+
+
+def test_pages_newest_first_without_gaps(collection):
+    insert_items(collection, 7)
+    assert walk(collection, 3) == [[6, 5, 4], [3, 2, 1], [0]]
+
+
+def test_exact_multiple_has_no_empty_last_page(collection):
+    insert_items(collection, 4)
+    assert walk(collection, 2) == [[3, 2], [1, 0]]
+
+
+def test_ties_on_created_at_are_broken_by_id(collection):
+    insert_items(collection, 5, same_time=True)
+    pages = walk(collection, 2)
+    seen = [n for page in pages for n in page]
+    assert sorted(seen) == [0, 1, 2, 3, 4]
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+
+def test_notes_endpoint_follows_cursors(client, auth_headers):
+    for index in range(5):
+        client.post("/notes", json={"title": f"note {index}", "content": "x"}, headers=auth_headers)
+
+    titles = []
+    url = "/notes?limit=2&view=summary"
+    while url:
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        assert len(response.json["notes"]) <= 2
+        assert all("content" not in note for note in response.json["notes"])
+        titles += [note["title"] for note in response.json["notes"]]
+        url = f"/notes?limit=2&view=summary&cursor={response.json['next']}" if response.json["next"] else None
+
+    assert titles == [f"note {index}" for index in reversed(range(5))]
+
+
+@pytest.mark.parametrize("query", ["limit=0", "limit=abc", "cursor=garbage", "view=everything"])
+def test_notes_endpoint_rejects_bad_arguments(client, auth_headers, query):
+    assert client.get(f"/notes?{query}", headers=auth_headers).status_code == 400
@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from benchmarks import standins
+from pdf_handling import extract
+from pdf_handling import pdf_store
+
+
+class SteppingDatetime:
+    """
+    datetime whose utcnow() moves forward a second per call, so access order is unambiguous.
+    It starts from the real time: mongomock applies the idle TTL index against it.
+    """
+    now = datetime.utcnow()
+
+    @classmethod
+    def utcnow(cls):
+        cls.now += timedelta(seconds=1)
+        return cls.now
+
+
+@pytest.fixture
+def store(monkeypatch, collection):
+    monkeypatch.setattr(pdf_store, "datetime", SteppingDatetime)
+    store = pdf_store.PdfStore(max_entries=3)
+    store.attach_collection(collection)
+    return store
+
+
+def extraction(pages=2, status="ok"):
+    texts = [f"Page {page} about the chloroplast" for page in range(1, pages + 1)]
+    text = "".join(f"\n\n--- Page {page} ---\n\n{body}" for page, body in enumerate(texts, start=1))
+    return {
+        "text": text,
+        "page_count": pages,
+        "seconds": 0.1,
+        "pages": [{"page": page, "status": status, "text": body} for page, body in enumerate(texts, start=1)],
+    }
+
+
+def cached(store, collection):
+    return {doc["_id"] for doc in collection.find({}, {"_id": 1})}
+
+
+def test_round_trip(store):
+    saved = extraction(pages=3)
+    store.save_extraction("d1", saved, size=1234)
+
+    record = store.get("d1")
+    assert record["text"] == saved["text"]
+    assert record["page_count"] == 3
+    assert [page["text"] for page in record["pages"]] == [page["text"] for page in saved["pages"]]
+    assert store.get("unknown") is None
+    assert (store.stats()["hits"], store.stats()["misses"]) == (1, 1)
+
+
+def test_round_trip_of_a_real_extraction(store):
+    saved = extract.extract_pages(standins.make_pdf(3, lines_per_page=5), workers=1)
+    store.save_extraction("d1", saved, size=1)
+    assert [page["text"] for page in store.get("d1")["pages"]] == [page["text"] for page in saved["pages"]]
+
+
+def test_least_recently_accessed_is_evicted(store, collection):
+    for digest in ("d1", "d2", "d3"):
+        store.save_extraction(digest, extraction(), size=1)
+    # d1 is read again, so d2 is now the oldest
+    store.get("d1")
+    store.save_extraction("d4", extraction(), size=1)
+
+    assert cached(store, collection) == {"d1", "d3", "d4"}
+    assert store.stats()["evictions"] == 1
+
+
+def test_eviction_catches_up_after_the_limit_drops(store, collection):
+    for digest in ("d1", "d2", "d3"):
+        store.save_extraction(digest, extraction(), size=1)
+    store.max_entries = 1
+    store.save_extraction("d4", extraction(), size=1)
+
+    assert cached(store, collection) == {"d4"}
+    assert store.stats()["evictions"] == 3
+
+
+def test_incomplete_and_oversized_extractions_are_not_cached(store, collection):
+    store.save_extraction("timeout", extraction(status="timeout"), size=1)
+    store.max_text_bytes = 10
+    store.save_extraction("big", extraction(), size=1)
+
+    assert cached(store, collection) == set()
+    assert (store.stats()["incomplete"], store.stats()["too_large"]) == (1, 1)
+
+
+def test_summaries_are_kept_per_fingerprint(store):
+    store.save_extraction("d1", extraction(), size=1)
+    store.save_summary("d1", "fp1", {"summary": "old prompts"})
+
+    record = store.get("d1")
+    assert store.cached_summary(record, "fp1")["summary"] == "old prompts"
+    assert store.cached_summary(record, "fp2") is None
+    # A summary for an upload that wasn't cached is dropped
+    store.save_summary("missing", "fp1", {"summary": "x"})
+    assert store.get("missing") is None
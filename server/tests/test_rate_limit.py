@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+import pytest
+
+from auth import rate_limit
+
+RATE = rate_limit.GENERATION_RATE_PER_MINUTE / 60
+BURST = rate_limit.GENERATION_BURST
+
+
+@pytest.fixture
+def store(monkeypatch, clock):
+    monkeypatch.setattr(rate_limit, "time", SimpleNamespace(monotonic=clock))
+    return rate_limit.MemoryStore()
+
+
+@pytest.fixture
+def limiter(monkeypatch, store):
+    # The stand-ins turn the limiter off for the load generator
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_ENABLED", True)
+    return rate_limit.Limiter(store)
+
+
+def test_refill_is_capped_at_capacity():
+    assert rate_limit.refill(0, 6, rate=0.5, capacity=10) == 3
+    assert rate_limit.refill(9, 600, rate=0.5, capacity=10) == 10
+    # A clock that went backwards adds nothing
+    assert rate_limit.refill(4, -5, rate=0.5, capacity=10) == 4
+
+
+def test_request_cost_grows_with_input_but_fits_the_bucket():
+    assert rate_limit.request_cost(0) == 1
+    assert rate_limit.request_cost(rate_limit.GENERATION_COST_BYTES) == 2
+    assert rate_limit.request_cost(10 ** 12) == BURST
+
+
+def test_bucket_empties_then_refills(store, clock):
+    for _ in range(int(BURST)):
+        assert store.take("u1", 1) == 0
+
+    wait = store.take("u1", 1)
+    assert wait == rate_limit.retry_after(0, 1)
+
+    # Not enough time for a whole token yet
+    clock.advance(0.5 / RATE)
+    assert store.take("u1", 1) > 0
+
+    clock.advance(1 / RATE)
+    assert store.take("u1", 1) == 0
+
+
+def test_buckets_are_per_key(store):
+    for _ in range(int(BURST)):
+        store.take("u1", 1)
+    assert store.take("u1", 1) > 0
+    assert store.take("u2", 1) == 0
+
+
+def test_idle_bucket_is_full_again(store, clock):
+    for _ in range(int(BURST)):
+        store.take("u1", 1)
+    clock.advance(BURST / RATE)
+    for _ in range(int(BURST)):
+        assert store.take("u1", 1) == 0
+
+
+def test_concurrency_slots(limiter, store):
+    leases = [limiter.acquire("u1") for _ in range(rate_limit.GENERATION_MAX_CONCURRENT)]
+    assert store.in_flight() == rate_limit.GENERATION_MAX_CONCURRENT
+
+    with pytest.raises(rate_limit.RateLimited) as raised:
+        limiter.acquire("u1")
+    assert raised.value.reason == "concurrency"
+    assert raised.value.retry_after == rate_limit.RATE_LIMIT_CONCURRENCY_RETRY_SECONDS
+
+    # Other users have slots of their own
+    limiter.release("u2", limiter.acquire("u2").slot)
+
+    leases[0].release()
+    leases[0].release()  # idempotent
+    assert store.in_flight() == rate_limit.GENERATION_MAX_CONCURRENT - 1
+    limiter.acquire("u1")
+
+
+def test_rate_limited_request_gives_its_slot_back(limiter, store):
+    for _ in range(int(BURST)):
+        limiter.acquire("u1").release()
+
+    with pytest.raises(rate_limit.RateLimited) as raised:
+        limiter.acquire("u1")
+    assert raised.value.reason == "rate"
+    assert raised.value.retry_after >= 1
+    assert store.in_flight() == 0
+    assert limiter.stats()["rate_limited"] == 1
+
+
+def test_store_failure_lets_the_request_through(limiter, monkeypatch):
+    def broken(key):
+        raise RuntimeError("store down")
+
+    monkeypatch.setattr(limiter.store, "acquire_slot", broken)
+    lease = limiter.acquire("u1")
+    assert lease.slot is None
+    lease.release()
+    assert limiter.stats()["store_errors"] == 1
+
+
+def test_mongo_store_slots(collection):
+    store = rate_limit.MongoStore(collection)
+    slots = [store.acquire_slot("u1") for _ in range(rate_limit.GENERATION_MAX_CONCURRENT)]
+    assert None not in slots
+    assert store.acquire_slot("u1") is None
+
+    store.release_slot("u1", slots[0])
+    assert store.acquire_slot("u1") is not None
+
+
+def test_mongo_store_bucket(collection):
+    store = rate_limit.MongoStore(collection)
+    for _ in range(int(BURST)):
+        assert store.take("u1", 1) == 0
+    assert store.take("u1", 1) > 0
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from aio import event_loop
+from aio import singleflight
+
+
+@pytest.fixture
+def flight():
+    return singleflight.SingleFlight()
+
+
+@pytest.fixture
+def leased_flight(monkeypatch, collection):
+    monkeypatch.setattr(singleflight, "SINGLEFLIGHT_POLL_SECONDS", 0.01)
+    flight = singleflight.SingleFlight()
+    flight.attach_collection(collection)
+    return flight
+
+
+class Computation:
+    """
+    compute() for SingleFlight.do that counts its calls and finishes when released
+    """
+
+    def __init__(self, result=None, error=None):
+        self.result = result if result is not None else {"summary": "generated"}
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        self.release = asyncio.Event()
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+async def run_together(flight, key, compute, callers):
+    tasks = [asyncio.ensure_future(flight.do(key, compute)) for _ in range(callers)]
+    # Let every caller join before the leader finishes
+    while compute.release is None:
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    compute.release.set()
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def test_content_key_is_length_prefixed():
+    assert singleflight.content_key("q", "ab", "c") != singleflight.content_key("q", "a", "bc")
+    assert singleflight.content_key("q", "abc") == singleflight.content_key("q", b"abc")
+    assert singleflight.content_key("q", "abc") != singleflight.content_key("t", "abc")
+
+
+def test_followers_share_the_leaders_call(flight):
+    compute = Computation()
+    results = event_loop.run(run_together(flight, "k", compute, callers=5))
+
+    assert compute.calls == 1
+    assert results == [{"summary": "generated"}] * 5
+    stats = flight.stats()
+    assert (stats["leaders"], stats["followers"], stats["in_flight"]) == (1, 4, 0)
+
+
+def test_every_caller_gets_its_own_copy(flight):
+    compute = Computation()
+    first, second = event_loop.run(run_together(flight, "k", compute, callers=2))
+    first["filename"] = "a.pdf"
+    assert "filename" not in second
+
+
+def test_followers_get_the_leaders_error(flight):
+    compute = Computation(error=RuntimeError("Gemini down"))
+    results = event_loop.run(run_together(flight, "k", compute, callers=3))
+
+    assert compute.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    # A failure isn't remembered: the next caller computes again
+    assert event_loop.run(run_together(flight, "k", Computation(), callers=1)) == [{"summary": "generated"}]
+
+
+def test_different_keys_run_separately(flight):
+    async def both():
+        first, second = Computation({"n": 1}), Computation({"n": 2})
+        return await asyncio.gather(
+            run_together(flight, "a", first, callers=1), run_together(flight, "b", second, callers=1)
+        )
+
+    assert event_loop.run(both()) == [[{"n": 1}], [{"n": 2}]]
+
+
+def test_cancelled_follower_leaves_the_leader_running(flight):
+    async def scenario():
+        compute = Computation()
+        leader = asyncio.ensure_future(flight.do("k", compute))
+        follower = asyncio.ensure_future(flight.do("k", compute))
+        while compute.release is None:
+            await asyncio.sleep(0)
+        follower.cancel()
+        await asyncio.sleep(0)
+        compute.release.set()
+        return await leader, follower.cancelled()
+
+    assert event_loop.run(scenario()) == ({"summary": "generated"}, True)
+
+
+def test_lease_is_published_then_expires(leased_flight, collection):
+    compute = Computation()
+    assert event_loop.run(run_together(leased_flight, "k", compute, callers=2)) == [{"summary": "generated"}] * 2
+
+    doc = collection.find_one({"_id": "k"})
+    assert doc["status"] == singleflight.DONE
+    assert doc["result"] == {"summary": "generated"}
+    assert doc["expires_at"] <= datetime.utcnow() + timedelta(seconds=singleflight.SINGLEFLIGHT_RESULT_SECONDS)
+
+
+def test_lease_is_released_when_the_leader_fails(leased_flight, collection):
+    compute = Computation(error=RuntimeError("Gemini down"))
+    results = event_loop.run(run_together(leased_flight, "k", compute, callers=2))
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert collection.find_one({"_id": "k"}) is None
+
+
+def test_remote_follower_waits_for_the_lease_owner(leased_flight, collection):
+    # Another worker process holds the lease
+    collection.insert_one({
+        "_id": "k", "owner": "other", "status": singleflight.RUNNING,
+        "expires_at": datetime.utcnow() + timedelta(seconds=60)
+    })
+
+    async def scenario():
+        compute = Computation()
+        waiting = asyncio.ensure_future(leased_flight.do("k", compute))
+        await asyncio.sleep(0.05)
+        await event_loop.to_thread(
+            collection.update_one, {"_id": "k"}, {"$set": {"status": singleflight.DONE, "result": {"summary": "remote"}}}
+        )
+        return await waiting, compute.calls
+
+    assert event_loop.run(scenario()) == ({"summary": "remote"}, 0)
+    assert leased_flight.stats()["remote_followers"] == 1
+
+
+def test_expired_lease_is_taken_over(leased_flight, collection):
+    # Its owner died without releasing it
+    collection.insert_one({
+        "_id": "k", "owner": "dead", "status": singleflight.RUNNING,
+        "expires_at": datetime.utcnow() - timedelta(seconds=1)
+    })
+    compute = Computation()
+
+    assert event_loop.run(run_together(leased_flight, "k", compute, callers=1)) == [{"summary": "generated"}]
+    assert compute.calls == 1
+    assert leased_flight.stats()["lease_takeovers"] == 1
+    assert collection.find_one({"_id": "k"})["owner"] != "dead"
@@ -0,0 +1,86 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+
+from auth import tokens
+
+SECRET = "test-secret"
+
+
+def make_token(**claims):
+    return jwt.encode({"user_id": "u1", **claims}, SECRET, algorithm="HS256")
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(tokens, "time", SimpleNamespace(time=clock))
+    cache = tokens.TokenCache(max_entries=2, ttl=60)
+    monkeypatch.setattr(tokens, "token_cache", cache)
+    return cache
+
+
+def test_entry_expires_after_ttl(cache, clock):
+    cache.set(b"a", {"user_id": "u1"})
+    clock.advance(59)
+    assert cache.get(b"a") == {"user_id": "u1"}
+    clock.advance(1)
+    assert cache.get(b"a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entry_never_outlives_token_exp(cache, clock):
+    cache.set(b"a", {"user_id": "u1", "exp": clock.now + 10})
+    clock.advance(9)
+    assert cache.get(b"a") is not None
+    clock.advance(1)
+    assert cache.get(b"a") is None
+
+
+def test_least_recently_used_is_evicted(cache):
+    cache.set(b"a", {"n": 1})
+    cache.set(b"b", {"n": 2})
+    cache.get(b"a")
+    cache.set(b"c", {"n": 3})
+    assert cache.get(b"b") is None
+    assert cache.get(b"a") == {"n": 1}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_signature_is_only_checked_on_a_miss(cache, monkeypatch):
+    token = make_token(exp=int(time.time()) + 3600)
+    assert tokens.decode_token(token, SECRET)["user_id"] == "u1"
+
+    def fail(*args, **kwargs):
+        raise AssertionError("jwt.decode called on a cache hit")
+
+    monkeypatch.setattr(tokens.jwt, "decode", fail)
+    assert tokens.decode_token(token, SECRET)["user_id"] == "u1"
+    assert cache.stats()["hits"] == 1
+
+
+def test_cached_token_is_rejected_once_it_expires(monkeypatch):
+    # Real clock: jwt checks exp against its own
+    monkeypatch.setattr(tokens, "token_cache", tokens.TokenCache(ttl=60))
+    exp = int(time.time()) + 1
+    token = make_token(exp=exp)
+    assert tokens.decode_token(token, SECRET)["user_id"] == "u1"
+
+    time.sleep(exp + 0.1 - time.time())
+    with pytest.raises(jwt.ExpiredSignatureError):
+        tokens.decode_token(token, SECRET)
+
+
+def test_failures_are_not_cached(cache):
+    token = make_token(exp=int(time.time()) + 3600)
+    with pytest.raises(jwt.InvalidTokenError):
+        tokens.decode_token(token, "wrong-secret")
+    assert cache.stats()["entries"] == 0
+
+
+def test_expired_token_is_rejected_by_the_api(client):
+    token = jwt.encode({"user_id": "u1", "exp": int(time.time()) - 10}, client.application.config["JWT_SECRET_KEY"], algorithm="HS256")
+    response = client.get("/notes", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert response.json["message"] == "Token has expired"
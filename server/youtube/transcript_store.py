@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TRANSCRIPT_TTL_SECONDS = int(os.getenv("TRANSCRIPT_TTL_SECONDS", str(7 * 24 * 3600)))
+# "No captions" / "private video" answers are remembered briefly so bad URLs don't keep hitting YouTube
+TRANSCRIPT_NEGATIVE_TTL_SECONDS = int(os.getenv("TRANSCRIPT_NEGATIVE_TTL_SECONDS", "300"))
+TRANSCRIPT_CACHE_MAX_ENTRIES = int(os.getenv("TRANSCRIPT_CACHE_MAX_ENTRIES", "256"))
+
+
+class TranscriptUnavailable(Exception):
+    """
+    Raised for a cached negative result
+    """
+
+
+def make_key(video_id, languages):
+    return f"{video_id}:{','.join(languages)}"
+
+
+class TranscriptStore:
+    """
+    Assembled transcripts and their raw snippets keyed by video ID and language preference.
+    Entries live in an in-process LRU and, optionally, in a Mongo collection.
+    """
+
+    def __init__(self, max_entries=TRANSCRIPT_CACHE_MAX_ENTRIES, ttl=TRANSCRIPT_TTL_SECONDS,
+                 negative_ttl=TRANSCRIPT_NEGATIVE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.collection = None
+        self._entries = OrderedDict()  # key -> (expires_at, record)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "negative_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    def attach_collection(self, collection):
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        self.collection = collection
+
+    def get(self, video_id, languages):
+        """
+        Returns the cached record, raises TranscriptUnavailable for a cached
+        negative result, or returns None on a miss
+        """
+        key = make_key(video_id, languages)
+        now = time.time()
+        record = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    record = entry[1]
+                    self._counters["negative_hits" if record.get("error") else "hits"] += 1
+                else:
+                    del self._entries[key]
+
+        if record is None:
+            record = self._get_persistent(key)
+            with self._lock:
+                if record is None:
+                    self._counters["misses"] += 1
+                    return None
+                self._counters["persistent_hits"] += 1
+                ttl = self.negative_ttl if record.get("error") else self.ttl
+                self._store(key, record, now + ttl)
+
+        if record.get("error"):
+            raise TranscriptUnavailable(record["error"])
+        return record
+
+    def set(self, video_id, languages, record):
+        self._save(make_key(video_id, languages), record, self.ttl)
+
+    def set_negative(self, video_id, languages, error):
+        record = {"video_id": video_id, "languages": list(languages), "error": error}
+        self._save(make_key(video_id, languages), record, self.negative_ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._entries)
+        stats["persistent"] = self.collection is not None
+        return stats
+
+    def _save(self, key, record, ttl):
+        with self._lock:
+            self._store(key, record, time.time() + ttl)
+        if self.collection is None:
+            return
+        now = datetime.utcnow()
+        try:
+            self.collection.replace_one(
+                {"_id": key},
+                dict(record, fetched_at=now, expires_at=now + timedelta(seconds=ttl)),
+                upsert=True
+            )
+        except Exception as e:
+            print(f"Error writing transcript store: {e}")
+
+    def _store(self, key, record, expires_at):
+        self._entries[key] = (expires_at, record)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get_persistent(self, key):
+        if self.collection is None:
+            return None
+        try:
+            return self.collection.find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"_id": 0, "fetched_at": 0, "expires_at": 0}
+            )
+        except Exception as e:
+            print(f"Error reading transcript store: {e}")
+            return None
+
+
+transcript_store = TranscriptStore()
+
+
+def setup(collection):
+    """
+    Attaches the Mongo tier when TRANSCRIPT_STORE_PERSIST is enabled
+    """
+    if os.getenv("TRANSCRIPT_STORE_PERSIST", "false").lower() in ("1", "true", "yes"):
+        transcript_store.attach_collection(collection)
+    return transcript_store
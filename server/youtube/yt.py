@@ -1,38 +1,123 @@
-from youtube_transcript_api import YouTubeTranscriptApi
 import re
-ytt_api = YouTubeTranscriptApi()
-def get_transcription(link):
-    transcript=""
+import threading
+from youtube.transcript_store import transcript_store
+from aio import event_loop
+from metrics import metrics
+
+# youtube_transcript_api and its HTTP session are loaded on the first fetch, not at import
+ytt_api = None
+ytt_api_lock = threading.Lock()
+
+languages = ('en', 'hi')
+
+def get_api():
+    global ytt_api
+    if ytt_api is None:
+        with ytt_api_lock:
+            if ytt_api is None:
+                from youtube_transcript_api import YouTubeTranscriptApi
+                ytt_api = YouTubeTranscriptApi()
+    return ytt_api
+
+def permanent_errors():
+    """
+    Errors that won't go away by asking again, safe to cache as negative results
+    """
+    from youtube_transcript_api._errors import (
+        AgeRestricted,
+        InvalidVideoId,
+        NoTranscriptFound,
+        TranscriptsDisabled,
+        VideoUnavailable,
+        VideoUnplayable,
+    )
+    return (
+        AgeRestricted,
+        InvalidVideoId,
+        NoTranscriptFound,
+        TranscriptsDisabled,
+        VideoUnavailable,
+        VideoUnplayable,
+    )
+
+def extract_video_id(link):
+    # Extract video ID from different YouTube URL formats
+    video_id = None
+    if 'shorts' in link:
+        video_id = link.split('shorts/')[1].split('?')[0]  # Remove query params
+    elif 'youtu.be' in link:
+        match = re.search(r"youtu\.be/([a-zA-Z0-9_-]+)", link)
+        if match:
+            video_id = match.group(1)
+    elif 'watch?v=' in link:
+        video_id = link.split('watch?v=')[1].split('&')[0]  # Handle additional params
+    else:
+        # Try to extract video ID using regex as fallback
+        match = re.search(r"(?:v=|/)([a-zA-Z0-9_-]{11})", link)
+        if match:
+            video_id = match.group(1)
+    return video_id
+
+def fetch_transcript(video_id):
+    """
+    Fetches captions from YouTube and assembles them into a transcript record
+    """
+    try:
+        with metrics.timed(metrics.youtube_fetch_seconds, span="youtube"):
+            fetched_transcript = get_api().fetch(video_id, languages=list(languages))
+    except Exception as e:
+        if isinstance(e, permanent_errors()):
+            transcript_store.set_negative(video_id, languages, str(e))
+        raise
+
+    snippets = [
+        {"text": snippet.text, "start": snippet.start, "duration": snippet.duration}
+        for snippet in fetched_transcript
+    ]
+    # Single join keeps assembly linear in the transcript length
+    text = " ".join(snippet["text"] for snippet in snippets).strip()
+
+    if not text:
+        transcript_store.set_negative(video_id, languages, "No transcript found for this video")
+        raise ValueError("No transcript found for this video")
+
+    metrics.youtube_transcript_characters.observe(len(text))
+
+    record = {
+        "video_id": video_id,
+        "languages": list(languages),
+        "language_code": fetched_transcript.language_code,
+        "is_generated": fetched_transcript.is_generated,
+        "text": text,
+        "snippets": snippets,
+    }
+    transcript_store.set(video_id, languages, record)
+    return record
+
+def get_transcript(link):
+    """
+    Returns the transcript record (text plus timestamped snippets) for a YouTube link
+    """
     try:
-        # Extract video ID from different YouTube URL formats
-        video_id = None
-        if 'shorts' in link:
-            video_id = link.split('shorts/')[1].split('?')[0]  # Remove query params
-        elif 'youtu.be' in link:
-            match = re.search(r"youtu\.be/([a-zA-Z0-9_-]+)", link)
-            if match:
-                video_id = match.group(1)
-        elif 'watch?v=' in link:
-            video_id = link.split('watch?v=')[1].split('&')[0]  # Handle additional params
-        else:
-            # Try to extract video ID using regex as fallback
-            match = re.search(r"(?:v=|/)([a-zA-Z0-9_-]{11})", link)
-            if match:
-                video_id = match.group(1)
-        
+        video_id = extract_video_id(link)
         if not video_id:
             raise ValueError("Invalid YouTube URL format")
-            
-        fetched_transcript = ytt_api.fetch(video_id, languages=['en', 'hi'])
-        for snippet in fetched_transcript:
-            transcript += snippet.text + " "
-        
-        if not transcript.strip():
-            raise ValueError("No transcript found for this video")
-            
-        return transcript.strip()
+
+        record = transcript_store.get(video_id, languages)
+        if record is None:
+            record = fetch_transcript(video_id)
+        return record
     except Exception as e:
         print(f"Error fetching transcript: {e}")
         raise e  # Re-raise the exception to be handled by the controller
 
-# print(get_transcription("https://www.youtube.com/watch?v=l8seS3zyorc"))
\ No newline at end of file
+async def get_transcript_async(link):
+    """
+    get_transcript on the blocking pool, so the event loop keeps serving while YouTube answers
+    """
+    return await event_loop.to_thread(get_transcript, link)
+
+def get_transcription(link):
+    return get_transcript(link)["text"]
+
+# print(get_transcription("https://www.youtube.com/watch?v=l8seS3zyorc"))